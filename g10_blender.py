@@ -3,7 +3,8 @@
 #
 
 import bpy, bmesh
-import math, json, sys, time, os, getpass, importlib
+import numpy as np
+import math, json, sys, time, os, getpass, importlib, hashlib
 
 from struct              import pack
 from dataclasses         import dataclass
@@ -11,6 +12,27 @@ from timeit              import default_timer              as timer
 from bpy_extras.io_utils import ExportHelper, ImportHelper
 from bpy.types           import Operator, AddonPreferences
 
+from .g10_geometry       import (
+    ENCODER_VERSION,
+    ENCODING_SETTINGS,
+    MESH_FORMAT_EXTENSIONS,
+    EncodePool,
+    compute_bounds,
+    encode_convex_decomposition,
+    encode_convex_hull,
+    encode_part,
+    top_influences,
+    transform_box
+)
+from .g10_image          import (
+    IMAGE_ENCODERS,
+    IMAGE_EXTENSIONS,
+    ImageWriter,
+    pack_channels,
+    quantize_pixels,
+    write_image
+)
+
 # TODO: Fix these, maybe use a json file on the disk to cache them?
 materials      : dict = {}
 entities       : dict = {}
@@ -18,6 +40,26 @@ parts          : dict = {}
 g10_source     : dict = os.environ["G10_SOURCE_PATH"] if os.environ.get("G10_SOURCE_PATH") is not None else ""
 export_context : dict = None
 
+# Export scoped registries and statistics. These are emptied at the start of each export
+export_statistics : dict = {}
+
+# Assets of each kind, by key. Each record holds the asset, whether it was written, the files it wrote, 
+# and how many repeat writes were short circuited
+ASSET_KINDS       : tuple = ( 'materials', 'textures', 'parts', 'colliders' )
+asset_registry    : dict  = { kind: { } for kind in ASSET_KINDS }
+
+# Fingerprints of the files in the project's parts and colliders directories, loaded on first use
+manifests         : dict = {}
+
+# 1x1 textures standing in for each material's unlinked inputs, by material name, then by map
+constant_textures : dict = {}
+
+# Worker pool that encodes parts while the scene is written
+encode_pool       : EncodePool = None
+
+# Thread pool that encodes textures while the scene is written
+image_writer      : ImageWriter = None
+
 def set_export_context (context : dict):
     global export_context
 
@@ -25,6 +67,105 @@ def set_export_context (context : dict):
 
     export_context = context
 
+    # Start the export with empty registries
+    for registry in asset_registry.values():
+        registry.clear()
+
+    export_statistics.clear()
+    manifests.clear()
+    constant_textures.clear()
+
+def count_statistic (name : str, amount : int = 1):
+
+    # Accumulate an export statistic
+    export_statistics[name] = export_statistics.get(name, 0) + amount
+
+def register_asset (kind : str, key, asset = None) -> dict:
+
+    # Get the record of an asset, making it the first time the asset is seen
+    record = asset_registry[kind].get(key)
+
+    if record is None:
+        record                   = { 'asset': asset, 'written': False, 'files': [ ], 'repeats': 0 }
+        asset_registry[kind][key] = record
+
+    return record
+
+def get_asset (kind : str, key):
+
+    # Get a registered asset, or None
+    record = asset_registry[kind].get(key)
+
+    return record['asset'] if record is not None else None
+
+def write_once (kind : str, key, files : list = None) -> bool:
+
+    # The first write of an asset goes ahead. Repeats are counted, and skipped
+    record = register_asset(kind, key)
+
+    if record['written'] is True:
+        record['repeats'] = record['repeats'] + 1
+        return False
+
+    record['written'] = True
+
+    if files is not None:
+        record['files'].extend(files)
+
+    return True
+
+def record_asset_files (kind : str, key, files : list):
+
+    # Remember the files an asset wrote, so repeats can be measured
+    register_asset(kind, key)['files'].extend(files)
+
+def asset_statistics () -> dict:
+
+    # Writes, skipped repeats, and the bytes the repeats would have written, for each kind of asset
+    statistics = { }
+
+    for kind, registry in asset_registry.items():
+
+        written, repeats, avoided = 0, 0, 0
+
+        for record in registry.values():
+
+            if record['written'] is False:
+                continue
+
+            size    = sum(os.path.getsize(f) for f in set(record['files']) if os.path.exists(f))
+            written = written + 1
+            repeats = repeats + record['repeats']
+            avoided = avoided + record['repeats'] * size
+
+        statistics[kind] = { 'written': written, 'repeats': repeats, 'bytes avoided': avoided }
+
+    return statistics
+
+def get_manifest (directory : str, kind : str) -> dict:
+
+    # Load the manifest of the kind directory the first time it is needed
+    if kind not in manifests:
+
+        manifests[kind] = { }
+
+        try:
+            with open(directory + "/" + kind + "/manifest.json", "r") as f:
+                manifests[kind] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    return manifests[kind]
+
+def save_manifests (directory : str):
+
+    # Write each manifest next to the files it describes
+    for kind, manifest in manifests.items():
+        with open(directory + "/" + kind + "/manifest.json", "w+") as f:
+            f.write(json.dumps(manifest, indent=4))
+
+    return
+
 
 def clear_export_context ():
     global export_context
@@ -301,10 +442,88 @@ class Part:
     obj           : bpy.types.Object = None
     mesh          : bpy.types.Mesh   = None
     path          : str              = None
-    ply_path      : str              = None
+    mesh_path     : str              = None
     shader_name   : str              = None
     material_name : str              = None
     bone_data     : dict             = None 
+    registry_key  : tuple            = None
+    box           : tuple            = None
+
+    # Flatten arrays, vectors and matrices
+    @staticmethod
+    def flatten_values(value) -> tuple:
+
+        '''
+            Returns the scalars of a ( possibly nested ) sequence as a flat tuple
+        '''
+
+        flat : list = [ ]
+
+        for v in value:
+            if hasattr(v, '__len__') and not isinstance(v, str):
+                flat.extend(Part.flatten_values(v))
+            else:
+                flat.append(v)
+
+        return tuple(flat)
+
+    # Registry key
+    @staticmethod
+    def get_registry_key(object: bpy.types.Object) -> tuple:
+
+        '''
+            Returns a key shared by every object that links the same mesh with the same materials 
+            and modifier state
+        '''
+
+        # Slots linked to the object give duplicates of one mesh different materials, and the
+        # part JSON names its material, so the effective material of each slot is in the key
+        material_names : tuple = tuple(slot.material.name_full if slot.material is not None else None for slot in object.material_slots)
+
+        # Parts are read from the mesh without its modifiers, so today objects that only differ 
+        # by modifiers encode the same part twice. Keying on the modifier state anyway keeps 
+        # those parts apart once evaluated meshes are exported, where the output does differ
+        modifier_state : list = [ ]
+
+        for modifier in object.modifiers:
+
+            modifier_properties : list = [ ]
+
+            # Collect the value of each property on the modifier
+            for p in modifier.bl_rna.properties:
+
+                if p.identifier in ( 'rna_type', 'name' ):
+                    continue
+
+                value = getattr(modifier, p.identifier, None)
+
+                # Datablocks are compared by name
+                if isinstance(value, bpy.types.ID):
+                    value = value.name_full
+
+                # Other pointers and collections are skipped
+                elif p.type in ( 'POINTER', 'COLLECTION' ):
+                    continue
+
+                # Enum flags are compared as sorted tuples
+                elif isinstance(value, ( set, frozenset )):
+                    value = tuple(sorted(value))
+
+                # Arrays, vectors and matrices are compared by their flattened values
+                elif getattr(p, 'is_array', False) or ( hasattr(value, '__len__') and not isinstance(value, str) ):
+                    value = Part.flatten_values(value)
+
+                # Anything else that can not be hashed is skipped
+                try:
+                    hash(value)
+                except TypeError:
+                    continue
+
+                modifier_properties.append( ( p.identifier, value ) )
+
+            modifier_state.append( ( modifier.type, tuple(modifier_properties) ) )
+
+        return ( object.data.name_full, material_names, tuple(modifier_state) )
 
     # Constructor
     def __init__(self, object: bpy.types.Object):
@@ -320,6 +539,19 @@ class Part:
         # Name
         self.name                  = object.data.name
 
+        # Register the part, so linked duplicates share it
+        self.registry_key          = Part.get_registry_key(object)
+
+        # The same mesh with different materials or modifiers gets its own file
+        names  = set(record['asset'].name for record in asset_registry['parts'].values())
+        suffix = 1
+
+        while self.name in names:
+            self.name = f"{object.data.name}.{suffix}"
+            suffix    = suffix + 1
+
+        register_asset('parts', self.registry_key, self)
+
         # Blender mesh
         self.mesh = object
 
@@ -343,357 +575,181 @@ class Part:
     # Returns file JSON
     def json(self):
 
-        self.json_data['path'] = self.ply_path
+        self.json_data['path'] = self.mesh_path
 
         return json.dumps(self.json_data, indent=4)
 
     # Writes JSON to a specified file
     def write_to_file(self, path: str):
 
-        self.json_data["path"] = self.ply_path
+        self.json_data["path"] = self.mesh_path
 
         # Write the JSON data to the specified path
         with open(path, "w+") as f:
             try: f.write(self.json())
             except FileExistsError: pass
 
-    # PLY exporter 
-    def export_ply ( self, file_path, comment="Written from gxport" ):
-
-        # Convinience 
-        active_uv_layer         = self.mesh.data.uv_layers.active.data
-        active_col_layer        = None
-        bone_groups_and_weights = None
-        bone_groups             = None
-        bone_weights            = None
-
-        use_geometry    : bool  = True if 'xyz'  in export_context['vertex groups'] else False
-        use_uv_coords   : bool  = True if 'uv'   in export_context['vertex groups'] else False
-        use_normals     : bool  = True if 'nxyz' in export_context['vertex groups'] else False
-        use_tangents    : bool  = True if 'txyz' in export_context['vertex groups'] else False
-        use_bitangents  : bool  = True if 'bxyz' in export_context['vertex groups'] else False
-        use_colors      : bool  = True if 'rgb'  in export_context['vertex groups'] else False
-        use_bone_groups : bool  = True if 'bg'   in export_context['vertex groups'] else False
-        use_bone_weights: bool  = True if 'bw'   in export_context['vertex groups'] else False
-
-        if use_colors is True:
-            active_col_layer = self.mesh.vertex_colors.active.data
-
-        # Make a new bmesh from the parameter
-        bm = bmesh.new()
-        bm.from_mesh(self.mesh.data)
-        bmesh.ops.triangulate(bm, faces=bm.faces[:])
-
-        # Buffer lookup tables
-        bm.faces.ensure_lookup_table()
-        bm.edges.ensure_lookup_table()
-        bm.verts.ensure_lookup_table()
-
-        # Dict for vertices and faces
-        vertices = { }
-
-        vertex_counter = 0
-
-        faces   = { }
-
-        if use_bone_groups is True or use_bone_weights is True:
-            bone_groups_and_weights = self.get_bone_groups_and_weights(self.mesh)
-            bone_groups  = bone_groups_and_weights[0]
-            bone_weights = bone_groups_and_weights[1]
-
-
-        # Iterate over all faces (faces are triangulated)
-        for i, f in enumerate(bm.faces):
-
-            # Face vertex attributes
-            t             = [ None, None, None ]
-            b             = [ None, None, None ]
-
-            # Face indicies
-            face_indicies = [ 0, 0, 0 ]
-
-            # Compute the tangent and bitangent of the face        
-            if use_tangents is True or use_bitangents is True:
-
-                # < x, y, z > coordinates for each vertex in the face
-                pos1                = (f.verts[0].co)
-                pos2                = (f.verts[1].co)
-                pos3                = (f.verts[2].co)    
-
-                # < s, t > coordinates for each vertex
-                uv1                 = active_uv_layer[f.loops[0].index].uv
-                uv2                 = active_uv_layer[f.loops[1].index].uv
-                uv3                 = active_uv_layer[f.loops[2].index].uv
-
-                # Compute the edges 
-                edge1               = pos2 - pos1
-                edge2               = pos3 - pos1
-
-                # Compute the difference in UVs
-                delta1              = uv2 - uv1
-                delta2              = uv3 - uv1
-
-                # Compute the inverse determinant
-                inverse_determinant = float(1) / float(delta1[0] * delta2[1] - delta2[0] * delta1[1])
-
-                # Finally, construct the < tx, ty, tz > and < bx, by, bz > vectors
-                t = [
-                    inverse_determinant * float( delta2[1] * edge1[0] - delta1[1] * edge2[0] ),
-                    inverse_determinant * float( delta2[1] * edge1[1] - delta1[1] * edge2[1] ),
-                    inverse_determinant * float( delta2[1] * edge1[2] - delta1[1] * edge2[2] )
-                ]
-
-                b = [
-                    inverse_determinant * float( -delta2[0] * edge1[0] + delta1[0] * edge2[0] ),
-                    inverse_determinant * float( -delta2[0] * edge1[1] + delta1[0] * edge2[1] ),
-                    inverse_determinant * float( -delta2[0] * edge1[2] + delta1[0] * edge2[2] )
-                ]
-
-            # Iterate over each vertex in the face
-            for j, v in enumerate(f.verts):
-
-                # Vertex attributes
-                g  = [ None, None, None ]       # < x, y, z >
-                uv = [ None, None ]             # < s, t >
-                n  = [ None, None, None ]       # < nx, ny, nz >
-                c  = [ None, None, None, None ] # < r, g, b, a >
-                bg = [ None, None, None, None ] # < g0, g1, g2, g3 > 
-                bw = [ None, None, None, None ] # < w0, w1, w2, w3 >
-
-                # < x, y, z > of current vert
-                if use_geometry is True:
-                    g  = f.verts[j].co
-
-                # < s, t > of current vert
-                if use_uv_coords is True:
-                    uv = active_uv_layer[f.loops[j].index].uv
-
-                # < nx, ny, nz > of current vert
-                if use_normals is True:
-                    n  = f.verts[j].normal
-
-                # < r, g, b, a >
-                if use_colors is True:
-                    c  = active_col_layer[f.loops[j].index].color
-
-                # TODO: Bone groups and weights
-                if use_bone_groups is True:
-                    bg = bone_groups[f.verts[j].index]
-
-                if use_bone_weights is True:
-                    bw = bone_weights[f.verts[j].index]              
-
-                # Combine < x, y, z >
-                #         < s, t >
-                #         < nx, ny, nz >
-                #         < tx, ty, tz >
-                #         < bx, by, bz >
-                #         < r, g, b, a >
-                #         < g0, g1, g2, g3 >
-                #         < w0, w1, w2, w3 >
-
-                combined_vertex = (
-                                    g[0] , g[1] , g[2],         # 0  : < x, y, z >
-                                    uv[0], uv[1],               # 3  : < s, t >
-                                    n[0] , n[1] , n[2],         # 5  : < nx, ny, nz >
-                                    t[0] , t[1] , t[2],         # 8  : < tx, ty, tz >
-                                    b[0] , b[1] , b[2],         # 11 : < bx, by, bz >
-                                    c[0] , c[1] , c[2] , c[3],  # 14 : < r, g, b, a >
-                                    bg[0], bg[1], bg[2], bg[3], # 18 : < g0, g1, g2, g3 >
-                                    bw[0], bw[1], bw[2], bw[3], # 22 : < w0, w1, w2, w3 >
-                                  )
-
-                index = vertices.get(combined_vertex)
-
-                if index is not None:
-                    face_indicies[j] = index
-                else:            
-                    face_indicies[j] = vertex_counter
-                    vertices[combined_vertex] = vertex_counter
-
-                    vertex_counter = vertex_counter + 1
-
-            faces[i] = face_indicies
-
-        with open(file_path, "wb") as file:
-            fw = file.write
-
-            fw(b"ply\n")
-            fw(b"format binary_little_endian 1.0\n")
-
-            if comment is not None:
-                fw(b"comment " + bytes(comment, 'ascii') + b"\n")
-
-            fw(b"element vertex %d\n" % vertex_counter)
-
-            if use_geometry is True:
-                fw(
-                    b"property float x\n"
-                    b"property float y\n"
-                    b"property float z\n"
-                )
-                
-            if use_uv_coords is True:
-                fw(
-                    b"property float s\n"
-                    b"property float t\n"
-                )
-            if use_normals is True:
-                fw(
-                    b"property float nx\n"
-                    b"property float ny\n"
-                    b"property float nz\n"
-                )
-            if use_tangents is True:
-                fw(
-                    b"property float tx\n"
-                    b"property float ty\n"
-                    b"property float tz\n"
-                )
-            if use_bitangents is True:
-                fw(
-                    b"property float bx\n"
-                    b"property float by\n"
-                    b"property float bz\n"
-                )
-            if use_colors is True:
-                fw(
-                    b"property uchar red\n"
-                    b"property uchar green\n"
-                    b"property uchar blue\n"
-                    b"property uchar alpha\n"
-                )
-            if use_bone_groups is True:
-                fw(
-                    b"property uchar b0\n"
-                    b"property uchar b1\n"
-                    b"property uchar b2\n"
-                    b"property uchar b3\n"
-                )
-            if use_bone_weights is True:
-                fw(
-                    b"property uchar w0\n"
-                    b"property uchar w1\n"
-                    b"property uchar w2\n"
-                    b"property uchar w3\n"
-                )
-
-            fw(b"element face %d\n" % len(faces))
-            fw(b"property list uchar uint vertex_indices\n")
-            fw(b"end_header\n")
-
-            # Iterate over vertices
-            for v in vertices:
-
-                # Write < x, y, z >
-                if use_geometry is True:
-                    fw(pack("<3f", v[0] , v[1], v[2] ))
-
-                # Write < s, t >
-                if use_uv_coords is True:
-                    fw(pack("<2f", v[3] , v[4] ))
-
-                # Write < nx, ny, nz >
-                if use_normals is True:
-                    fw(pack("<3f", v[5] , v[6] , v[7] ))
-
-                # Write < tx, ty, tz >
-                if use_tangents is True:
-                    fw(pack("<3f", v[8] , v[9] , v[10]))
-
-                # Write < bx, by, bz >
-                if use_bitangents is True:
-                    fw(pack("<3f", v[11], v[12], v[13]))
-
-                # Write < r, g, b, a >
-                if use_colors is True:
-                    fw(pack("<4B", v[14], v[15], v[16], v[17]))
-
-                if use_bone_groups is True:
-                    fw(pack("<4i", v[18], v[19], v[20], v[21]))
-
-
-                if use_bone_weights is True:
-                    fw(pack("<4f", v[22], v[23], v[24], v[25]))
-
-            # Iterate over faces
-            for i, f in enumerate(faces):
-                w = "<3I"
-                fw(pack("<b", 3))
-                lf = faces[f] 
-                fw(pack(w, lf[0], lf[1], lf[2]))
-
-        return     
-
-    # This function gives me anxiety 
-    def get_bone_groups_and_weights(self, object):
-
-        bone_vertex_indices_and_weights = { }
-        bone_group_array  = []
-        bone_weight_array = []
+    # Bulk mesh extraction
+    def extract_arrays ( self ) -> dict:
 
-        if len(object.vertex_groups) == 0:
-            return None
+        '''
+            Reads the triangles and vertex attributes of the mesh into NumPy arrays
+        '''
+
+        # Convinience
+        mesh           : bpy.types.Mesh = self.mesh.data
+        arrays         : dict           = { }
+
+        # Triangulate the mesh without modifying it
+        mesh.calc_loop_triangles()
+
+        vertex_count   : int = len(mesh.vertices)
+        loop_count     : int = len(mesh.loops)
+        triangle_count : int = len(mesh.loop_triangles)
+
+        # < v0, v1, v2 > vertex indices of each triangle
+        arrays['triangle vertices'] = np.empty(triangle_count * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", arrays['triangle vertices'])
+        arrays['triangle vertices'].shape = (triangle_count, 3)
+
+        # < l0, l1, l2 > loop indices of each triangle
+        arrays['triangle loops'] = np.empty(triangle_count * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("loops", arrays['triangle loops'])
+        arrays['triangle loops'].shape = (triangle_count, 3)
+
+        # < x, y, z > of each vertex
+        arrays['xyz'] = np.empty(vertex_count * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", arrays['xyz'])
+        arrays['xyz'].shape = (vertex_count, 3)
+
+        # < nx, ny, nz > of each vertex
+        arrays['nxyz'] = np.empty(vertex_count * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("normal", arrays['nxyz'])
+        arrays['nxyz'].shape = (vertex_count, 3)
+
+        # < s, t > of each loop
+        arrays['uv'] = np.zeros(loop_count * 2, dtype=np.float32)
+        if mesh.uv_layers.active is not None:
+            mesh.uv_layers.active.data.foreach_get("uv", arrays['uv'])
+        arrays['uv'].shape = (loop_count, 2)
+
+        # < r, g, b, a > of each loop
+        arrays['rgba'] = np.ones(loop_count * 4, dtype=np.float32)
+        if mesh.vertex_colors.active is not None:
+            mesh.vertex_colors.active.data.foreach_get("color", arrays['rgba'])
+        arrays['rgba'].shape = (loop_count, 4)
+
+        # < g0, g1, ... > and < w0, w1, ... > of each vertex
+        arrays['bg'] = None
+        arrays['bw'] = None
+
+        if 'bg' in export_context['vertex groups'] or 'bw' in export_context['vertex groups']:
+            bone_groups_and_weights = self.get_bone_groups_and_weights(self.mesh, export_context['bone influences'])
+
+            if bone_groups_and_weights is not None:
+                arrays['bg'] = bone_groups_and_weights[0]
+                arrays['bw'] = bone_groups_and_weights[1]
+
+        return arrays
+
+    # Geometry fingerprint
+    def fingerprint ( self, comment: str = None ) -> str:
+
+        '''
+            Returns a digest of the raw mesh arrays, and of the export settings that change the encoded part
+        '''
 
-        # Find vertex indices and bone weights for each bone    
-        for g in object.vertex_groups:
+        # Convinience
+        mesh   : bpy.types.Mesh = self.mesh.data
+        digest                  = hashlib.blake2b(digest_size=16)
+
+        # Hash the raw arrays of the mesh, without triangulating it
+        for collection, attribute, dtype, width in (
+            ( mesh.vertices, "co"          , np.float32, 3 ),
+            ( mesh.vertices, "normal"      , np.float32, 3 ),
+            ( mesh.loops   , "vertex_index", np.int32  , 1 ),
+            ( mesh.polygons, "loop_start"  , np.int32  , 1 ),
+            ( mesh.polygons, "loop_total"  , np.int32  , 1 )
+        ):
+            buffer = np.empty(len(collection) * width, dtype=dtype)
+            collection.foreach_get(attribute, buffer)
+            digest.update(buffer.tobytes())
+
+        # Hash the active UV and color layers
+        for layer, attribute, width in (
+            ( mesh.uv_layers.active    , "uv"   , 2 ),
+            ( mesh.vertex_colors.active, "color", 4 )
+        ):
+            if layer is not None:
+                buffer = np.empty(len(layer.data) * width, dtype=np.float32)
+                layer.data.foreach_get(attribute, buffer)
+                digest.update(buffer.tobytes())
+
+        # Hash the vertex group weights, if they are exported
+        if 'bg' in export_context['vertex groups'] or 'bw' in export_context['vertex groups']:
+            digest.update(self.get_vertex_group_triples(self.mesh).tobytes())
+
+        # Hash the vertex groups layout, and everything else that changes the encoded part
+        digest.update(json.dumps([ ENCODER_VERSION, comment, Part.get_encoding_settings() ], sort_keys=True, default=str).encode())
+
+        return digest.hexdigest()
+
+    # Get the export settings that change the encoded part
+    @staticmethod
+    def get_encoding_settings() -> dict:
 
-            # Make a dictionary key for each bone
-            bone_vertex_indices_and_weights[g.name] = []
+        return { key: export_context.get(key) for key in ENCODING_SETTINGS }
 
-            # And a convenience variable
-            working_bone = bone_vertex_indices_and_weights[g.name]
+    # PLY exporter 
+    def export_ply ( self, file_path, comment="Written from gxport" ) -> dict:
 
-            for v in object.data.vertices:
-                for vg in v.groups:
-                    if vg.group == g.index:
-                        working_bone.append((v.index, vg.weight))
+        # Read the mesh in bulk, and encode it
+        return encode_part(self.extract_arrays(), Part.get_encoding_settings(), file_path, comment)
 
-        for z in bone_vertex_indices_and_weights:
-            print(z)
+    # Get the local box of the part
+    def get_box ( self ) -> tuple:
 
         '''
-            bone_vertex_indices_and_weights now looks like
-            {
-                "bone name" : [ (1, 0.6), (2, 0.4), (3, 0.2), ... ],
-                "spine"     : [ (9, 0.2), ... ],
-                ...
-                "head"      : [ ... , (3302, 0.23), (3303, 0.34), (3304, 0.6) ]
-            }
+            Returns ( min, max ) of the part's vertices. The box is read once, and shared by 
+            every entity that links the part
         '''
-        # This exporter only writes the 4 most heavily weighted bones to each vertex
-
-        # Iterate over every vert
-        for v in object.data.vertices:
-
-            # Keep track of the 4 most heavy weights and their vertex groups
-            heaviest_groups  = [ -1, -1, -1, -1 ] 
-            heaviest_weights = [ 0, 0, 0, 0 ]
-
-            # Iterate through bones
-            for c in bone_vertex_indices_and_weights.keys():
-                d = bone_vertex_indices_and_weights[c]
-
-                for i in d:
-                    if v.index == i[0]:
-                        if i[1] > heaviest_weights[0]:
-                            heaviest_groups[0]  = object.vertex_groups[c].index
-                            heaviest_weights[0] = i[1]
-                        elif i[1] > heaviest_weights[1]:
-                            heaviest_groups[1]  = object.vertex_groups[c].index
-                            heaviest_weights[1] = i[1]
-                        elif i[1] > heaviest_weights[2]:
-                            heaviest_groups[2]  = object.vertex_groups[c].index
-                            heaviest_weights[2] = i[1]
-                        elif i[1] > heaviest_weights[3]:
-                            heaviest_groups[3]  = object.vertex_groups[c].index
-                            heaviest_weights[3] = i[1]
-                        else:
-                            None
-            bone_group_array.append(heaviest_groups)
-            bone_weight_array.append(heaviest_weights)
-
-        return (bone_group_array, bone_weight_array)
+
+        if self.box is None:
+            points   = Collider.get_points(self.mesh)
+            self.box = ( points.min(axis=0), points.max(axis=0) ) if len(points) else ( np.zeros(3), np.zeros(3) )
+
+        return self.box
+
+    # Get every ( vertex, group, weight ) triple
+    def get_vertex_group_triples(self, object) -> np.ndarray:
+
+        vertices = object.data.vertices
+
+        # Vertex group weights are not exposed as a mesh attribute, so foreach_get can not
+        # reach them. Read every ( vertex, group, weight ) element in one flat pass instead
+        elements = np.fromiter(
+            ( ( v.index, g.group, g.weight ) for v in vertices for g in v.groups ),
+            dtype=[ ( 'vertex', np.int64 ), ( 'group', np.int32 ), ( 'weight', np.float32 ) ]
+        )
+
+        triples       = np.empty((len(elements), 3), dtype=np.float64)
+        triples[:, 0] = elements['vertex']
+        triples[:, 1] = elements['group']
+        triples[:, 2] = elements['weight']
+
+        return triples
+
+    # Get the heaviest bone groups and weights of each vertex
+    def get_bone_groups_and_weights(self, object, count: int = 4):
+
+        if len(object.vertex_groups) == 0:
+            return None
+
+        # Gather every ( vertex, group, weight ) triple in one pass over the vertices
+        triples = self.get_vertex_group_triples(object)
+
+        # This exporter only writes the count most heavily weighted bones to each vertex
+        return top_influences(triples[:, 0], triples[:, 1], triples[:, 2], len(object.data.vertices), count)
 
     # Get bone names and vertex group indicies
     def get_bone_names_and_indexes(self, object):
@@ -705,19 +761,74 @@ class Part:
 
         return ret
 
-    # Writes JSON and ply to a directory 
+    # Writes JSON and mesh to a directory 
     def write_to_directory(self, directory: str):
 
+        # Linked duplicates share a part, which is only encoded once per export
+        if write_once('parts', self.registry_key) is False:
+            count_statistic('parts skipped')
+            return
+
         parts_directory = directory + "/parts/"
 
-        self.ply_path   = (parts_directory + self.name + ".ply")
+        self.mesh_path  = (parts_directory + self.name + MESH_FORMAT_EXTENSIONS[export_context['mesh format']])
         self.path       = (parts_directory + self.name + ".json")
 
-        temp_mat = self.mesh.matrix_world.copy()
-        self.export_ply(self.ply_path, "")
-        self.mesh.matrix_world = temp_mat
+        # Fingerprint the part, and look it up in the manifest
+        manifest = get_manifest(directory, "parts")
+        digest   = self.fingerprint("")
+        entry    = manifest.get(self.name)
 
-        self.write_to_file(self.path)
+        record_asset_files('parts', self.registry_key, [ self.path ])
+
+        # Skip triangulation and encoding if nothing changed since the last export
+        if entry is not None and entry.get('digest') == digest and all(os.path.exists(f) for f in entry.get('files', [])):
+            self.json_data.update(entry.get('part', { }))
+            count_statistic('parts unchanged')
+            record_asset_files('parts', self.registry_key, entry.get('files', [ ]))
+
+            self.write_to_file(self.path)
+
+            return
+
+        # Finish the part once it is encoded
+        def encoded ( result: dict ):
+
+            self.json_data.update(result['json'])
+            count_statistic('parts encoded')
+            record_asset_files('parts', self.registry_key, result['files'])
+
+            statistics = result['statistics']
+
+            # Report the vertices saved by tolerance welding
+            if 'vertices welded' in statistics:
+                print(f"[gport] [Export] [Part] \"{self.name}\" tolerance welding saved {statistics['vertices welded']} vertices")
+                count_statistic('vertices welded', statistics['vertices welded'])
+
+            # Report the steps streaming skipped
+            if 'skipped' in statistics:
+                print(f"[gport] [Export] [Part] \"{self.name}\" was streamed, skipping {', '.join(statistics['skipped'])}")
+                count_statistic('parts streamed with skipped steps')
+
+            # Report the vertex cache efficiency of the part
+            if 'acmr' in statistics:
+                print(f"[gport] [Export] [Part] \"{self.name}\" ACMR {statistics['acmr']:.3f}, ATVR {statistics['atvr']:.3f}")
+
+            # Remember the fingerprint
+            manifest[self.name] = { 'digest': digest, 'files': result['files'], 'part': result['json'] }
+
+            self.write_to_file(self.path)
+
+            return
+
+        # Extraction needs bpy, so it stays on this thread
+        arrays   = self.extract_arrays()
+
+        # Encode in the worker pool, if there is one
+        if encode_pool is not None:
+            encode_pool.submit(arrays, Part.get_encoding_settings(), self.mesh_path, "", encoded)
+        else:
+            encoded(encode_part(arrays, Part.get_encoding_settings(), self.mesh_path, ""))
         
         return
 
@@ -734,6 +845,11 @@ class Texture:
     addressing : str             = 'repeat'
     filter_mode: str             = 'linear'
     generated  : bool            = None
+    constant   : tuple           = None
+    srgb       : bool            = False
+    pixels     : np.ndarray      = None
+    packed     : tuple           = None
+    channels   : dict            = None
 
     def __init__(self, *args):
 
@@ -788,21 +904,144 @@ class Texture:
 
             self.generated = True
 
+        # Constant < r, g, b, a >, and whether it is linear color
+        elif isinstance(args[0], tuple):
+
+            self.constant  = args[0]
+            self.srgb      = len(args) > 1 and args[1] is True
+
+            # Constants are named by their value, so equal constants share a texture
+            self.name      = "constant " + self.constant_key()
+
+            self.generated = False
+
+        # Channels packed by the exporter, as ( name, ( pixels, width, height, channels ), { channel: map } )
+        elif isinstance(args[0], str):
+
+            self.name      = args[0]
+            self.packed    = args[1]
+            self.channels  = args[2]
+
+            self.generated = False
+
         self.json_data['$schema']    = "https://raw.githubusercontent.com/Jacob-C-Smith/G10-Schema/main/texture-schema.json"
         self.json_data['name']       = self.name
         
         self.json_data['addressing'] = self.addressing
         self.json_data['filter']     = self.filter_mode
 
+        # Record which map each channel of a packed texture holds
+        if self.channels is not None:
+            self.json_data['channels'] = self.channels
+
         return
 
+    # Get the hex bytes a constant is written as
+    def constant_key(self) -> str:
+
+        return quantize_pixels(np.array(self.constant, dtype=np.float32), 1, 1, 4, self.srgb).tobytes().hex()
+
+    # Read the pixels of the image
+    def read_pixels(self) -> np.ndarray:
+
+        # Read the pixels once, in bulk. This needs bpy, so it stays on this thread
+        if self.pixels is None:
+            width, height = self.image.size
+            self.pixels   = np.empty(width * height * self.image.channels, dtype=np.float32)
+            self.image.pixels.foreach_get(self.pixels)
+
+        return self.pixels
+
+    # Get the content hash of the image
+    def content_digest(self) -> str:
+
+        digest = hashlib.blake2b(digest_size=16)
+        source = bpy.path.abspath(self.image.filepath) if self.image.source == 'FILE' else ""
+
+        # Channels packed by the exporter hash their pixels
+        if self.packed is not None:
+            digest.update(json.dumps([ export_context['image format'], self.packed[1:] ]).encode())
+            digest.update(self.packed[0].tobytes())
+
+            return digest.hexdigest()
+
+        # Everything besides the image that changes the written file
+        digest.update(json.dumps([ export_context['image format'], self.image.colorspace_settings.name, self.image.alpha_mode ]).encode())
+
+        # Packed images hash their packed bytes, and unmodified images hash their file. Anything else hashes its pixels
+        if self.image.packed_file is not None:
+            digest.update(self.image.packed_file.data)
+        elif source and not self.image.is_dirty and os.path.isfile(source):
+            with open(source, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        else:
+            digest.update(np.array(self.image.size, dtype=np.int64).tobytes())
+            digest.update(self.read_pixels().tobytes())
+
+        return digest.hexdigest()
+
     # Save texture
-    def save_texture(self,  path: str):
+    def save_texture(self,  path: str, pool_directory: str = None):
+
+        # Pooled images are named by their content, so identical images share one file
+        if pool_directory is not None and ( self.packed is not None or ( self.image is not None and self.image.size[0] * self.image.size[1] > 0 )):
+            path = pool_directory + self.content_digest() + os.path.splitext(path)[1]
+
         self.path              = path
         self.json_data['path'] = self.path
 
-        if self.image is not None:
+        # Each path is written once per export. Constants are named by value, so equal constants share one
+        if write_once('textures', self.path, [ self.path ]) is False:
+            self.pixels = None
+            return
+
+        # Constants are 1x1 images
+        if self.constant is not None:
+
+            write_image(np.array(self.constant, dtype=np.float32), 1, 1, 4, self.srgb, self.srgb, self.path, export_context['image format'] if export_context['image format'] in IMAGE_ENCODERS else 'PNG')
+
+            return
+
+        # Packed channels are data, written with this exporter's encoders
+        if self.packed is not None:
+
+            if image_writer is not None:
+                image_writer.submit(*self.packed, False, False, self.path, export_context['image format'] if export_context['image format'] in IMAGE_ENCODERS else 'PNG')
+            else:
+                write_image(*self.packed, False, False, self.path, export_context['image format'] if export_context['image format'] in IMAGE_ENCODERS else 'PNG')
+
+            return
+
+        if self.image is None:
+            return
+
+        # Formats this exporter can not encode go through Blender
+        if export_context['image format'] not in IMAGE_ENCODERS:
             self.image.save_render(self.path)
+            return
+
+        width, height = self.image.size
+        channels      = self.image.channels
+
+        if width * height == 0:
+            print(f"[gport] [Export] [Texture] \"{self.name}\" has no pixels")
+            return
+
+        pixels        = self.read_pixels()
+        self.pixels   = None
+
+        # Float images hold linear color. Byte images, and data, are written as they are
+        srgb          = self.image.is_float and not self.image.colorspace_settings.is_data
+
+        # Color is written as sRGB, whether it was converted or not. Data stays linear
+        colorspace    = not self.image.colorspace_settings.is_data
+
+        # Convert and compress on the writer's threads, if there are any
+        if image_writer is not None:
+            image_writer.submit(pixels, width, height, channels, srgb, colorspace, self.path, export_context['image format'])
+        else:
+            write_image(pixels, width, height, channels, srgb, colorspace, self.path, export_context['image format'])
 
         return
         
@@ -845,6 +1084,10 @@ class Material:
     normal: Texture = None
     ao    : Texture = None
     height: Texture = None
+    orm   : Texture = None
+
+    # Values of unlinked inputs
+    factors: dict   = None
 
     def __init__(self, material: bpy.types.Material):
 
@@ -854,6 +1097,7 @@ class Material:
         self.name      = material.name
 
         self.json_data = { }
+        self.factors   = { }
 
         # Right now, only principled BSDF is supported
         if self.node_tree.nodes.find('Principled BSDF') != -1:    
@@ -885,11 +1129,10 @@ class Material:
             else:
                 print("LINKED TO NODE SETUP")
         
-        # If there are no links, make a new 1x1 image with the color in "Base Color"
+        # If there are no links, the albedo is the color in "Base Color"
         else:
             c = self.albedo_node.default_value
-            bpy.ops.image.new(name=self.name + " albedo", width=1, height=1, color=(c[0], c[1], c[2], 1.0), alpha=False, generated_type='BLANK', float=True)
-            self.albedo = Texture(bpy.data.images[self.name + " albedo"])
+            self.factors['albedo'] = [ c[0], c[1], c[2], 1.0 ]
         
         ################
         # Export rough #
@@ -909,11 +1152,9 @@ class Material:
             else:
                 print("LINKED TO NODE SETUP")
         
-        # If there are no links, make a new 1x1 image with the color in "Roughness"
+        # If there are no links, the roughness is the value in "Roughness"
         else:
-            c = self.rough_node.default_value
-            bpy.ops.image.new(name=self.name+" rough", width=1, height=1, color=(c,c,c,1.0), alpha=False, generated_type='BLANK', float=True)
-            self.rough = Texture(bpy.data.images[self.name+' rough'])
+            self.factors['rough'] = self.rough_node.default_value
         
         ################
         # Export metal #
@@ -933,11 +1174,9 @@ class Material:
             else:
                 print("LINKED TO NODE SETUP")
         
-        # If there are no links, make a new 1x1 image with the color in "Metalness"
+        # If there are no links, the metalness is the value in "Metallic"
         else:
-            c = self.metal_node.default_value
-            bpy.ops.image.new(name=self.name+" metal", width=1, height=1, color=(c,c,c,1.0), alpha=False, generated_type='BLANK', float=True)
-            self.metal = Texture(bpy.data.images[self.name+' metal'])
+            self.factors['metal'] = self.metal_node.default_value
         
         #################
         # Export normal #
@@ -1001,39 +1240,116 @@ class Material:
 
         global export_context
 
+        # Pooled textures are written to "textures/", named by their content
+        pool_directory   : str = directory + "/textures/" if export_context['texture pool'] is True else None
+
         # Make a directory for the textures
-        try:    os.mkdir(texture_directory)
-        except: pass
+        if pool_directory is None:
+            try:    os.mkdir(texture_directory)
+            except: pass
+
+        # Maps packed into the ORM texture are not written on their own
+        packed           : set = self.packed_maps()
 
         # Save the albedo texture
         if 'albedo' in export_context['material textures']:
-            if self.albedo is not None:
-                self.albedo.save_texture(texture_directory + "/albedo." + "png")
+            if self.albedo is not None and self.albedo.constant is None:
+                self.albedo.save_texture(texture_directory + "/albedo" + IMAGE_EXTENSIONS[export_context['image format']], pool_directory)
 
         # Save the rough texture
-        if 'rough' in export_context['material textures']:
-            if self.rough is not None:
-                self.rough.save_texture(texture_directory + "/rough." + "png")
+        if 'rough' in export_context['material textures'] and 'rough' not in packed:
+            if self.rough is not None and self.rough.constant is None:
+                self.rough.save_texture(texture_directory + "/rough" + IMAGE_EXTENSIONS[export_context['image format']], pool_directory)
 
         # Save the metal texture
-        if 'metal' in export_context['material textures']:
-            if self.metal is not None:
-                self.metal.save_texture(texture_directory + "/metal." + "png")
+        if 'metal' in export_context['material textures'] and 'metal' not in packed:
+            if self.metal is not None and self.metal.constant is None:
+                self.metal.save_texture(texture_directory + "/metal" + IMAGE_EXTENSIONS[export_context['image format']], pool_directory)
 
         # Save the normal texture
         if 'normal' in export_context['material textures']:
-            if self.normal is not None:
-                self.normal.save_texture(texture_directory + "/normal." + "png")
+            if self.normal is not None and self.normal.constant is None:
+                self.normal.save_texture(texture_directory + "/normal" + IMAGE_EXTENSIONS[export_context['image format']], pool_directory)
 
         # Save the ambient occlusion texture
-        if 'ao' in export_context['material textures']:
-            if self.ao is not None:
-                self.ao.save_texture(texture_directory + "/ao." + "png")
+        if 'ao' in export_context['material textures'] and 'ao' not in packed:
+            if self.ao is not None and self.ao.constant is None:
+                self.ao.save_texture(texture_directory + "/ao" + IMAGE_EXTENSIONS[export_context['image format']], pool_directory)
 
         # Save the height texture
         if 'height' in export_context['material textures']:
-            if self.height is not None:
-                self.height.save_texture(texture_directory + "/height." + "png")
+            if self.height is not None and self.height.constant is None:
+                self.height.save_texture(texture_directory + "/height" + IMAGE_EXTENSIONS[export_context['image format']], pool_directory)
+
+        # Pack maps into the channels of one texture
+        if packed:
+            self.save_orm_texture(texture_directory, pool_directory)
+
+        # Shaders that sample every map get 1x1 textures for constant inputs, shared across the export
+        if export_context['constant textures'] is True:
+            self.save_constant_textures(directory)
+
+        return
+
+    # Save constant inputs as shared 1x1 textures
+    def save_constant_textures(self, directory: str):
+
+        constant_directory: str = directory + "/textures/constants/"
+
+        # Constants are written with this exporter's encoders
+        image_format      : str = export_context['image format'] if export_context['image format'] in IMAGE_ENCODERS else 'PNG'
+
+        try:    os.mkdir(constant_directory)
+        except: pass
+
+        # The material is cached across exports, so its constants are kept apart from its maps
+        constants         : dict = constant_textures.setdefault(self.name, { })
+
+        for name, factor in self.factors.items():
+
+            if name not in export_context['material textures'] or name in self.packed_maps() or getattr(self, name) is not None:
+                continue
+
+            # Color is linear, and written as sRGB. Scalars are data
+            if name == 'albedo':
+                texture = Texture(tuple(factor), True)
+            else:
+                texture = Texture(( factor, factor, factor, 1.0 ))
+
+            texture.save_texture(constant_directory + texture.constant_key() + IMAGE_EXTENSIONS[image_format])
+
+            constants[name] = texture
+
+        return
+
+    # Get the maps packed into the ORM texture
+    def packed_maps(self) -> set:
+
+        if 'orm' not in export_context['material textures']:
+            return set()
+
+        return set(export_context['orm channels']) - { 'none' }
+
+    # Pack maps into the channels of one texture
+    def save_orm_texture(self, texture_directory: str, pool_directory: str):
+
+        # Maps with no image are constant. Missing ambient occlusion is unoccluded
+        defaults     : dict = { 'ao': 1.0, 'rough': self.factors.get('rough', 0.5), 'metal': self.factors.get('metal', 0.0), 'none': 0.0 }
+        sources      : list = [ ]
+        image_format : str  = export_context['image format'] if export_context['image format'] in IMAGE_ENCODERS else 'PNG'
+
+        for name in export_context['orm channels']:
+            texture = getattr(self, name) if name != 'none' else None
+
+            # Read each image in bulk. Its first channel is packed, resampled to the largest image
+            if texture is not None and texture.image is not None and texture.image.size[0] * texture.image.size[1] > 0:
+                sources.append(( texture.read_pixels(), texture.image.size[0], texture.image.size[1], texture.image.channels ))
+                texture.pixels = None
+            else:
+                sources.append(defaults[name])
+
+        self.orm = Texture(self.name + " orm", pack_channels(sources), { channel: name for channel, name in zip("rgb", export_context['orm channels']) })
+        self.orm.save_texture(texture_directory + "/orm" + IMAGE_EXTENSIONS[image_format], pool_directory)
 
         return
 
@@ -1043,25 +1359,25 @@ class Material:
         self.path              = path
         self.json_data['path'] = self.path
         self.json_data['textures'] = []
+
+        packed                 = self.packed_maps()
+
+        # Unlinked inputs are written as scalar and < r, g, b, a > factors
+        if self.factors:
+            self.json_data['factors'] = self.factors
         
-        if 'albedo' in export_context['material textures']:
-            if self.albedo:
-                self.json_data['textures'].append(json.loads(self.albedo.json()))
-        if 'rough' in export_context['material textures']:
-            if self.rough:
-                self.json_data['textures'].append(json.loads(self.rough.json()))
-        if 'metal' in export_context['material textures']:
-            if self.metal:
-                self.json_data['textures'].append(json.loads(self.metal.json()))
-        if 'normal' in export_context['material textures']:
-            if self.normal:
-                self.json_data['textures'].append(json.loads(self.normal.json()))
-        if 'ao' in export_context['material textures']:
-            if self.ao:
-                self.json_data['textures'].append(json.loads(self.ao.json()))
-        if 'height' in export_context['material textures']:
-            if self.height:
-                self.json_data['textures'].append(json.loads(self.height.json()))
+        # Maps without an image fall back to the constants written in this export
+        constants              = constant_textures.get(self.name, { })
+
+        for name in ( 'albedo', 'rough', 'metal', 'normal', 'ao', 'height' ):
+            if name in export_context['material textures'] and name not in packed:
+                texture = getattr(self, name) or constants.get(name)
+
+                if texture:
+                    self.json_data['textures'].append(json.loads(texture.json()))
+        if packed:
+            if self.orm:
+                self.json_data['textures'].append(json.loads(self.orm.json()))
 
         self.write_to_file(self.path)
 
@@ -1248,50 +1564,62 @@ class Collider:
     '''
 
     # Class data
+    name       : str  = None
+    obj        : bpy.types.Object = None
     dimensions : list = None
     shape      : str  = None
     convex_hull: str  = None
+    compound   : str  = None
+    fingerprint: str  = None
+    bounds     : dict = None
 
     json_data  : dict = None
 
     # Class methods
     @staticmethod
-    def calculate_bounds (object) -> list:
+    def get_points (object) -> np.ndarray:
 
-        # [ MAX, MIN ]
-        ret = [ [ 0, 0, 0 ], [ 0, 0, 0 ] ]
+        '''
+            Bulk reads the < x, y, z > of every vertex of an object's mesh
+        '''
 
-        temp_mat = object.matrix_world.copy()
+        points = np.empty(len(object.data.vertices) * 3, dtype=np.float32)
+        object.data.vertices.foreach_get("co", points)
 
-        for i in object.data.vertices:
-            
-            # Min X
-            if ret[0][0] < i.co[0]:
-                ret[0][0] = i.co[0]
-            
-            # Max X
-            if ret[1][0] > i.co[0]:
-                ret[1][0] = i.co[0]
-            
-            # Min Y
-            if ret[0][1] < i.co[1]:
-                ret[0][1] = i.co[1]
-            
-            # Max Y
-            if ret[1][1] > i.co[1]:
-                ret[1][1] = i.co[1]
-            
-            # Min Z
-            if ret[0][2] < i.co[2]:
-                ret[0][2] = i.co[2]
-            
-            # Max Z
-            if ret[1][2] > i.co[2]:
-                ret[1][2] = i.co[2]
-            
-        object.matrix_world = temp_mat
+        return points.reshape(-1, 3)
 
-        return ret
+    @staticmethod
+    def get_triangles (object) -> np.ndarray:
+
+        '''
+            Bulk reads the vertex indices of every triangle of an object's mesh
+        '''
+
+        object.data.calc_loop_triangles()
+
+        triangles = np.empty(len(object.data.loop_triangles) * 3, dtype=np.uint32)
+        object.data.loop_triangles.foreach_get("vertices", triangles)
+
+        return triangles.reshape(-1, 3)
+
+    @staticmethod
+    def get_decomposition_settings () -> dict:
+
+        return {
+            'max hulls'        : export_context['max hulls'],
+            'concavity'        : export_context['concavity'],
+            'voxel resolution' : export_context['voxel resolution'],
+            'hull max vertices': export_context['hull max vertices']
+        }
+
+    @staticmethod
+    def calculate_bounds (object) -> dict:
+
+        '''
+            Returns the bounding volumes of an object's mesh, and its world space box
+        '''
+
+        return compute_bounds(Collider.get_points(object), np.array(object.matrix_world))
 
     # Constructor
     def __init__ (self, object: bpy.types.Object):
@@ -1301,13 +1629,15 @@ class Collider:
             return
 
         # Set the shape
+        self.name  = object.name
+        self.obj   = object
         self.shape = object.rigid_body.collision_shape
 
         # Set the dimensions
 
-        z = self.calculate_bounds(object)
-        self.max = z[0]
-        self.min = z[1]
+        self.bounds = self.calculate_bounds(object)
+        self.max    = self.bounds["aabb"]["max"]
+        self.min    = self.bounds["aabb"]["min"]
 
         # TODO
 
@@ -1315,8 +1645,11 @@ class Collider:
         self.json_data               = { }
         self.json_data["$schema"]    = "https://raw.githubusercontent.com/Jacob-C-Smith/G10-Schema/main/collider-schema.json"
         self.json_data["type"]       = self.shape
+
+        # The G10 collider schema reads the box from "max" and "min", so they stay alongside "bounds"
         self.json_data["max"]        = self.max
         self.json_data["min"]        = self.min
+        self.json_data["bounds"]     = self.bounds
 
         # Write the convex hull
         if self.convex_hull is not None:
@@ -1339,6 +1672,128 @@ class Collider:
 
         return
 
+    # Writes collision geometry to a directory
+    def write_to_directory(self, directory: str):
+
+        if self.shape == 'MESH':
+            return self.write_decomposition(directory)
+
+        if self.shape != 'CONVEX_HULL':
+            return
+
+        # Each collider is written once per export
+        if write_once('colliders', self.name) is False:
+            return
+
+        file_path = directory + "/colliders/" + self.name + ".hull"
+
+        # Finish the collider once its hull is built
+        def encoded ( result: dict ):
+
+            # Flat meshes have no hull, so the collider does not point at one
+            if not result['files']:
+                print(f"[gport] [Export] [Collider] \"{self.name}\" is flat, and has no convex hull")
+                return
+
+            self.convex_hull                   = file_path
+            self.json_data["convex hull path"] = file_path
+
+            count_statistic('convex hulls')
+            record_asset_files('colliders', self.name, result['files'])
+
+            return
+
+        # Hulls are CPU bound, so they share the part encoding pool
+        arrays   = { 'xyz': Collider.get_points(self.obj) }
+        settings = { 'hull max vertices': export_context['hull max vertices'] }
+
+        if encode_pool is not None:
+            encode_pool.submit(arrays, settings, file_path, "", encoded, 'encode_convex_hull')
+        else:
+            encoded(encode_convex_hull(arrays, settings, file_path, ""))
+
+        return
+
+    # Writes a convex decomposition of a mesh collider to a directory
+    def write_decomposition(self, directory: str):
+
+        arrays   = { 'xyz': Collider.get_points(self.obj), 'faces': Collider.get_triangles(self.obj) }
+        settings = Collider.get_decomposition_settings()
+
+        # Fingerprint the mesh and the decomposition settings
+        digest   = hashlib.blake2b(digest_size=16)
+
+        digest.update(arrays['xyz'].tobytes())
+        digest.update(arrays['faces'].tobytes())
+        digest.update(json.dumps([ ENCODER_VERSION, settings ], sort_keys=True).encode())
+
+        self.fingerprint = digest.hexdigest()
+
+        # Linked duplicates share one decomposition, and each of their colliders points at it
+        record = register_asset('colliders', self.fingerprint, [ ])
+
+        record['asset'].append(self)
+
+        # Finish every collider that shares the decomposition
+        def finish ( compound: str, hull_count: int ):
+
+            for collider in record['asset']:
+                collider.compound                   = compound
+                collider.json_data["compound path"] = compound
+                collider.json_data["hull count"]    = hull_count
+
+            return
+
+        # The decomposition is already written, or being written
+        if write_once('colliders', self.fingerprint) is False:
+            if record.get('compound') is not None:
+                finish(record['compound'], record['hull count'])
+            return
+
+        mesh_name = self.obj.data.name
+        file_path = directory + "/colliders/" + mesh_name + ".compound"
+
+        # Decomposition is slow, so skip it if the mesh did not change since the last export
+        manifest = get_manifest(directory, "colliders")
+        entry    = manifest.get(mesh_name)
+
+        if entry is not None and entry.get('digest') == self.fingerprint and 'hull count' in entry and all(os.path.exists(f) for f in entry['files']):
+            count_statistic('colliders unchanged')
+            record_asset_files('colliders', self.fingerprint, entry['files'])
+
+            record['compound'], record['hull count'] = entry['files'][0], entry.get('hull count')
+            finish(record['compound'], record['hull count'])
+
+            return
+
+        # Finish the colliders once the mesh is decomposed
+        def encoded ( result: dict ):
+
+            # Meshes without volume have no decomposition, so the colliders do not point at one
+            if not result['files']:
+                print(f"[gport] [Export] [Collider] \"{mesh_name}\" has no volume, and can not be decomposed")
+                return
+
+            print(f"[gport] [Export] [Collider] \"{mesh_name}\" decomposed into {result['statistics']['hulls']} convex hulls")
+            count_statistic('convex decompositions')
+
+            # Remember the fingerprint
+            manifest[mesh_name] = { 'digest': self.fingerprint, 'files': result['files'], 'hull count': result['json']['hull count'] }
+
+            record_asset_files('colliders', self.fingerprint, result['files'])
+
+            record['compound'], record['hull count'] = result['json']['compound path'], result['json']['hull count']
+            finish(record['compound'], record['hull count'])
+
+            return
+
+        if encode_pool is not None:
+            encode_pool.submit(arrays, settings, file_path, "", encoded, 'encode_convex_decomposition')
+        else:
+            encoded(encode_convex_decomposition(arrays, settings, file_path, ""))
+
+        return
+
 class Entity:
     '''
         - Entity
@@ -1374,7 +1829,12 @@ class Entity:
                 return
         
         self.name      = object.name
-        self.part      = Part(object)
+
+        # Linked duplicates share one part
+        self.part      = get_asset('parts', Part.get_registry_key(object))
+
+        if self.part is None:
+            self.part  = Part(object)
         if len(object.material_slots) > 0:
             self.material  = materials.get(object.material_slots[0].material.name) if materials.get(object.material_slots[0].material.name) is not None else Material(object.material_slots[0].material)
         else:
@@ -1406,6 +1866,9 @@ class Entity:
         if bool(self.transform.json_data):
             self.json_data['transform'] = json.loads(self.transform.json(), parse_float=lambda x: round(float(x), 3))
 
+        # World space box of the part, for culling and placement without loading the part
+        self.json_data['world bounds'] = transform_box(*self.part.get_box(), np.array(object.matrix_world))
+
         if bool(self.rigidbody.json_data):
             self.json_data['rigidbody'] = json.loads(self.rigidbody.json())
 
@@ -1448,16 +1911,27 @@ class Entity:
 
         # Save the textures
         if self.material is not None:
-            self.material.save_textures(directory)
-        
-            # Write the material to a directory
-            self.material.save_material(material_dir + self.material.name + ".json")
+
+            # Shared materials are written once per export
+            if write_once('materials', self.material.name) is True:
+                self.material.save_textures(directory)
+            
+                # Write the material to a directory
+                self.material.save_material(material_dir + self.material.name + ".json")
+                record_asset_files('materials', self.material.name, [ self.material.path ])
+
             self.json_data["materials"] = [ self.material.path ]
         
         if self.part is not None:
             # Save the part
             self.part.write_to_directory(directory)
             self.json_data["parts"]     = [ self.part.path ]
+
+        if self.collider is not None and self.collider.json_data is not None:
+            # Save the collision geometry. Hulls are finished by the encoding workers, so the entity
+            # keeps the collider's own JSON, and is serialized once the workers are done
+            self.collider.write_to_directory(directory)
+            self.json_data["collider"]  = self.collider.json_data
         
         # Return the JSON text
         return self.json()
@@ -1697,9 +2171,15 @@ class Scene:
         try   : os.mkdir(directory + "/textures/")
         except: pass
         
+        global encode_pool, image_writer
+
         # Write entities
         if bool(self.entities) == True:
 
+            # Start the encoding workers
+            encode_pool  = EncodePool(export_context['encode workers'])
+            image_writer = ImageWriter(export_context['encode workers'])
+
             # Make an entity array in the json object
             self.json_data["entities"] = []
 
@@ -1707,13 +2187,32 @@ class Scene:
             for entity in self.entities:
 
                 # Write the entity and all its data
-                e_json = entity.write_to_directory(directory)
+                entity.write_to_directory(directory)
+
+            # Wait for the workers to finish encoding parts, colliders and textures
+            try:
+                encode_pool.shutdown()
+            finally:
+                encode_pool  = None
+
+                try:
+                    textures = image_writer.shutdown()
+                finally:
+                    image_writer = None
+
+            # Write each finished entity into the entities array
+            for entity in self.entities:
+                self.json_data["entities"].append(json.loads(entity.json()))
+
+            # Report texture throughput
+            if textures['images'] > 0:
+                print(f"[gport] [Export] [Texture] Wrote {textures['images']} textures, {textures['pixel bytes'] / 1e6:.1f} MB of pixels in {textures['seconds']:.2f} s of encoding, at {textures['throughput']:.1f} MB/s per thread")
 
-                # Write the entity path into the entities array
-                self.json_data["entities"].append(json.loads(e_json))
+                count_statistic('textures written', textures['images'])
+                export_statistics['texture throughput'] = textures['throughput']
 
-                # Destruct the entity
-                del entity
+            # Save part and collider fingerprints for the next export
+            save_manifests(directory)
 
         # Write cameras
         if bool(self.cameras) == True:
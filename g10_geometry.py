@@ -0,0 +1,2734 @@
+# 
+# GPort - Geometry
+#
+# Array kernels used to encode parts. Nothing in this file touches bpy, 
+# so every function here can run outside of Blender's main thread.
+#
+
+import numpy as np
+import os, sys, struct, shutil, tempfile, importlib, multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing    import shared_memory
+
+# Bump this whenever the encoded output changes, so fingerprinted parts are encoded again
+ENCODER_VERSION   : int   = 2
+
+# Export context keys that change the encoded output of a part
+ENCODING_SETTINGS : tuple = (
+    'vertex groups',
+    'bone influences',
+    'streaming',
+    'stream chunk size',
+    'optimize vertex cache',
+    'meshlets',
+    'meshlet max vertices',
+    'meshlet max triangles',
+    'bvh',
+    'lods',
+    'lod ratios',
+    'lod screen sizes',
+    'quantization',
+    'index format',
+    'fixed triangles',
+    'mesh format',
+    'tolerance welding',
+    'weld position epsilon',
+    'weld normal epsilon',
+    'weld uv epsilon'
+)
+
+# Entries in the post transform vertex cache the index optimizer targets
+VERTEX_CACHE_SIZE : int   = 16
+
+# Weld identical vertices
+def weld_vertices ( records: np.ndarray ) -> tuple:
+
+    '''
+        Welds identical rows of an interleaved vertex array. 
+
+        Returns ( unique rows, remap ), where unique rows are in order of first 
+        occurrence, and remap[i] is the index of row i in the unique rows
+    '''
+
+    # Nothing to weld
+    if len(records) == 0:
+        return records.copy(), np.zeros(0, dtype=np.uint32)
+
+    # View each row as a single fixed width byte record
+    raw                    = np.ascontiguousarray(records).view(np.uint8).reshape(len(records), -1)
+    keys                   = raw.view(np.dtype((np.void, raw.shape[1]))).ravel()
+
+    # Sort the records, and find the first occurrence of each unique record
+    _, first, inverse      = np.unique(keys, return_index=True, return_inverse=True)
+
+    # np.unique orders records by their bytes. Renumber them in order of first occurrence
+    order                  = np.argsort(first, kind='stable')
+    rank                   = np.empty(len(order), dtype=np.uint32)
+    rank[order]            = np.arange(len(order), dtype=np.uint32)
+
+    return records[first[order]], rank[inverse.ravel()]
+
+# Hash records
+def hash_records ( records: np.ndarray ) -> np.ndarray:
+
+    '''
+        Returns a 64 bit hash of the bytes of each row of an array of records. Equal rows have 
+        equal hashes, so a matching hash only has to be confirmed against the bytes of its row
+    '''
+
+    # Pad each row to a whole number of 64 bit words
+    raw                     = np.ascontiguousarray(records).view(np.uint8).reshape(len(records), -1)
+    words                   = np.zeros(( len(raw), -(-raw.shape[1] // 8) * 8 ), dtype=np.uint8)
+    words[:, :raw.shape[1]] = raw
+
+    # Mix in one word at a time
+    hashes                  = np.full(len(raw), 0xcbf29ce484222325, dtype=np.uint64)
+
+    for word in words.view(np.uint64).T:
+        hashes = ( hashes ^ word ) * np.uint64(0x100000001b3)
+        hashes = hashes ^ ( hashes >> np.uint64(29) )
+
+    return hashes
+
+# Vertex groups welded within a tolerance, and the export context key of each tolerance
+WELD_TOLERANCES   : tuple = (
+    ( 'xyz' , 'weld position epsilon' ),
+    ( 'nxyz', 'weld normal epsilon'   ),
+    ( 'uv'  , 'weld uv epsilon'       ),
+)
+
+# Offsets of a cell and half of its 26 neighbours. The other half are found from the other side
+NEIGHBOR_CELLS    : np.ndarray = np.stack(np.meshgrid(*( [ np.arange(-1, 2) ] * 3 ), indexing='ij'), axis=-1).reshape(-1, 3)[13:]
+
+# Hash integer cell coordinates
+def hash_cells ( cells: np.ndarray ) -> np.ndarray:
+
+    '''
+        Returns a 64 bit spatial hash of each row of < i, j, k > cell coordinates. Collisions 
+        only add candidates, so they do not need to be resolved
+    '''
+
+    cells = cells.astype(np.int64)
+
+    return ( cells[..., 0] * 73856093 ) ^ ( cells[..., 1] * 19349663 ) ^ ( cells[..., 2] * 83492791 )
+
+# Get the weld tolerances
+def weld_tolerances ( settings: dict ) -> dict:
+
+    '''
+        Returns the tolerance of each vertex group welded within a tolerance
+    '''
+
+    return { name: float(settings[key]) for name, key in WELD_TOLERANCES }
+
+# Weld vertices within a tolerance
+def weld_within_tolerance ( vertices: np.ndarray, tolerances: dict ) -> tuple:
+
+    '''
+        Welds vertices whose vertex groups are each within a distance of one another, and 
+        whose other vertex groups are identical. tolerances maps vertex groups to distances. 
+
+        Candidates are found through a spatial hash of positions, with cells as wide as the 
+        position tolerance, and each vertex is compared against the vertices in its own and 
+        neighbouring cells. Pairs are merged with a union find, so welds chain, and every 
+        vertex is welded to the first vertex of its set. 
+
+        Returns ( welded vertices, remap ), like weld_vertices
+    '''
+
+    tolerances             = { name: tolerance for name, tolerance in tolerances.items() if name in vertices.dtype.names }
+    epsilon                = tolerances.get('xyz', 0.0)
+
+    # Positions have to be within a tolerance for anything to weld
+    if len(vertices) < 2 or epsilon <= 0.0:
+        return vertices, np.arange(len(vertices), dtype=np.uint32)
+
+    # Everything that has to match exactly
+    exact                  = vertices.copy()
+
+    for name in tolerances:
+        exact[name] = 0
+
+    raw                    = np.ascontiguousarray(exact).view(np.uint8).reshape(len(exact), -1)
+    _, exact               = np.unique(raw.view(np.dtype((np.void, raw.shape[1]))).ravel(), return_inverse=True)
+    exact                  = exact.ravel()
+
+    # Sort vertices by the hash of their cell
+    cells                  = np.floor(vertices['xyz'] / epsilon).astype(np.int64)
+    keys                   = hash_cells(cells)
+    order                  = np.argsort(keys, kind='stable')
+    sorted_keys            = keys[order]
+
+    # The range of sorted vertices in the cell of each vertex, and in half of its neighbours
+    neighbors              = hash_cells(cells[:, None, :] + NEIGHBOR_CELLS[None])
+    starts                 = np.searchsorted(sorted_keys, neighbors, side='left' ).ravel()
+    counts                 = np.searchsorted(sorted_keys, neighbors, side='right').ravel() - starts
+
+    # Every candidate pair
+    first                  = np.repeat(np.repeat(np.arange(len(vertices)), len(NEIGHBOR_CELLS)), counts)
+    second                 = order[np.repeat(starts - ( np.cumsum(counts) - counts ), counts) + np.arange(counts.sum())]
+    keep                   = ( first != second ) & ( exact[first] == exact[second] )
+    first, second          = first[keep], second[keep]
+
+    # Keep the pairs that are within every tolerance
+    for name, tolerance in tolerances.items():
+        distance      = np.linalg.norm(vertices[name][first].astype(np.float64) - vertices[name][second], axis=-1)
+        keep          = distance <= tolerance
+        first, second = first[keep], second[keep]
+
+    # Union find. Each vertex points at the lowest vertex it is connected to
+    parent                 = np.arange(len(vertices))
+
+    while True:
+        low            = np.minimum(parent[first], parent[second])
+        updated        = parent.copy()
+
+        np.minimum.at(updated, first , low)
+        np.minimum.at(updated, second, low)
+
+        # Compress paths
+        updated        = updated[updated]
+
+        if np.array_equal(updated, parent):
+            break
+
+        parent         = updated
+
+    # Number the sets in order of their first vertex
+    roots                  = np.flatnonzero(parent == np.arange(len(vertices)))
+    rank                   = np.empty(len(vertices), dtype=np.uint32)
+    rank[roots]            = np.arange(len(roots), dtype=np.uint32)
+
+    return vertices[roots], rank[parent]
+
+# Vertex groups, in the order they are written, as ( vertex group, PLY properties, PLY type )
+PLY_VERTEX_GROUPS : tuple = (
+    ( 'xyz' , ( 'x'  , 'y'    , 'z'            ), 'float' ),
+    ( 'uv'  , ( 's'  , 't'                     ), 'float' ),
+    ( 'nxyz', ( 'nx' , 'ny'   , 'nz'           ), 'float' ),
+    ( 'txyz', ( 'tx' , 'ty'   , 'tz'           ), 'float' ),
+    ( 'bxyz', ( 'bx' , 'by'   , 'bz'           ), 'float' ),
+    ( 'rgba', ( 'red', 'green', 'blue', 'alpha'), 'uchar' ),
+    ( 'bg'  , ( 'b0' , 'b1'   , 'b2'  , 'b3'   ), 'uchar' ),
+    ( 'bw'  , ( 'w0' , 'w1'   , 'w2'  , 'w3'   ), 'uchar' ),
+)
+
+# Bone groups a uchar bone group property can index. Rigs with more are written as ushort
+BONE_GROUP_LIMIT  : int   = 256
+
+# Vertex groups with one component per bone influence, and their PLY property prefixes
+PLY_INFLUENCE_PREFIXES : dict = {
+    'bg' : 'b',
+    'bw' : 'w'
+}
+
+# PLY property types, and their little endian NumPy equivalents
+PLY_TYPES : dict = {
+    'char'  : 'i1',
+    'uchar' : 'u1',
+    'short' : '<i2',
+    'ushort': '<u2',
+    'int'   : '<i4',
+    'uint'  : '<u4',
+    'half'  : '<f2',
+    'float' : '<f4',
+    'double': '<f8'
+}
+
+# NumPy types, and the PLY property types they are written as
+PLY_TYPE_NAMES : dict = { np.dtype(numpy_type): ply_type for ply_type, numpy_type in PLY_TYPES.items() }
+
+# Properties of octahedral encoded vertex groups. A tangent's third component is its handedness
+PLY_OCTAHEDRAL_PROPERTIES : dict = {
+    'nxyz' : ( 'nu', 'nv' ),
+    'txyz' : ( 'tu', 'tv', 'tw' ),
+    'bxyz' : ( 'bu', 'bv' )
+}
+
+# Vertex group encodings of each quantization profile
+QUANTIZATION_PROFILES : dict = {
+    'NONE'     : { },
+    'BALANCED' : { 'xyz': 'half'   , 'uv': 'unorm16', 'nxyz': 'oct16', 'txyz': 'oct16', 'bxyz': 'oct16' },
+    'COMPACT'  : { 'xyz': 'unorm16', 'uv': 'unorm16', 'nxyz': 'oct8' , 'txyz': 'oct8' , 'bxyz': 'oct8'  }
+}
+
+# PLY type each quantized encoding is written as
+QUANTIZED_TYPES : dict = {
+    'half'    : 'half',
+    'unorm16' : 'ushort',
+    'oct16'   : 'short',
+    'oct8'    : 'char'
+}
+
+# One triangle of a "property list uchar uint vertex_indices" face element
+PLY_FACE_DTYPE    : np.dtype = np.dtype([ ( 'count', 'u1' ), ( 'vertex_indices', '<u4', (3,) ) ])
+
+# Properties of a fixed size "element triangle", written without a count byte
+PLY_TRIANGLE_PROPERTIES : tuple = ( 'v0', 'v1', 'v2' )
+
+# Vertices a 16 bit index can address
+INDEX_16_LIMIT    : int   = 65536
+
+# Export context keys of steps that need the whole part, so streamed parts skip them
+STREAMING_SKIPPED : tuple = (
+    ( 'optimize vertex cache', 'vertex cache optimization' ),
+    ( 'meshlets'             , 'meshlets'                  ),
+    ( 'bvh'                  , 'BVH'                       ),
+    ( 'lods'                 , 'levels of detail'          )
+)
+
+# File extension of each mesh format
+MESH_FORMAT_EXTENSIONS : dict = {
+    'PLY'     : '.ply',
+    'G10MESH' : '.g10mesh'
+}
+
+# .g10mesh header. Magic, version, stream count, vertex count, vertex stride, index count, 
+# index size, reserved, vertex section offset, index section offset
+G10MESH_HEADER    : struct.Struct = struct.Struct('<4s7I2Q')
+
+# .g10mesh stream table entry. Name, format, components, file offset, stride, reserved, 
+# dequantization scale, dequantization bias
+G10MESH_STREAM    : struct.Struct = struct.Struct('<8s2IQ2I4f4f')
+
+# Sections of a .g10mesh file start on multiples of this many bytes
+G10MESH_ALIGNMENT : int   = 16
+
+# Stream formats of a .g10mesh file
+G10MESH_FORMATS   : dict  = {
+    'float32' : 0,
+    'float16' : 1,
+    'unorm16' : 2,
+    'snorm16' : 3,
+    'snorm8'  : 4,
+    'unorm8'  : 5,
+    'uint8'   : 6,
+    'uint16'  : 7
+}
+
+# Convex hull file header. Magic, version, vertex count, triangle count
+HULL_HEADER       : struct.Struct = struct.Struct('<4s3I')
+
+# Compound collider file header. Magic, version, hull count. Each hull follows as a hull file
+COMPOUND_HEADER   : struct.Struct = struct.Struct('<4s2I')
+
+# Get the PLY properties of a vertex group
+def ply_vertex_properties ( name: str, properties: tuple, bone_influences: int ) -> tuple:
+
+    '''
+        Returns the PLY property names of a vertex group
+    '''
+
+    # Bone groups and weights have one property per influence
+    if name in PLY_INFLUENCE_PREFIXES:
+        return tuple(f"{PLY_INFLUENCE_PREFIXES[name]}{i}" for i in range(bone_influences))
+
+    return properties
+
+# Check if bone groups need a wide type
+def wide_bone_groups ( arrays: dict ) -> bool:
+
+    '''
+        Returns True if the bone group indices of arrays do not fit in a uchar
+    '''
+
+    if arrays.get('bg') is None or arrays['bg'].size == 0:
+        return False
+
+    largest = int(arrays['bg'].max())
+
+    if largest >= 65536:
+        raise ValueError(f"Bone group index {largest} does not fit in a ushort")
+
+    return largest >= BONE_GROUP_LIMIT
+
+# Make a vertex record type
+def ply_vertex_dtype ( vertex_groups: list, bone_influences: int = 4, wide_groups: bool = False ) -> np.dtype:
+
+    '''
+        Returns a packed structured dtype with one field for each enabled vertex group. 
+        Bone groups are ushort when wide_groups is True
+    '''
+
+    fields : list = [ ]
+
+    # Each vertex group is a field of one or more components
+    for name, properties, ply_type in PLY_VERTEX_GROUPS:
+        if name in vertex_groups:
+            if name == 'bg' and wide_groups:
+                ply_type = 'ushort'
+
+            fields.append( ( name, PLY_TYPES[ply_type], ( len(ply_vertex_properties(name, properties, bone_influences)), ) ) )
+
+    return np.dtype(fields)
+
+# Make a PLY header
+def ply_header ( vertex_dtype: np.dtype, vertex_count: int, face_count: int, comment: str = None, count_width: int = 0, quantization: dict = None, index_type: str = 'uint', fixed_triangles: bool = False ) -> bytes:
+
+    '''
+        Returns the text header of a binary PLY file. Element counts are zero padded 
+        to count_width digits, so a header can be patched in place once the counts are known
+    '''
+
+    header : bytes = b"ply\n" b"format binary_little_endian 1.0\n"
+
+    if comment is not None:
+        header += b"comment " + bytes(comment, 'ascii') + b"\n"
+
+    # Describe how to decode each quantized vertex group
+    for name, encoding in (quantization or { }).items():
+        header += b"comment quantization " + bytes(quantization_description(name, encoding), 'ascii') + b"\n"
+
+    # Vertex element
+    header += b"element vertex %0*d\n" % ( count_width, vertex_count )
+
+    for name, properties, _ in PLY_VERTEX_GROUPS:
+        if name in vertex_dtype.names:
+            ply_type   = PLY_TYPE_NAMES[vertex_dtype[name].base]
+            components = vertex_dtype[name].shape[0]
+
+            # Octahedral encoded directions have two components, and maybe a handedness
+            if name in PLY_OCTAHEDRAL_PROPERTIES and vertex_dtype[name].base.kind == 'i':
+                properties = PLY_OCTAHEDRAL_PROPERTIES[name][:components]
+
+            for p in ply_vertex_properties(name, properties, components):
+                header += b"property %s %s\n" % ( bytes(ply_type, 'ascii'), bytes(p, 'ascii') )
+
+    # Triangle element, three indices and no count
+    if fixed_triangles:
+        header += b"element triangle %0*d\n" % ( count_width, face_count )
+
+        for p in PLY_TRIANGLE_PROPERTIES:
+            header += b"property %s %s\n" % ( bytes(index_type, 'ascii'), bytes(p, 'ascii') )
+
+    # Face element
+    else:
+        header += b"element face %0*d\n" % ( count_width, face_count )
+        header += b"property list uchar %s vertex_indices\n" % bytes(index_type, 'ascii')
+
+    header += b"end_header\n"
+
+    return header
+
+# Write a PLY file
+def write_ply ( file_path: str, vertices: np.ndarray, faces: np.ndarray, comment: str = None, quantization: dict = None, fixed_triangles: bool = False ):
+
+    '''
+        Writes a structured vertex array and a ( n, 3 ) index array to a binary PLY file. 
+        Indices are written with the type of faces
+    '''
+
+    # Index type
+    faces = np.asarray(faces)
+    faces = faces.astype(faces.dtype.newbyteorder('<'), copy=False)
+
+    # Build the face block as one record array
+    if fixed_triangles:
+        face_records                   = np.ascontiguousarray(faces.reshape(-1, 3))
+    else:
+        face_records                   = np.empty(len(faces), dtype=[ ( 'count', 'u1' ), ( 'vertex_indices', faces.dtype, (3,) ) ])
+        face_records['count']          = 3
+        face_records['vertex_indices'] = faces
+
+    with open(file_path, "wb") as file:
+
+        # Write the header
+        file.write(ply_header(vertices.dtype, len(vertices), len(face_records), comment, quantization=quantization, index_type=PLY_TYPE_NAMES[faces.dtype], fixed_triangles=fixed_triangles))
+
+        # Write each block in one call
+        file.write(np.ascontiguousarray(vertices).tobytes())
+        file.write(face_records.tobytes())
+
+    return
+
+# Stream format of a vertex group
+def g10mesh_stream_format ( name: str, field: np.dtype ) -> int:
+
+    '''
+        Returns the .g10mesh format of a vertex record field
+    '''
+
+    # Bone groups are indices, every other integer type is normalized
+    if name == 'bg':
+        return G10MESH_FORMATS['uint16' if field.base.itemsize == 2 else 'uint8']
+
+    return G10MESH_FORMATS[{
+        'f4' : 'float32',
+        'f2' : 'float16',
+        'u2' : 'unorm16',
+        'i2' : 'snorm16',
+        'i1' : 'snorm8',
+        'u1' : 'unorm8'
+    }[field.base.str[1:]]]
+
+# Round up to a multiple
+def align ( offset: int, alignment: int ) -> int:
+
+    '''
+        Returns offset rounded up to a multiple of alignment
+    '''
+
+    return ( offset + alignment - 1 ) // alignment * alignment
+
+# Make a .g10mesh header
+def g10mesh_header ( vertex_dtype: np.dtype, vertex_count: int, index_count: int, index_size: int, quantization: dict = None ) -> tuple:
+
+    '''
+        Returns ( header, index offset ) of a .g10mesh file. The header is the fixed size header 
+        and the stream table, padded to the start of the vertex section. Every vertex group is 
+        a stream into the interleaved vertex section. A stream's scale and bias dequantize it, 
+        and are 1 and 0 when it is not quantized
+    '''
+
+    # Section offsets
+    vertex_offset = align(G10MESH_HEADER.size + G10MESH_STREAM.size * len(vertex_dtype.names), G10MESH_ALIGNMENT)
+    index_offset  = align(vertex_offset + vertex_count * vertex_dtype.itemsize, G10MESH_ALIGNMENT)
+
+    header        = G10MESH_HEADER.pack(b"G10M", 1, len(vertex_dtype.names), vertex_count, vertex_dtype.itemsize, index_count, index_size, 0, vertex_offset, index_offset)
+
+    # Stream table
+    for name in vertex_dtype.names:
+        field, offset = vertex_dtype.fields[name]
+        encoding      = ( quantization or { } ).get(name, { })
+        scale         = ( list(encoding.get('scale', [ ])) + [ 1.0 ] * 4 )[:4]
+        bias          = ( list(encoding.get('bias' , [ ])) + [ 0.0 ] * 4 )[:4]
+
+        header       += G10MESH_STREAM.pack(bytes(name, 'ascii'), g10mesh_stream_format(name, field), field.shape[0], vertex_offset + offset, vertex_dtype.itemsize, 0, *scale, *bias)
+
+    return header + bytes(vertex_offset - len(header)), index_offset
+
+# Write a .g10mesh file
+def write_g10mesh ( file_path: str, vertices: np.ndarray, faces: np.ndarray, quantization: dict = None ):
+
+    '''
+        Writes a structured vertex array and a ( n, 3 ) index array to a .g10mesh file, 
+        which the engine can map and upload without parsing. Indices are written with 
+        the type of faces
+    '''
+
+    # Index type
+    faces                = np.asarray(faces)
+    indices              = np.ascontiguousarray(faces.astype(faces.dtype.newbyteorder('<'), copy=False)).ravel()
+
+    header, index_offset = g10mesh_header(vertices.dtype, len(vertices), len(indices), indices.itemsize, quantization)
+
+    with open(file_path, "wb") as file:
+
+        # Write the header, the vertex section, and the index section
+        file.write(header)
+        file.write(np.ascontiguousarray(vertices).tobytes())
+        file.write(bytes(index_offset - file.tell()))
+        file.write(indices.tobytes())
+
+        # Pad the end of the index section
+        file.write(bytes(align(file.tell(), G10MESH_ALIGNMENT) - file.tell()))
+
+    return
+
+# Write a mesh
+def write_mesh ( file_path: str, vertices: np.ndarray, faces: np.ndarray, settings: dict, comment: str = None, quantization: dict = None ):
+
+    '''
+        Writes vertices and faces in the mesh format chosen in settings
+    '''
+
+    if settings['mesh format'] == 'G10MESH':
+        write_g10mesh(file_path, vertices, faces, quantization)
+    else:
+        write_ply(file_path, vertices, faces, comment, quantization, settings['fixed triangles'] is True)
+
+    return
+
+# Compute a tangent space for each vertex
+def compute_tangents ( triangle_positions: np.ndarray, triangle_uvs: np.ndarray, faces: np.ndarray, normals: np.ndarray ) -> tuple:
+
+    '''
+        Computes per vertex tangents and bitangents for an indexed triangle list.
+
+        triangle_positions is ( n, 3, 3 ), triangle_uvs is ( n, 3, 2 ), faces is the ( n, 3 )
+        index array, and normals is ( vertex count, 3 ). Returns ( tangents, bitangents ).
+    '''
+
+    vertex_count : int = len(normals)
+
+    # Compute the edges 
+    edge1               = (triangle_positions[:, 1] - triangle_positions[:, 0]).astype(np.float64)
+    edge2               = (triangle_positions[:, 2] - triangle_positions[:, 0]).astype(np.float64)
+
+    # Compute the difference in UVs
+    delta1              = (triangle_uvs[:, 1] - triangle_uvs[:, 0]).astype(np.float64)
+    delta2              = (triangle_uvs[:, 2] - triangle_uvs[:, 0]).astype(np.float64)
+
+    # Compute the determinant. Triangles with no UV area have no tangent space 
+    determinant         = delta1[:, 0] * delta2[:, 1] - delta2[:, 0] * delta1[:, 1]
+    degenerate          = np.abs(determinant) < 1e-20
+    inverse_determinant = np.where(degenerate, 0.0, 1.0 / np.where(degenerate, 1.0, determinant))
+
+    # Construct the < tx, ty, tz > and < bx, by, bz > vectors of each face
+    t = inverse_determinant[:, None] * ( delta2[:, 1, None] * edge1 - delta1[:, 1, None] * edge2)
+    b = inverse_determinant[:, None] * (-delta2[:, 0, None] * edge1 + delta1[:, 0, None] * edge2)
+
+    # Accumulate the face vectors onto each vertex of the face
+    corners    = faces.ravel()
+    tangents   = np.empty((vertex_count, 3), dtype=np.float64)
+    bitangents = np.empty((vertex_count, 3), dtype=np.float64)
+
+    for i in range(3):
+        tangents[:, i]   = np.bincount(corners, weights=np.repeat(t[:, i], 3), minlength=vertex_count)
+        bitangents[:, i] = np.bincount(corners, weights=np.repeat(b[:, i], 3), minlength=vertex_count)
+
+    # Normalize the normals, falling back to < 0, 0, 1 > 
+    n                  = normals.astype(np.float64)
+    length             = np.linalg.norm(n, axis=1)
+    n                  = np.where(length[:, None] > 1e-12, n / np.maximum(length, 1e-12)[:, None], [ 0.0, 0.0, 1.0 ])
+
+    # Gram-Schmidt orthogonalize the tangent against the normal
+    tangents          -= n * np.einsum('ij,ij->i', n, tangents)[:, None]
+    length             = np.linalg.norm(tangents, axis=1)
+
+    # Vertices with no usable tangent get any vector perpendicular to the normal
+    fallback           = length <= 1e-12
+
+    if fallback.any():
+        axis                     = np.where(np.abs(n[fallback, 0:1]) < 0.9, [ 1.0, 0.0, 0.0 ], [ 0.0, 1.0, 0.0 ])
+        axis                    -= n[fallback] * np.einsum('ij,ij->i', n[fallback], axis)[:, None]
+        tangents[fallback]       = axis
+        length[fallback]         = np.linalg.norm(axis, axis=1)
+
+    tangents          /= length[:, None]
+
+    # The handedness of the tangent space
+    cross              = np.cross(n, tangents)
+    handedness         = np.where(np.einsum('ij,ij->i', cross, bitangents) < 0.0, -1.0, 1.0)
+
+    # Rebuild the bitangent from the normal, the tangent and the handedness
+    bitangents         = cross * handedness[:, None]
+
+    return tangents.astype(np.float32), bitangents.astype(np.float32)
+
+# Select the heaviest bone influences of each vertex
+def top_influences ( vertex_indices: np.ndarray, group_indices: np.ndarray, weights: np.ndarray, vertex_count: int, count: int = 4 ) -> tuple:
+
+    '''
+        Picks the count heaviest ( group, weight ) pairs of each vertex from flat arrays of 
+        ( vertex, group, weight ) triples, and renormalizes the weights to sum to one.
+
+        Returns ( groups, weights ), each ( vertex count, count ). Empty slots have group -1 and weight 0
+    '''
+
+    vertex_indices = np.asarray(vertex_indices, dtype=np.int64)
+    group_indices  = np.asarray(group_indices , dtype=np.int32)
+    weights        = np.asarray(weights       , dtype=np.float32)
+
+    # Influences with no weight are ignored
+    keep           = weights > 0.0
+    vertex_indices = vertex_indices[keep]
+    group_indices  = group_indices[keep]
+    weights        = weights[keep]
+
+    # Group the triples by vertex
+    order          = np.argsort(vertex_indices, kind='stable')
+    vertex_indices = vertex_indices[order]
+    group_indices  = group_indices[order]
+    weights        = weights[order]
+
+    # The slot of each triple within its vertex
+    totals         = np.bincount(vertex_indices, minlength=vertex_count)
+    starts         = np.concatenate(( [ 0 ], np.cumsum(totals)[:-1] ))
+    slots          = np.arange(len(vertex_indices)) - starts[vertex_indices]
+
+    # Scatter the triples into a dense ( vertex count, widest vertex ) table
+    width          = max(int(totals.max()) if vertex_count > 0 else 0, count)
+    dense_groups   = np.full((vertex_count, width), -1, dtype=np.int32)
+    dense_weights  = np.zeros((vertex_count, width), dtype=np.float32)
+
+    dense_groups[vertex_indices, slots]  = group_indices
+    dense_weights[vertex_indices, slots] = weights
+
+    # Partition the count heaviest influences to the front of each row
+    if width > count:
+        heaviest      = np.argpartition(-dense_weights, count - 1, axis=1)[:, :count]
+        dense_groups  = np.take_along_axis(dense_groups , heaviest, axis=1)
+        dense_weights = np.take_along_axis(dense_weights, heaviest, axis=1)
+
+    # Order the remaining influences from heaviest to lightest
+    heaviest      = np.argsort(-dense_weights, axis=1, kind='stable')
+    dense_groups  = np.take_along_axis(dense_groups , heaviest, axis=1)
+    dense_weights = np.take_along_axis(dense_weights, heaviest, axis=1)
+
+    # Renormalize
+    total         = dense_weights.sum(axis=1, keepdims=True)
+    dense_weights = np.divide(dense_weights, total, out=np.zeros_like(dense_weights), where=total > 0.0)
+
+    return dense_groups, dense_weights
+
+# Compute quantization ranges
+def quantization_parameters ( arrays: dict, settings: dict ) -> dict:
+
+    '''
+        Returns the encoding of each vertex group the profile in settings['quantization'] 
+        quantizes. Positions and texture coordinates carry a per part scale and bias, so 
+        that value = normalized * scale + bias, where normalized is in [ -1, 1 ] for half 
+        floats and [ 0, 1 ] for unorm16
+    '''
+
+    # Initialized data
+    vertex_groups : list = settings['vertex groups']
+    profile       : dict = QUANTIZATION_PROFILES[settings['quantization']]
+    quantization  : dict = { }
+
+    for name, source in ( ( 'xyz', 'xyz' ), ( 'uv', 'uv' ) ):
+
+        if name not in vertex_groups or name not in profile or arrays.get(source) is None or len(arrays[source]) == 0:
+            continue
+
+        # Bounds of the vertex group over the whole part
+        lower    = arrays[source].min(axis=0).astype(np.float64)
+        upper    = arrays[source].max(axis=0).astype(np.float64)
+        encoding = profile[name]
+
+        # Half floats are centered on [ -1, 1 ], unorm16 spans [ 0, 1 ]
+        if encoding == 'half':
+            scale, bias = ( upper - lower ) * 0.5, ( upper + lower ) * 0.5
+        else:
+            scale, bias = upper - lower, lower
+
+        quantization[name] = { 'encoding': encoding, 'scale': scale.tolist(), 'bias': bias.tolist() }
+
+    for name in ( 'nxyz', 'txyz', 'bxyz' ):
+        if name in vertex_groups and name in profile:
+            quantization[name] = { 'encoding': profile[name] }
+
+    # With a normal and a tangent, a bitangent is only a handedness, stored in the tangent
+    if 'bxyz' in quantization and 'txyz' in quantization and 'nxyz' in vertex_groups:
+        quantization['bxyz'] = { 'encoding': 'handedness' }
+
+    return quantization
+
+# Describe a quantized vertex group
+def quantization_description ( name: str, encoding: dict ) -> str:
+
+    '''
+        Returns a PLY comment describing how to decode a quantized vertex group
+    '''
+
+    description = f"{name} {encoding['encoding']}"
+
+    if 'scale' in encoding:
+        description += " scale " + " ".join(map(repr, encoding['scale'])) + " bias " + " ".join(map(repr, encoding['bias']))
+
+    return description
+
+# Make a quantized vertex record type
+def quantized_vertex_dtype ( vertex_dtype: np.dtype, quantization: dict ) -> np.dtype:
+
+    '''
+        Returns the packed vertex record type of vertices quantized with quantization
+    '''
+
+    fields : list = [ ]
+
+    for name in vertex_dtype.names:
+        encoding = quantization.get(name, { }).get('encoding')
+
+        # Not quantized
+        if encoding is None:
+            fields.append( ( name, vertex_dtype[name].base, vertex_dtype[name].shape ) )
+
+        # Folded into the tangent
+        elif encoding == 'handedness':
+            continue
+
+        # Octahedral directions are two components, and a tangent may carry a handedness
+        elif encoding.startswith('oct'):
+            components = 3 if name == 'txyz' and quantization.get('bxyz', { }).get('encoding') == 'handedness' else 2
+            fields.append( ( name, PLY_TYPES[QUANTIZED_TYPES[encoding]], ( components, ) ) )
+
+        else:
+            fields.append( ( name, PLY_TYPES[QUANTIZED_TYPES[encoding]], vertex_dtype[name].shape ) )
+
+    return np.dtype(fields)
+
+# Octahedral encode unit vectors
+def octahedral_encode ( directions: np.ndarray ) -> np.ndarray:
+
+    '''
+        Maps ( n, 3 ) unit vectors onto the [ -1, 1 ] square of an unfolded octahedron
+    '''
+
+    directions = np.asarray(directions, dtype=np.float64)
+    length     = np.abs(directions).sum(axis=1, keepdims=True)
+    projected  = np.divide(directions[:, :2], length, out=np.zeros((len(directions), 2)), where=length > 0.0)
+
+    # Fold the lower hemisphere over the diagonals
+    lower            = directions[:, 2] < 0.0
+    folded           = ( 1.0 - np.abs(projected[lower][:, ::-1]) ) * np.where(projected[lower] >= 0.0, 1.0, -1.0)
+    projected[lower] = folded
+
+    return projected
+
+# Quantize vertices
+def quantize_vertices ( vertices: np.ndarray, quantization: dict ) -> np.ndarray:
+
+    '''
+        Returns vertices encoded as described by quantization_parameters
+    '''
+
+    # Nothing to quantize
+    if not quantization:
+        return vertices
+
+    quantized = np.empty(len(vertices), dtype=quantized_vertex_dtype(vertices.dtype, quantization))
+
+    for name in quantized.dtype.names:
+        encoding = quantization.get(name, { }).get('encoding')
+        values   = vertices[name].astype(np.float64)
+
+        # Not quantized
+        if encoding is None:
+            quantized[name] = vertices[name]
+
+        # Scale and bias into [ -1, 1 ]
+        elif encoding == 'half':
+            scale           = np.asarray(quantization[name]['scale'])
+            quantized[name] = np.divide(values - quantization[name]['bias'], scale, out=np.zeros_like(values), where=scale > 0.0)
+
+        # Scale and bias into [ 0, 65535 ]
+        elif encoding == 'unorm16':
+            scale           = np.asarray(quantization[name]['scale'])
+            normalized      = np.divide(values - quantization[name]['bias'], scale, out=np.zeros_like(values), where=scale > 0.0)
+            quantized[name] = np.rint(np.clip(normalized, 0.0, 1.0) * 65535.0)
+
+        # Octahedral snorm directions
+        else:
+            largest                  = float(np.iinfo(quantized[name].dtype).max)
+            encoded                  = octahedral_encode(values)
+            quantized[name][:, :2]   = np.rint(np.clip(encoded, -1.0, 1.0) * largest)
+
+            # The handedness of the tangent frame, in place of the bitangent
+            if quantized[name].shape[1] == 3:
+                handedness           = np.einsum('ij,ij->i', np.cross(vertices['nxyz'], vertices['txyz']), vertices['bxyz'])
+                quantized[name][:, 2] = np.where(handedness < 0.0, -largest, largest)
+
+    return quantized
+
+# Assemble face corners
+def build_corners ( arrays: dict, settings: dict, first: int = 0, last: int = None, wide_groups: bool = None ) -> np.ndarray:
+
+    '''
+        Returns one interleaved vertex record for each corner of triangles [ first, last ), 
+        with a field for each vertex group enabled in settings. Tangents and bitangents are 
+        left at zero, so they do not take part in welding. Callers encoding in chunks pass 
+        wide_groups, so the bone groups are not searched for every chunk
+    '''
+
+    vertex_groups   : list = settings['vertex groups']
+
+    if wide_groups is None:
+        wide_groups = wide_bone_groups(arrays)
+
+    # Vertex and loop index of every face corner
+    corner_vertices = arrays['triangle vertices'][first:last].ravel()
+    corner_loops    = arrays['triangle loops'][first:last].ravel()
+
+    # One record per face corner
+    corners         = np.zeros(len(corner_vertices), dtype=ply_vertex_dtype(vertex_groups, settings['bone influences'], wide_groups))
+
+    # < x, y, z > of each corner
+    if 'xyz' in vertex_groups:
+        corners['xyz']  = arrays['xyz'][corner_vertices]
+
+    # < s, t > of each corner
+    if 'uv' in vertex_groups:
+        corners['uv']   = arrays['uv'][corner_loops]
+
+    # < nx, ny, nz > of each corner
+    if 'nxyz' in vertex_groups:
+        corners['nxyz'] = arrays['nxyz'][corner_vertices]
+
+    # < r, g, b, a > of each corner
+    if 'rgba' in vertex_groups:
+        corners['rgba'] = np.rint(np.clip(arrays['rgba'][corner_loops], 0.0, 1.0) * 255.0)
+
+    # < g0, g1, ... > of each corner. Empty slots are written as group 0 with no weight
+    if 'bg' in vertex_groups and arrays.get('bg') is not None:
+        corners['bg']   = np.maximum(arrays['bg'][corner_vertices], 0)
+
+    # < w0, w1, ... > of each corner, as unsigned normalized bytes
+    if 'bw' in vertex_groups and arrays.get('bw') is not None:
+        corners['bw']   = np.rint(np.clip(arrays['bw'][corner_vertices], 0.0, 1.0) * 255.0)
+
+    # Fold -0.0 into 0.0, so signed zeros weld together
+    for name in corners.dtype.names:
+        if corners[name].dtype.kind == 'f':
+            corners[name] += 0.0
+
+    return corners
+
+# Find the source of welded vertices
+def welded_sources ( remap: np.ndarray, triangle_vertices: np.ndarray ) -> np.ndarray:
+
+    '''
+        Returns the index of the first corner of each welded vertex, and the mesh vertex it came from
+    '''
+
+    # np.unique returns the first occurrence of each welded vertex
+    first_corners = np.unique(remap, return_index=True)[1]
+
+    return first_corners, triangle_vertices.ravel()[first_corners]
+
+# Fill in the tangent space of welded vertices
+def fill_tangents ( vertices: np.ndarray, remap: np.ndarray, arrays: dict, settings: dict, first: int = 0, last: int = None ):
+
+    '''
+        Computes tangents and bitangents for vertices welded from triangles [ first, last ), in place
+    '''
+
+    vertex_groups : list = settings['vertex groups']
+
+    if 'txyz' not in vertex_groups and 'bxyz' not in vertex_groups:
+        return
+
+    triangle_vertices    = arrays['triangle vertices'][first:last]
+    triangle_loops       = arrays['triangle loops'][first:last]
+
+    # The mesh vertex of each welded vertex
+    _, sources           = welded_sources(remap, triangle_vertices)
+
+    tangents, bitangents = compute_tangents(
+        arrays['xyz'][triangle_vertices],
+        arrays['uv'][triangle_loops],
+        remap.reshape(-1, 3),
+        arrays['nxyz'][sources]
+    )
+
+    if 'txyz' in vertex_groups:
+        vertices['txyz'] = tangents
+
+    if 'bxyz' in vertex_groups:
+        vertices['bxyz'] = bitangents
+
+    return
+
+# Narrow an index buffer
+def encode_indices ( faces: np.ndarray, vertex_count: int, index_format: str = 'UINT32' ) -> tuple:
+
+    '''
+        Picks the index type of a part. UINT32 always writes 32 bit indices. ADAPTIVE writes 
+        16 bit indices when every vertex fits. SPLIT always writes 16 bit indices, cutting the 
+        triangles of larger parts into ranges that each index 65536 vertices or fewer, relative 
+        to a base vertex. 
+
+        Returns ( faces, ranges ), where ranges is a list of { first triangle, triangle count, 
+        base vertex }, or None if the part was not split
+    '''
+
+    faces = np.asarray(faces).reshape(-1, 3)
+
+    # 32 bit indices
+    if index_format == 'UINT32' or ( index_format == 'ADAPTIVE' and vertex_count > INDEX_16_LIMIT ):
+        return faces.astype('<u4'), None
+
+    # Every vertex fits
+    if vertex_count <= INDEX_16_LIMIT:
+        return faces.astype('<u2'), None
+
+    # Initialized data
+    lowest   = faces.min(axis=1)
+    highest  = faces.max(axis=1)
+    relative = np.empty(faces.shape, dtype='<u2')
+    ranges   = [ ]
+    first    = 0
+
+    # Vertices are numbered in order of first use, so ranges of neighbouring triangles use 
+    # neighbouring vertices. Grow each range until it spans too many vertices
+    while first < len(faces):
+        low  = np.minimum.accumulate(lowest[first:])
+        high = np.maximum.accumulate(highest[first:])
+        over = np.nonzero(high - low >= INDEX_16_LIMIT)[0]
+        last = first + ( int(over[0]) if len(over) else len(low) )
+
+        # One triangle spans too many vertices by itself
+        if last == first:
+            return faces.astype('<u4'), None
+
+        base                 = int(low[last - first - 1])
+        relative[first:last] = faces[first:last] - base
+
+        ranges.append({
+            "first triangle" : first,
+            "triangle count" : last - first,
+            "base vertex"    : base
+        })
+
+        first = last
+
+    return relative, ranges
+
+# Encode a part
+def encode_ply ( arrays: dict, settings: dict, file_path: str, comment: str = None ):
+
+    '''
+        Welds, computes tangents, and writes a part to a binary PLY or .g10mesh file
+    '''
+
+    # Weld identical corners into vertices
+    vertices, remap = weld_vertices(build_corners(arrays, settings))
+    statistics      = { }
+
+    # Weld vertices that only differ by noise
+    if settings['tolerance welding'] is True:
+        vertices, merge               = weld_within_tolerance(vertices, weld_tolerances(settings))
+        statistics['vertices welded'] = len(merge) - len(vertices)
+        remap                         = merge[remap]
+
+    # Compute the tangent and bitangent of each vertex
+    fill_tangents(vertices, remap, arrays, settings)
+
+    # Gather the index buffer through the remap
+    faces           = remap.reshape(-1, 3)
+    _, sources      = welded_sources(remap, arrays['triangle vertices'])
+    part_json       = { }
+    files           = [ file_path ]
+
+    # Reorder triangles and vertices for the GPU's vertex cache. Only the result is measured, 
+    # since each pass of the cache simulation is another loop over every corner
+    if settings['optimize vertex cache'] is True:
+        faces              = optimize_vertex_cache(faces, len(vertices), VERTEX_CACHE_SIZE)
+        order, faces       = optimize_vertex_fetch(faces, len(vertices))
+        vertices           = vertices[order]
+        sources            = sources[order]
+
+        statistics['acmr'], statistics['atvr'] = vertex_cache_statistics(faces, len(vertices), VERTEX_CACHE_SIZE)
+
+    # Position of each welded vertex
+    positions       = arrays['xyz'][sources]
+
+    # Quantize the vertices
+    quantization    = quantization_parameters(arrays, settings)
+    vertices        = quantize_vertices(vertices, quantization)
+
+    if quantization:
+        part_json['quantization'] = quantization
+
+    # Pick the index type
+    indices, ranges = encode_indices(faces, len(vertices), settings['index format'])
+    part_json['index type'] = PLY_TYPE_NAMES[indices.dtype]
+
+    if ranges is not None:
+        part_json['index ranges'] = ranges
+
+    # Write the file
+    write_mesh(file_path, vertices, indices, settings, comment, quantization)
+
+    # Partition the triangles into meshlets
+    if settings['meshlets'] is True:
+        meshlets_path = os.path.splitext(file_path)[0] + ".meshlets"
+
+        write_meshlets(meshlets_path, build_meshlets(faces, positions, settings['meshlet max vertices'], settings['meshlet max triangles']))
+
+        part_json['meshlets'] = meshlets_path
+        files.append(meshlets_path)
+
+    # Build a BVH over the triangles, so the engine does not build one when the part loads
+    if settings['bvh'] is True:
+        bvh_path = os.path.splitext(file_path)[0] + ".bvh"
+
+        write_bvh(bvh_path, *build_bvh(positions, faces))
+
+        part_json['bvh'] = bvh_path
+        files.append(bvh_path)
+
+    # Simplify the part into lower levels of detail
+    if settings['lods'] is True:
+        part_json['lods'] = write_lods(file_path, vertices, faces, positions, settings, comment, quantization)
+
+        files.extend(lod['path'] for lod in part_json['lods'])
+
+    # Part JSON written by the encoder, every file it wrote, and anything worth reporting
+    return { 'json': part_json, 'files': files, 'statistics': statistics }
+
+# Get the steps a streamed part skips
+def streaming_skipped ( settings: dict ) -> list:
+
+    '''
+        Returns the name of each enabled encoding step that stream_ply does not run
+    '''
+
+    skipped = [ name for key, name in STREAMING_SKIPPED if settings[key] is True ]
+
+    # The vertex count is only known at the end, so indices are always 32 bit
+    if settings['index format'] != 'UINT32':
+        skipped.append('16 bit indices')
+
+    return skipped
+
+# Encode a part in chunks
+def stream_ply ( arrays: dict, settings: dict, file_path: str, comment: str = None ):
+
+    '''
+        Writes a part to a binary PLY or .g10mesh file, a fixed number of triangles at a time. 
+
+        Vertices are appended to the file as they are found, and faces are spilled to a 
+        temporary file until the vertex block is complete. Vertices are welded across chunks 
+        through a sorted hash table bounded to a few chunks worth of vertices, so peak memory 
+        follows the chunk size, not the size of the part. Tolerance welding only welds 
+        within a chunk. Tangents are computed per chunk. 
+        Indices are always 32 bit, since the vertex count is only known at the end. Steps 
+        that need the whole part are skipped, and listed in the statistics
+    '''
+
+    # Convinience
+    chunk_size     : int      = max(int(settings['stream chunk size']), 1)
+    table_size     : int      = 4 * chunk_size
+    triangle_count : int      = len(arrays['triangle vertices'])
+    g10mesh        : bool     = settings['mesh format'] == 'G10MESH'
+    fixed_triangles: bool     = settings['fixed triangles'] is True or g10mesh
+    quantization   : dict     = quantization_parameters(arrays, settings)
+    wide_groups    : bool     = wide_bone_groups(arrays)
+    vertex_dtype   : np.dtype = quantized_vertex_dtype(ply_vertex_dtype(settings['vertex groups'], settings['bone influences'], wide_groups), quantization)
+
+    # Hashes of the vertices written so far, in order, with the bytes and index of each vertex
+    table_hashes   : np.ndarray = np.empty(0, dtype=np.uint64)
+    table_keys     : np.ndarray = np.empty(0, dtype=np.dtype((np.void, ply_vertex_dtype(settings['vertex groups'], settings['bone influences'], wide_groups).itemsize)))
+    table_indices  : np.ndarray = np.empty(0, dtype=np.uint32)
+    vertex_count   : int      = 0
+    face_count     : int      = 0
+    welded         : int      = 0
+
+    # The header is the same size whatever the counts are, so it can be patched in place
+    def header ( vertex_count: int, face_count: int ) -> bytes:
+
+        if g10mesh:
+            return g10mesh_header(vertex_dtype, vertex_count, face_count * 3, 4, quantization)[0]
+
+        return ply_header(vertex_dtype, vertex_count, face_count, comment, count_width=10, quantization=quantization, fixed_triangles=fixed_triangles)
+
+    with open(file_path, "wb") as file, tempfile.TemporaryFile(dir=os.path.dirname(file_path) or None) as face_spill:
+
+        # Write a header with placeholder counts
+        file.write(header(0, 0))
+
+        for first in range(0, triangle_count, chunk_size):
+            last            = min(first + chunk_size, triangle_count)
+
+            # Weld the chunk
+            vertices, remap = weld_vertices(build_corners(arrays, settings, first, last, wide_groups))
+
+            # Weld vertices in the chunk that only differ by noise
+            if settings['tolerance welding'] is True:
+                vertices, merge = weld_within_tolerance(vertices, weld_tolerances(settings))
+                welded          = welded + len(merge) - len(vertices)
+                remap           = merge[remap]
+
+            # Weld the chunk against vertices from earlier chunks. The rows of the chunk are unique,
+            # so each one is looked up once in the table, by its hash, then by its bytes
+            keys            = np.ascontiguousarray(vertices).view(np.uint8).reshape(len(vertices), -1).view(np.dtype((np.void, vertices.dtype.itemsize))).ravel()
+            hashes          = hash_records(vertices)
+            position        = np.minimum(np.searchsorted(table_hashes, hashes), max(len(table_hashes) - 1, 0))
+            found           = ( table_hashes[position] == hashes ) & ( table_keys[position] == keys ) if len(table_hashes) else np.zeros(len(keys), dtype=bool)
+            new             = ~found
+
+            # New vertices are numbered in the order they are appended
+            indices         = np.empty(len(vertices), dtype=np.uint32)
+            indices[found]  = table_indices[position[found]]
+            indices[new]    = vertex_count + np.arange(np.count_nonzero(new), dtype=np.uint32)
+            vertex_count    = vertex_count + int(np.count_nonzero(new))
+
+            # Insert the new vertices into the table, in hash order
+            order           = np.flatnonzero(new)[np.argsort(hashes[new], kind='stable')]
+            at              = np.searchsorted(table_hashes, hashes[order])
+            table_hashes    = np.insert(table_hashes , at, hashes[order])
+            table_keys      = np.insert(table_keys   , at, keys[order])
+            table_indices   = np.insert(table_indices, at, indices[order])
+
+            # Compute the tangent space of the chunk
+            fill_tangents(vertices, remap, arrays, settings, first, last)
+
+            # Append new vertices to the vertex block
+            file.write(quantize_vertices(vertices[new], quantization).tobytes())
+
+            # Spill the faces of the chunk
+            if fixed_triangles:
+                face_records                   = indices[remap].reshape(-1, 3).astype('<u4')
+            else:
+                face_records                   = np.empty(last - first, dtype=PLY_FACE_DTYPE)
+                face_records['count']          = 3
+                face_records['vertex_indices'] = indices[remap].reshape(-1, 3)
+
+            face_spill.write(face_records.tobytes())
+            face_count                     = face_count + len(face_records)
+
+            # Forget the oldest vertices when the table is full. Indices grow as vertices are
+            # appended, so the oldest vertices have the smallest indices
+            if len(table_keys) > table_size:
+                keep            = table_indices >= vertex_count - table_size // 2
+                table_hashes    = table_hashes[keep]
+                table_keys      = table_keys[keep]
+                table_indices   = table_indices[keep]
+
+        # Align the index section
+        if g10mesh:
+            file.write(bytes(align(file.tell(), G10MESH_ALIGNMENT) - file.tell()))
+
+        # Append the face block
+        face_spill.seek(0)
+        shutil.copyfileobj(face_spill, file)
+
+        if g10mesh:
+            file.write(bytes(align(file.tell(), G10MESH_ALIGNMENT) - file.tell()))
+
+        # Patch the header counts
+        file.seek(0)
+        file.write(header(vertex_count, face_count))
+
+    statistics : dict = { }
+    skipped    : list = streaming_skipped(settings)
+
+    if settings['tolerance welding'] is True:
+        statistics['vertices welded'] = welded
+
+    if len(skipped) > 0:
+        statistics['skipped'] = skipped
+
+    # Part JSON written by the encoder, every file it wrote, and anything worth reporting
+    return { 'json': { 'quantization': quantization } if quantization else { }, 'files': [ file_path ], 'statistics': statistics }
+
+# Simulate a post transform vertex cache
+def vertex_cache_statistics ( faces: np.ndarray, vertex_count: int, cache_size: int = 16 ) -> tuple:
+
+    '''
+        Runs an index buffer through a FIFO vertex cache. 
+
+        Returns ( ACMR, ATVR ), the cache misses per triangle and per vertex
+    '''
+
+    # Nothing to draw
+    if len(faces) == 0 or vertex_count == 0:
+        return 0.0, 0.0
+
+    # The time each vertex entered the cache
+    entered : list = [ -cache_size - 1 ] * vertex_count
+    misses  : int  = 0
+
+    for v in faces.ravel().tolist():
+
+        # A vertex is cached if fewer than cache_size misses happened since it entered
+        if misses - entered[v] > cache_size:
+            entered[v] = misses
+            misses     = misses + 1
+
+    return misses / len(faces), misses / vertex_count
+
+# Reorder triangles for the post transform vertex cache
+def optimize_vertex_cache ( faces: np.ndarray, vertex_count: int, cache_size: int = 16 ) -> np.ndarray:
+
+    '''
+        Reorders triangles with Tipsify ( Sander, Nehab, Barczak 2007 ), so consecutive 
+        triangles reuse vertices still in a cache of cache_size vertices
+    '''
+
+    triangle_count : int = len(faces)
+
+    if triangle_count == 0:
+        return faces.copy()
+
+    # Triangles adjacent to each vertex
+    corners        = faces.ravel()
+    order          = np.argsort(corners, kind='stable')
+    valence        = np.bincount(corners, minlength=vertex_count)
+    offsets        = np.concatenate(( [ 0 ], np.cumsum(valence) )).tolist()
+    adjacency      = (order // 3).tolist()
+    triangles      = faces.tolist()
+
+    # Triangles left to emit around each vertex, and the time each vertex entered the cache
+    live           = valence.tolist()
+    cache_time     = [ 0 ] * vertex_count
+    emitted        = [ False ] * triangle_count
+    dead_end       = [ ]
+    output         = [ ]
+
+    # Start fanning around the first vertex
+    f              = int(corners[0])
+    s              = cache_size + 1
+    cursor         = 0
+
+    while f >= 0:
+
+        candidates = [ ]
+
+        # Emit every remaining triangle around the fanning vertex
+        for t in adjacency[offsets[f]:offsets[f + 1]]:
+
+            if emitted[t] is True:
+                continue
+
+            for v in triangles[t]:
+                dead_end.append(v)
+                candidates.append(v)
+
+                live[v] = live[v] - 1
+
+                # Cache miss
+                if s - cache_time[v] > cache_size:
+                    cache_time[v] = s
+                    s             = s + 1
+
+            emitted[t] = True
+            output.append(t)
+
+        # Fan around the candidate that will still be cached after its remaining triangles
+        f        = -1
+        priority = -1
+
+        for v in candidates:
+
+            if live[v] > 0:
+
+                p = 0
+
+                if s - cache_time[v] + 2 * live[v] <= cache_size:
+                    p = s - cache_time[v]
+
+                if p > priority:
+                    priority = p
+                    f        = v
+
+        if f >= 0:
+            continue
+
+        # Dead end. Back track through recently used vertices
+        while len(dead_end) > 0:
+            v = dead_end.pop()
+
+            if live[v] > 0:
+                f = v
+                break
+
+        if f >= 0:
+            continue
+
+        # Otherwise, take the next vertex with triangles left
+        while cursor < vertex_count:
+
+            if live[cursor] > 0:
+                f = cursor
+                break
+
+            cursor = cursor + 1
+
+    return faces[np.asarray(output, dtype=np.int64)]
+
+# Reorder vertices in order of first use
+def optimize_vertex_fetch ( faces: np.ndarray, vertex_count: int ) -> tuple:
+
+    '''
+        Renumbers vertices in the order the index buffer first uses them, and drops unused vertices. 
+
+        Returns ( order, faces ), where order[i] is the old index of new vertex i
+    '''
+
+    # The first corner that uses each vertex
+    used, first_use    = np.unique(faces.ravel(), return_index=True)
+    order              = used[np.argsort(first_use, kind='stable')]
+
+    # Map old vertex indices to new ones
+    remap              = np.zeros(vertex_count, dtype=np.uint32)
+    remap[order]       = np.arange(len(order), dtype=np.uint32)
+
+    return order, remap[faces]
+
+# Find the largest value of each segment
+def segment_argmax ( values: np.ndarray, starts: np.ndarray, segments: np.ndarray ) -> np.ndarray:
+
+    '''
+        Returns the index of the first largest value of each contiguous, non empty segment. 
+        starts is the first index of each segment, and segments is the segment of each value
+    '''
+
+    peaks  = np.maximum.reduceat(values, starts)
+    hits   = np.flatnonzero(values == peaks[segments])
+
+    return hits[np.searchsorted(segments[hits], np.arange(len(starts)))]
+
+# Compute bounding spheres
+def bounding_spheres ( points: np.ndarray, counts: np.ndarray ) -> tuple:
+
+    '''
+        Returns ( centers, radii ) of a sphere around each run of counts[i] points, with Ritter's 
+        method. Each sphere starts on the span between two far apart points, and grows toward 
+        the farthest point outside it until every point is inside. Every run is grown at once
+    '''
+
+    points   = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    counts   = np.asarray(counts, dtype=np.int64)
+    centers  = np.zeros(( len(counts), 3 ))
+    radii    = np.zeros(len(counts))
+    filled   = np.flatnonzero(counts > 0)
+
+    if len(filled) == 0:
+        return centers, radii
+
+    # Empty runs have no points, so they are left out of the segments
+    starts   = np.concatenate(( [ 0 ], np.cumsum(counts[filled])[:-1] ))
+    segments = np.repeat(np.arange(len(filled)), counts[filled])
+
+    # Find two far apart points of each run
+    offsets  = points - points[starts][segments]
+    a        = points[segment_argmax(np.einsum('ij,ij->i', offsets, offsets), starts, segments)]
+    offsets  = points - a[segments]
+    b        = points[segment_argmax(np.einsum('ij,ij->i', offsets, offsets), starts, segments)]
+
+    # Start with the spheres spanning them
+    center   = (a + b) * 0.5
+    radius   = np.linalg.norm(b - a, axis=1) * 0.5
+
+    for _ in range(64):
+
+        # The farthest point from each center
+        distances = np.linalg.norm(points - center[segments], axis=1)
+        farthest  = segment_argmax(distances, starts, segments)
+        outside   = distances[farthest] > radius * (1.0 + 1e-7)
+
+        if not outside.any():
+            break
+
+        # Grow the spheres that miss a point just enough to touch it
+        reach           = distances[farthest[outside]]
+        grown           = (radius[outside] + reach) * 0.5
+        center[outside] = center[outside] + (points[farthest[outside]] - center[outside]) * ((grown - radius[outside]) / reach)[:, None]
+        radius[outside] = grown
+
+    # Make certain every point is inside
+    radius           = np.maximum(radius, np.maximum.reduceat(np.linalg.norm(points - center[segments], axis=1), starts))
+
+    centers[filled]  = center
+    radii[filled]    = radius
+
+    return centers, radii
+
+# Compute a bounding sphere
+def bounding_sphere ( points: np.ndarray ) -> tuple:
+
+    '''
+        Returns ( center, radius ) of a sphere around points, with Ritter's method
+    '''
+
+    points         = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    centers, radii = bounding_spheres(points, [ len(points) ])
+
+    return centers[0], float(radii[0])
+
+# Compute bounding volumes
+def compute_bounds ( points: np.ndarray, matrix: np.ndarray = None ) -> dict:
+
+    '''
+        Returns the bounding volumes of points, as JSON. The axis aligned box, sphere, and 
+        oriented box are in the space of the points. The oriented box is fit to the principal 
+        axes of the points, which are the rows of its "axes", and falls back to the axis 
+        aligned box when that is tighter. Given a 4x4 matrix, the axis aligned box of the 
+        transformed points is included as "world aabb"
+    '''
+
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+
+    if len(points) == 0:
+        points = np.zeros((1, 3))
+
+    # Axis aligned box
+    lower, upper   = points.min(axis=0), points.max(axis=0)
+
+    # Sphere
+    center, radius = bounding_sphere(points)
+
+    # Principal axes, largest first, as a right handed basis
+    mean           = points.mean(axis=0)
+    axes           = np.linalg.eigh(np.cov(points - mean, rowvar=False) if len(points) > 1 else np.eye(3))[1].T[::-1]
+    axes[2]        = np.cross(axes[0], axes[1])
+
+    # Oriented box
+    projected      = (points - mean) @ axes.T
+    low, high      = projected.min(axis=0), projected.max(axis=0)
+    box_center     = mean + ((low + high) * 0.5) @ axes
+    extents        = (high - low) * 0.5
+
+    # Keep whichever box is smaller
+    if np.prod(extents) >= np.prod((upper - lower) * 0.5):
+        axes, box_center, extents = np.eye(3), (lower + upper) * 0.5, (upper - lower) * 0.5
+
+    bounds = {
+        "aabb"   : { "min": lower.tolist(), "max": upper.tolist() },
+        "sphere" : { "center": center.tolist(), "radius": radius },
+        "obb"    : { "center": box_center.tolist(), "axes": axes.tolist(), "extents": extents.tolist() }
+    }
+
+    # Axis aligned box of the transformed points
+    if matrix is not None:
+        matrix = np.asarray(matrix, dtype=np.float64)
+        world  = points @ matrix[:3, :3].T + matrix[:3, 3]
+
+        bounds["world aabb"] = { "min": world.min(axis=0).tolist(), "max": world.max(axis=0).tolist() }
+
+    return bounds
+
+# Transform a box
+def transform_box ( lower: np.ndarray, upper: np.ndarray, matrix: np.ndarray ) -> dict:
+
+    '''
+        Returns the axis aligned box around the 8 corners of the box from lower to upper, 
+        transformed by a 4x4 matrix, as JSON
+    '''
+
+    corners = np.stack(np.meshgrid(*zip(lower, upper), indexing='ij'), axis=-1).reshape(-1, 3).astype(np.float64)
+    matrix  = np.asarray(matrix, dtype=np.float64)
+    world   = corners @ matrix[:3, :3].T + matrix[:3, 3]
+
+    return { "min": world.min(axis=0).tolist(), "max": world.max(axis=0).tolist() }
+
+# Meshlet table record
+MESHLET_DTYPE : np.dtype = np.dtype([
+    ( 'vertex offset'  , '<u4'         ),
+    ( 'vertex count'   , '<u4'         ),
+    ( 'triangle offset', '<u4'         ),
+    ( 'triangle count' , '<u4'         ),
+    ( 'center'         , '<f4', ( 3, ) ),
+    ( 'radius'         , '<f4'         ),
+    ( 'cone axis'      , '<f4', ( 3, ) ),
+    ( 'cone cutoff'    , '<f4'         )
+])
+
+# Partition triangles into meshlets
+def build_meshlets ( faces: np.ndarray, positions: np.ndarray, max_vertices: int = 64, max_triangles: int = 124 ) -> dict:
+
+    '''
+        Greedily partitions triangles, in order, into clusters of at most max_vertices 
+        vertices and max_triangles triangles, and computes each cluster's culling data.
+
+        Returns a dict with the meshlet table, the vertex index table ( indices of part vertices ), 
+        and the local triangle table ( indices into the meshlet's vertices )
+    '''
+
+    # Local indices are written as bytes
+    max_vertices    = min(max(int(max_vertices), 3), 255)
+    max_triangles   = max(int(max_triangles), 1)
+
+    faces           = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    corners         = faces.ravel()
+    vertex_table    : list = [ ]
+    local_table     : list = [ ]
+    vertex_counts   : list = [ ]
+    triangle_counts : list = [ ]
+    first           : int  = 0
+
+    while first < len(faces):
+
+        # The most triangles the meshlet could take
+        window                     = corners[3 * first:3 * min(first + max_triangles, len(faces))]
+
+        # The vertices each triangle adds, where each vertex is first used
+        vertices, first_use, local = np.unique(window, return_index=True, return_inverse=True)
+        added                      = np.cumsum(np.bincount(first_use // 3, minlength=len(window) // 3))
+
+        # Triangles are taken in order until the next one does not fit
+        count                      = int(np.searchsorted(added, max_vertices, side='right'))
+
+        # Number the meshlet's vertices in order of first use. Vertices first used after the
+        # last triangle taken sort to the end, and are dropped
+        order                      = np.argsort(first_use, kind='stable')[:int(added[count - 1])]
+        rank                       = np.zeros(len(vertices), dtype=np.uint8)
+        rank[order]                = np.arange(len(order), dtype=np.uint8)
+
+        vertex_table.append(vertices[order])
+        local_table.append(rank[local.ravel()[:3 * count]])
+        vertex_counts.append(len(order))
+        triangle_counts.append(count)
+
+        first                      = first + count
+
+    # The meshlet table
+    table                    = np.zeros(len(vertex_counts), dtype=MESHLET_DTYPE)
+    vertex_table             = np.concatenate(vertex_table).astype(np.uint32) if vertex_table else np.empty(0, dtype=np.uint32)
+    local_table              = np.concatenate(local_table) if local_table else np.empty(0, dtype=np.uint8)
+    vertex_counts            = np.asarray(vertex_counts  , dtype=np.int64)
+    triangle_counts          = np.asarray(triangle_counts, dtype=np.int64)
+
+    table['vertex offset']   = np.cumsum(vertex_counts) - vertex_counts
+    table['vertex count']    = vertex_counts
+    table['triangle offset'] = np.cumsum(triangle_counts) - triangle_counts
+    table['triangle count']  = triangle_counts
+
+    if len(table) == 0:
+        return { 'meshlets': table, 'vertices': vertex_table, 'triangles': local_table, 'max vertices': max_vertices, 'max triangles': max_triangles }
+
+    # Bounding sphere of each meshlet's vertices
+    table['center'], table['radius'] = bounding_spheres(positions[vertex_table], vertex_counts)
+
+    # Unit normal of each triangle
+    corners                  = positions[faces].astype(np.float64)
+    normals                  = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths                  = np.linalg.norm(normals, axis=1)
+    normals                  = np.divide(normals, lengths[:, None], out=np.zeros_like(normals), where=lengths[:, None] > 0.0)
+
+    # Normal cones. The axis is the average triangle normal, and the cutoff is the cosine of the widest 
+    # angle between the axis and any triangle normal. A cutoff of -1 means the meshlet can not be cone culled
+    starts                   = table['triangle offset'].astype(np.int64)
+    meshlet                  = np.repeat(np.arange(len(table)), triangle_counts)
+    axes                     = np.add.reduceat(normals, starts, axis=0)
+    lengths                  = np.linalg.norm(axes, axis=1)
+    coned                    = lengths > 1e-12
+    axes                     = np.where(coned[:, None], axes / np.where(coned, lengths, 1.0)[:, None], [ 0.0, 0.0, 1.0 ])
+
+    # Triangles with no area do not widen the cone
+    cosines                  = np.einsum('ij,ij->i', normals, axes[meshlet])
+    cosines[np.einsum('ij,ij->i', normals, normals) == 0.0] = np.inf
+
+    table['cone axis']       = axes
+    table['cone cutoff']     = np.where(coned, np.maximum(np.minimum.reduceat(cosines, starts), -1.0), -1.0)
+
+    return { 'meshlets': table, 'vertices': vertex_table, 'triangles': local_table, 'max vertices': max_vertices, 'max triangles': max_triangles }
+
+# Write meshlets
+def write_meshlets ( file_path: str, meshlets: dict ):
+
+    '''
+        Writes meshlets to a binary sidecar file. 
+
+        The file is a header of seven little endian uint32s ( b"G10L", version, meshlet count, 
+        max vertices, max triangles, vertex index count, triangle count ), followed by the 
+        meshlet table, the uint32 vertex index table, and the uint8 local triangle table
+    '''
+
+    header = np.array([
+        int.from_bytes(b"G10L", 'little'),
+        1,
+        len(meshlets['meshlets']),
+        meshlets['max vertices'],
+        meshlets['max triangles'],
+        len(meshlets['vertices']),
+        len(meshlets['triangles']) // 3
+    ], dtype='<u4')
+
+    with open(file_path, "wb") as file:
+        file.write(header.tobytes())
+        file.write(meshlets['meshlets'].tobytes())
+        file.write(meshlets['vertices'].tobytes())
+        file.write(meshlets['triangles'].tobytes())
+
+    return
+
+# Flattened BVH node. Leaves have a triangle count, and their triangles start at offset in the 
+# triangle table. Interior nodes have a count of 0, their first child follows them, and offset is 
+# the index of their second child
+BVH_NODE_DTYPE    : np.dtype = np.dtype([
+    ( 'min'    , '<f4', ( 3, ) ),
+    ( 'max'    , '<f4', ( 3, ) ),
+    ( 'offset' , '<u4'         ),
+    ( 'count'  , '<u2'         ),
+    ( 'axis'   , '<u2'         )
+])
+
+# BVH file header. Magic, version, node count, triangle count
+BVH_HEADER        : struct.Struct = struct.Struct('<4s3I')
+
+# Centroid bins per axis, and the most triangles in a leaf
+BVH_BINS          : int   = 16
+BVH_LEAF_SIZE     : int   = 4
+
+# Relative cost of visiting a node and of testing a triangle
+BVH_TRAVERSAL_COST: float = 1.0
+BVH_TRIANGLE_COST : float = 1.0
+
+# Surface area of boxes
+def box_area ( lower: np.ndarray, upper: np.ndarray ) -> np.ndarray:
+
+    '''
+        Returns the surface area of each box. Empty boxes have no area
+    '''
+
+    extent = np.maximum(upper - lower, 0.0)
+
+    return 2.0 * ( extent[..., 0] * extent[..., 1] + extent[..., 1] * extent[..., 2] + extent[..., 2] * extent[..., 0] )
+
+# Accumulate within segments
+def segment_accumulate ( ufunc: np.ufunc, values: np.ndarray, segments: np.ndarray ) -> np.ndarray:
+
+    '''
+        Returns the running ufunc of values, restarted at each contiguous segment. Each pass 
+        combines every value with the one step before it, doubling step, so a segment of n 
+        values takes log2(n) passes
+    '''
+
+    values = values.copy()
+    step   = 1
+
+    while step < len(values):
+        same = np.flatnonzero(segments[step:] == segments[:-step])
+
+        if len(same) == 0:
+            break
+
+        values[same + step] = ufunc(values[same + step], values[same])
+        step                = step * 2
+
+    return values
+
+# Build a bounding volume hierarchy
+def build_bvh ( positions: np.ndarray, faces: np.ndarray, bins: int = BVH_BINS, leaf_size: int = BVH_LEAF_SIZE ) -> tuple:
+
+    '''
+        Builds a BVH over triangles with the binned surface area heuristic. Every node in a 
+        level of the tree is split at once, so a build is a few array passes per level. 
+
+        Returns ( nodes, triangles ), where nodes is a depth first array of BVH_NODE_DTYPE, and 
+        triangles is the triangle table, which lists the triangles of each leaf contiguously
+    '''
+
+    corners          = positions[faces].astype(np.float64)
+    lower            = corners.min(axis=1)
+    upper            = corners.max(axis=1)
+    centroids        = ( lower + upper ) * 0.5
+
+    # Each box as < min, -max >, so a single minimum reduces both corners
+    boxes            = np.concatenate(( lower, -upper ), axis=1)
+
+    # Triangles stay sorted by node, so each node is a range of order
+    order            = np.arange(len(faces))
+    starts           = np.zeros(min(len(faces), 1), dtype=np.int64)
+    sizes            = np.full(len(starts), len(faces), dtype=np.int64)
+
+    # Each level's nodes. Ids are handed out a level at a time, so levels concatenate in id order
+    levels           : list = [ ]
+    next_id          : int  = len(starts)
+
+    while len(starts):
+
+        count            = len(starts)
+        firsts           = np.cumsum(sizes) - sizes
+        segment          = np.repeat(np.arange(count), sizes)
+        slots            = np.repeat(starts - firsts, sizes) + np.arange(len(segment))
+        members          = order[slots]
+        member_boxes     = boxes[members]
+        member_centroids = centroids[members]
+
+        # Bounds of each node, and of its centroids
+        node_boxes       = np.minimum.reduceat(member_boxes    , firsts, axis=0)
+        box_lower        = node_boxes[:, :3]
+        box_upper        = -node_boxes[:, 3:]
+        centroid_lower   = np.minimum.reduceat(member_centroids, firsts, axis=0)
+        extent           = np.maximum.reduceat(member_centroids, firsts, axis=0) - centroid_lower
+
+        # Bin each centroid along each axis
+        scale            = np.divide(bins * ( 1.0 - 1e-9 ), extent, out=np.zeros_like(extent), where=extent > 0.0)
+        binned           = np.minimum((( member_centroids - centroid_lower[segment] ) * scale[segment]).astype(np.int64), bins - 1)
+
+        # Split candidates along each axis. Only occupied bins are visited. Sorting an axis' keys 
+        # makes each occupied bin a contiguous run of triangles, and each node a run of bins
+        parent_area      = np.maximum(box_area(box_lower, box_upper), 1e-30)
+        candidates       = [ ]
+
+        for a in range(3):
+            keys             = segment * bins + binned[:, a]
+            by_bin           = np.argsort(keys, kind='stable')
+            keys             = keys[by_bin]
+            runs             = np.flatnonzero(np.concatenate(( [ True ], keys[1:] != keys[:-1] )))
+            node, slot       = keys[runs] // bins, keys[runs] % bins
+
+            # Count and bound the triangles in each occupied bin
+            bin_count        = np.diff(np.append(runs, len(keys)))
+            bin_boxes        = np.minimum.reduceat(member_boxes[by_bin], runs, axis=0)
+
+            # Sweep each node's bins from both ends. Splitting after a bin puts it and the bins 
+            # before it on the left. The last bin of a node has nothing on its right
+            node_start       = np.concatenate(( [ True ], node[1:] != node[:-1] ))
+            totals           = np.cumsum(bin_count)
+            left_count       = totals - ( totals - bin_count )[node_start][np.cumsum(node_start) - 1]
+            left_boxes       = segment_accumulate(np.minimum, bin_boxes, node)
+            right_boxes      = segment_accumulate(np.minimum, bin_boxes[::-1], node[::-1])[::-1]
+            left_area        = box_area(left_boxes[:, :3] , -left_boxes[:, 3:])
+            right_area       = box_area(right_boxes[:, :3], -right_boxes[:, 3:])
+            inner            = np.flatnonzero(node[:-1] == node[1:])
+            right_count      = sizes[node[inner]] - left_count[inner]
+            cost             = BVH_TRAVERSAL_COST + BVH_TRIANGLE_COST * ( left_area[inner] * left_count[inner] + right_area[inner + 1] * right_count ) / parent_area[node[inner]]
+
+            candidates.append(( node[inner], cost, np.full(len(inner), a), slot[inner] ))
+
+        # Cheapest split of each node. Ties go to the lowest axis, then the lowest bin
+        node, cost, axes, slot = ( np.concatenate(column) for column in zip(*candidates) )
+        by_node          = np.argsort(node, kind='stable')
+        node, cost, axes, slot = node[by_node], cost[by_node], axes[by_node], slot[by_node]
+        best_cost        = np.full(count, np.inf)
+        best_axis        = np.zeros(count, dtype=np.int64)
+        best_bin         = np.zeros(count, dtype=np.int64)
+
+        if len(node):
+            node_start            = np.concatenate(( [ True ], node[1:] != node[:-1] ))
+            best                  = segment_argmax(-cost, np.flatnonzero(node_start), np.cumsum(node_start) - 1)
+            best_cost[node[best]] = cost[best]
+            best_axis[node[best]] = axes[best]
+            best_bin[node[best]]  = slot[best]
+
+        # Split when it is cheaper than testing every triangle, or when there are too many for a leaf. 
+        # Nodes whose centroids all coincide can not be binned, so they are halved
+        split            = ( sizes > 1 ) & (( best_cost < BVH_TRIANGLE_COST * sizes ) | ( sizes > leaf_size ))
+        halve            = split & ~np.isfinite(best_cost)
+        rank             = np.arange(len(segment)) - firsts[segment]
+        right            = binned[np.arange(len(segment)), best_axis[segment]] > best_bin[segment]
+        right            = np.where(halve[segment], rank >= ( sizes // 2 )[segment], right) & split[segment]
+
+        # Partition each split node's range, left triangles first
+        order[slots]     = members[np.argsort(segment * 2 + right, kind='stable')]
+        left_sizes       = sizes - np.bincount(segment, weights=right, minlength=count).astype(np.int64)
+
+        # Split nodes' children get the next ids, in pairs
+        child            = np.full(count, -1, dtype=np.int64)
+        child[split]     = next_id + 2 * np.arange(split.sum())
+        next_id          = next_id + 2 * int(split.sum())
+
+        levels.append(( box_lower, box_upper, child, np.where(split, best_axis, 0), starts, sizes ))
+
+        starts           = np.stack(( starts[split], starts[split] + left_sizes[split] ), axis=1).ravel()
+        sizes            = np.stack(( left_sizes[split], sizes[split] - left_sizes[split] ), axis=1).ravel()
+
+    if not levels:
+        return np.zeros(0, dtype=BVH_NODE_DTYPE), np.zeros(0, dtype=np.uint32)
+
+    box_lower, box_upper, child, axis, starts, sizes = ( np.concatenate(column) for column in zip(*levels) )
+
+    # Lay the nodes out depth first, so that a node's first child follows it. Subtree sizes are 
+    # summed up the levels, then each node's position is handed down, a level at a time
+    bounds           = np.cumsum([ 0 ] + [ len(level[2]) for level in levels ])
+    subtree          = np.ones(len(child), dtype=np.int64)
+    position         = np.zeros(len(child), dtype=np.int64)
+
+    for first, last in zip(bounds[-2::-1], bounds[:0:-1]):
+        parents          = np.arange(first, last)[child[first:last] >= 0]
+        subtree[parents] = 1 + subtree[child[parents]] + subtree[child[parents] + 1]
+
+    for first, last in zip(bounds[:-1], bounds[1:]):
+        parents                       = np.arange(first, last)[child[first:last] >= 0]
+        position[child[parents]]      = position[parents] + 1
+        position[child[parents] + 1]  = position[parents] + 1 + subtree[child[parents]]
+
+    ordering           = np.empty(len(position), dtype=np.int64)
+    ordering[position] = np.arange(len(position))
+    child, sizes     = child[ordering], sizes[ordering]
+    leaf             = child < 0
+    counts           = np.where(leaf, sizes, 0)
+
+    # Leaves index the triangle table, which lists their triangles in the same order
+    nodes            = np.zeros(len(ordering), dtype=BVH_NODE_DTYPE)
+    nodes['min']     = box_lower[ordering]
+    nodes['max']     = box_upper[ordering]
+    nodes['axis']    = axis[ordering]
+    nodes['count']   = counts
+    nodes['offset']  = np.where(leaf, np.cumsum(counts) - counts, position[np.where(leaf, 0, child + 1)])
+    triangles        = order[np.repeat(starts[ordering][leaf] - ( np.cumsum(counts[leaf]) - counts[leaf] ), counts[leaf]) + np.arange(counts.sum())]
+
+    return nodes, triangles.astype(np.uint32)
+
+# Write a bounding volume hierarchy
+def write_bvh ( file_path: str, nodes: np.ndarray, triangles: np.ndarray ):
+
+    '''
+        Writes a BVH to a binary sidecar file. The file is a header, followed by the nodes, and 
+        the uint32 triangle table
+    '''
+
+    with open(file_path, "wb") as file:
+        file.write(BVH_HEADER.pack(b"G10B", 1, len(nodes), len(triangles)))
+        file.write(nodes.tobytes())
+        file.write(np.ascontiguousarray(triangles, dtype='<u4').tobytes())
+
+    return
+
+# Triangle planes
+def triangle_planes ( positions: np.ndarray, faces: np.ndarray ) -> tuple:
+
+    '''
+        Returns the unit normal, offset, and area of each triangle's plane
+    '''
+
+    corners = positions[faces]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)[:, None]
+    normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0.0)
+
+    return normals, -np.einsum('ij,ij->i', normals, corners[:, 0]), lengths[:, 0] * 0.5
+
+# Accumulate plane quadrics
+def plane_quadrics ( normals: np.ndarray, offsets: np.ndarray, weights: np.ndarray, vertices: np.ndarray, vertex_count: int ) -> np.ndarray:
+
+    '''
+        Adds the weighted quadric of each plane to each of its ( planes, k ) vertices
+    '''
+
+    # The plane < a, b, c, d > as the 10 unique terms of its symmetric 4x4 quadric
+    planes   = np.concatenate(( normals, offsets[:, None] ), axis=1)
+    rows     = np.array([ 0, 0, 0, 0, 1, 1, 1, 2, 2, 3 ])
+    columns  = np.array([ 0, 1, 2, 3, 1, 2, 3, 2, 3, 3 ])
+    terms    = weights[:, None] * planes[:, rows] * planes[:, columns]
+    result   = np.zeros((vertex_count, 4, 4), dtype=np.float64)
+
+    # Sum each term over the vertices of each plane
+    for i in range(10):
+        total = sum(np.bincount(vertices[:, k], weights=terms[:, i], minlength=vertex_count) for k in range(vertices.shape[1]))
+
+        result[:, rows[i], columns[i]] = total
+        result[:, columns[i], rows[i]] = total
+
+    return result
+
+# Simplify a mesh
+def simplify_mesh ( positions: np.ndarray, faces: np.ndarray, target_triangles: int, locked: np.ndarray = None ) -> np.ndarray:
+
+    '''
+        Reduces an index buffer to about target_triangles triangles with quadric error half edge
+        collapses ( Garland, Heckbert ). Each pass collapses a batch of the cheapest edges. A
+        collapse moves one vertex onto its neighbour, so vertices never need new attributes, and
+        the result indexes the same vertices as the input. Locked vertices are never moved
+    '''
+
+    # Initialized data
+    positions    = np.asarray(positions, dtype=np.float64)
+    faces        = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    vertex_count = len(positions)
+    locked       = np.zeros(vertex_count, dtype=bool) if locked is None else np.asarray(locked, dtype=bool)
+    sides        = faces[:, [ 0, 1, 1, 2, 2, 0 ]].reshape(-1, 2)
+
+    # Area weighted quadric of every triangle's plane
+    normals, offsets, areas = triangle_planes(positions, faces)
+    quadrics                = plane_quadrics(normals, offsets, areas, faces, vertex_count)
+
+    # Hold boundary edges in place with heavy planes through them, perpendicular to their triangle
+    keys                    = np.sort(sides, axis=1) @ np.array([ vertex_count, 1 ], dtype=np.int64)
+    unique_keys, uses       = np.unique(keys, return_counts=True)
+    boundary                = np.isin(keys, unique_keys[uses == 1])
+
+    if boundary.any():
+        edge_vertices       = sides[boundary]
+        direction           = positions[edge_vertices[:, 1]] - positions[edge_vertices[:, 0]]
+        perpendicular       = np.cross(direction, normals[np.nonzero(boundary)[0] // 3])
+        lengths             = np.linalg.norm(perpendicular, axis=1)[:, None]
+        perpendicular       = np.divide(perpendicular, lengths, out=np.zeros_like(perpendicular), where=lengths > 0.0)
+        weights             = 1000.0 * np.einsum('ij,ij->i', direction, direction)
+
+        quadrics           += plane_quadrics(perpendicular, -np.einsum('ij,ij->i', perpendicular, positions[edge_vertices[:, 0]]), weights, edge_vertices, vertex_count)
+
+    # Homogeneous positions
+    points = np.concatenate(( positions, np.ones((vertex_count, 1)) ), axis=1)
+
+    while len(faces) > target_triangles:
+
+        # Unique edges of the current mesh
+        edges            = np.sort(faces[:, [ 0, 1, 1, 2, 2, 0 ]].reshape(-1, 2), axis=1)
+        edges            = np.unique(edges[:, 0] * vertex_count + edges[:, 1])
+        edges            = np.stack(( edges // vertex_count, edges % vertex_count ), axis=1)
+        combined         = quadrics[edges[:, 0]] + quadrics[edges[:, 1]]
+
+        # Error of moving either end onto the other
+        cost_onto_second = np.einsum('ij,ijk,ik->i', points[edges[:, 1]], combined, points[edges[:, 1]])
+        cost_onto_first  = np.einsum('ij,ijk,ik->i', points[edges[:, 0]], combined, points[edges[:, 0]])
+        cost_onto_second[locked[edges[:, 0]]] = np.inf
+        cost_onto_first [locked[edges[:, 1]]] = np.inf
+
+        # Move whichever end is cheaper
+        move_first       = cost_onto_second <= cost_onto_first
+        moved            = np.where(move_first, edges[:, 0], edges[:, 1])
+        kept             = np.where(move_first, edges[:, 1], edges[:, 0])
+        cost             = np.minimum(cost_onto_second, cost_onto_first)
+
+        # The cheapest quarter of the edges. Each collapse removes about two triangles
+        needed           = max((len(faces) - target_triangles + 1) // 2, 1)
+        candidates       = np.nonzero(np.isfinite(cost))[0]
+        candidates       = candidates[np.argsort(cost[candidates], kind='stable')][:max(len(edges) // 4, needed)]
+
+        if len(candidates) == 0:
+            break
+
+        moved            = moved[candidates]
+        kept             = kept[candidates]
+        rank             = np.arange(len(candidates))
+
+        # Triangles around each moved vertex
+        corners          = np.argsort(faces.ravel(), kind='stable')
+        valence          = np.bincount(faces.ravel(), minlength=vertex_count)
+        starts           = np.cumsum(valence) - valence
+        counts           = valence[moved]
+        owner            = np.repeat(rank, counts)
+        ring             = corners[np.repeat(starts[moved], counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)] // 3
+
+        # Collapses that would fold a surviving triangle over
+        after            = np.where(faces[ring] == moved[owner][:, None], kept[owner][:, None], faces[ring])
+        degenerate       = (after[:, 0] == after[:, 1]) | (after[:, 1] == after[:, 2]) | (after[:, 2] == after[:, 0])
+        folded           = (np.einsum('ij,ij->i', triangle_planes(positions, after)[0], normals[ring]) < 0.2) & ~degenerate
+        live             = np.ones(len(candidates), dtype=bool)
+        live[owner[folded]] = False
+
+        # Every collapse claims the vertices of the triangles around its moved vertex, so that no
+        # triangle is touched by two collapses in the same pass. The cheapest live claim on a vertex
+        # wins, and collapses that overlap a winner are dropped until none are left
+        claimed          = faces[ring].ravel()
+        claimant         = np.repeat(owner, 3)
+        selected         = np.zeros(len(candidates), dtype=bool)
+        taken            = np.zeros(vertex_count, dtype=bool)
+
+        while live.any():
+            entries      = live[claimant]
+            claim        = np.full(vertex_count, len(candidates), dtype=np.int64)
+            np.minimum.at(claim, claimed[entries], claimant[entries])
+
+            lost         = np.zeros(len(candidates), dtype=bool)
+            lost[claimant[entries & (claim[claimed] != claimant)]] = True
+            winners      = live & ~lost
+
+            # Take the winners' vertices, and drop every collapse that needs one of them
+            selected    |= winners
+            taken[claimed[winners[claimant]]] = True
+            live        &= ~winners
+            live[claimant[taken[claimed]]] = False
+
+            # Stop at the target
+            if np.count_nonzero(selected) >= needed:
+                selected[np.nonzero(selected)[0][needed:]] = False
+                break
+
+        if not selected.any():
+            break
+
+        # Collapse the selected edges
+        remap            = np.arange(vertex_count)
+        remap[moved[selected]]     = kept[selected]
+        quadrics[kept[selected]]  += quadrics[moved[selected]]
+
+        # Drop the triangles that collapsed
+        faces            = remap[faces]
+        faces            = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 2] != faces[:, 0])]
+        normals          = triangle_planes(positions, faces)[0]
+
+    return faces
+
+# Write a chain of simplified levels of detail
+def write_lods ( file_path: str, vertices: np.ndarray, faces: np.ndarray, positions: np.ndarray, settings: dict, comment: str = None, quantization: dict = None ) -> list:
+
+    '''
+        Simplifies a part once per entry in settings['lod ratios'], each level starting from the 
+        last, and writes each level to its own mesh file. 
+
+        Returns a list of { path, screen size, triangles }
+    '''
+
+    # Initialized data
+    lods      = [ ]
+    lod_faces = faces
+    base      = os.path.splitext(file_path)[0]
+
+    # Vertices that share a position with another vertex sit on a UV, normal, or color seam. 
+    # Moving one side of a seam would tear the surface, so they stay put
+    _, inverse, counts = np.unique(positions, axis=0, return_inverse=True, return_counts=True)
+    locked             = counts[inverse.ravel()] > 1
+
+    for level, ( ratio, screen_size ) in enumerate(zip(settings['lod ratios'], settings['lod screen sizes']), start=1):
+
+        # Simplify the previous level
+        lod_faces   = simplify_mesh(positions, lod_faces, int(len(faces) * ratio), locked)
+        level_faces = lod_faces
+
+        # Reorder the level for the vertex cache, and keep only the vertices it uses
+        if settings['optimize vertex cache'] is True:
+            level_faces = optimize_vertex_cache(level_faces, len(vertices), VERTEX_CACHE_SIZE)
+
+        order, level_faces = optimize_vertex_fetch(level_faces, len(vertices))
+        lod_path           = f"{base}.lod{level}{MESH_FORMAT_EXTENSIONS[settings['mesh format']]}"
+
+        # Write the level
+        indices, ranges    = encode_indices(level_faces, len(order), settings['index format'])
+        write_mesh(lod_path, vertices[order], indices, settings, comment, quantization)
+
+        lods.append({
+            "path"        : lod_path,
+            "screen size" : screen_size,
+            "triangles"   : len(level_faces),
+            "index type"  : PLY_TYPE_NAMES[indices.dtype]
+        })
+
+        if ranges is not None:
+            lods[-1]["index ranges"] = ranges
+
+    return lods
+
+# Orient triangles away from a point
+def hull_planes ( points: np.ndarray, faces: np.ndarray, interior: np.ndarray ) -> tuple:
+
+    '''
+        Flips faces to wind away from an interior point, in place. 
+
+        Returns ( normals, offsets ) of their planes, where dot(normal, p) = offset
+    '''
+
+    corners            = points[faces]
+    normals            = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    inward             = np.einsum('ij,ij->i', normals, interior - corners[:, 0]) > 0.0
+
+    # Wind away from the interior
+    faces[inward]      = faces[inward][:, ::-1]
+    normals[inward]    = -normals[inward]
+
+    lengths            = np.linalg.norm(normals, axis=1)[:, None]
+    normals            = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0.0)
+
+    return normals, np.einsum('ij,ij->i', normals, corners[:, 0])
+
+# Compute a convex hull
+def convex_hull ( points: np.ndarray ) -> np.ndarray:
+
+    '''
+        Returns the outward wound ( n, 3 ) triangles of the convex hull of points, with 
+        quickhull, or None if the points are flat
+    '''
+
+    points   = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+
+    if len(points) < 4:
+        return None
+
+    # Tolerance, relative to the size of the points
+    epsilon  = 1e-9 * max(float(np.abs(points).max()), 1.0) * 3.0
+
+    # Start with a tetrahedron of extreme points. The two ends of the widest axis,
+    axis     = int(np.argmax(points.max(axis=0) - points.min(axis=0)))
+    a, b     = int(np.argmin(points[:, axis])), int(np.argmax(points[:, axis]))
+
+    # the point farthest from the line through them,
+    line     = points[b] - points[a]
+    c        = int(np.argmax(np.linalg.norm(np.cross(points - points[a], line), axis=1)))
+
+    # and the point farthest from the plane through all three
+    normal   = np.cross(points[b] - points[a], points[c] - points[a])
+    heights  = np.abs((points - points[a]) @ normal)
+    d        = int(np.argmax(heights))
+
+    if np.linalg.norm(normal) <= epsilon or heights[d] <= epsilon * np.linalg.norm(normal):
+        return None
+
+    interior         = points[[ a, b, c, d ]].mean(axis=0)
+    faces            = np.array([ [ a, b, c ], [ a, b, d ], [ a, c, d ], [ b, c, d ] ])
+    normals, offsets = hull_planes(points, faces, interior)
+    alive            = np.ones(4, dtype=bool)
+
+    # Every point outside the hull is assigned to a face it is above
+    heights          = points @ normals.T - offsets
+    outside          = np.nonzero(heights.max(axis=1) > epsilon)[0]
+    owner            = np.argmax(heights[outside], axis=1)
+    height           = heights[outside, owner]
+
+    while len(outside):
+
+        # The point farthest outside the hull
+        apex             = int(outside[np.argmax(height)])
+
+        # Faces the point can see
+        visible          = alive & (normals @ points[apex] - offsets > epsilon)
+
+        # The horizon is made of the edges that only one visible face uses
+        edges            = np.sort(faces[visible][:, [ 0, 1, 1, 2, 2, 0 ]].reshape(-1, 2), axis=1)
+        keys, uses       = np.unique(edges[:, 0] * len(points) + edges[:, 1], return_counts=True)
+        horizon          = keys[uses == 1]
+
+        # Replace the visible faces with a cone from the horizon to the point
+        cone             = np.stack(( horizon // len(points), horizon % len(points), np.full(len(horizon), apex) ), axis=1)
+        cone_normals, cone_offsets = hull_planes(points, cone, interior)
+        first            = len(faces)
+
+        alive[visible]   = False
+        faces            = np.concatenate(( faces, cone ))
+        normals          = np.concatenate(( normals, cone_normals ))
+        offsets          = np.concatenate(( offsets, cone_offsets ))
+        alive            = np.concatenate(( alive, np.ones(len(cone), dtype=bool) ))
+
+        # Points above a removed face are either inside now, or above a face of the cone
+        orphans          = visible[owner]
+        cone_heights     = points[outside[orphans]] @ cone_normals.T - cone_offsets
+        owner[orphans]   = first + np.argmax(cone_heights, axis=1)
+        height[orphans]  = cone_heights.max(axis=1)
+
+        # Keep the points still outside
+        keep             = (height > epsilon) & (outside != apex)
+        outside          = outside[keep]
+        owner            = owner[keep]
+        height           = height[keep]
+
+    return faces[alive]
+
+# Intersect half spaces
+def halfspace_vertices ( normals: np.ndarray, offsets: np.ndarray, interior: np.ndarray ) -> np.ndarray:
+
+    '''
+        Returns the corners of the intersection of the half spaces dot(normal, p) <= offset, 
+        which must all contain interior. The planes are mapped to points of the dual space, 
+        where each face of their hull is a corner of the intersection
+    '''
+
+    # Planes relative to the interior point, as dual points
+    heights  = offsets - normals @ interior
+    dual     = normals / heights[:, None]
+    faces    = convex_hull(dual)
+
+    if faces is None:
+        return None
+
+    # Each dual face is three planes that meet at a corner
+    corners  = np.linalg.solve(normals[faces], heights[faces][:, :, None])[:, :, 0] + interior
+
+    # Faces of coplanar dual points meet at the same corner
+    scale    = max(float(np.abs(corners).max()), 1.0)
+
+    return corners[np.unique(np.round(corners / (scale * 1e-9)), axis=0, return_index=True)[1]]
+
+# Simplify a convex hull
+def simplify_hull ( points: np.ndarray, faces: np.ndarray, max_vertices: int ) -> tuple:
+
+    '''
+        Reduces a convex hull to max_vertices vertices or fewer by merging its planes. The 
+        faces are clustered around evenly spread normals, each cluster becomes one plane that 
+        touches the hull, and the new hull is the intersection of those planes. Every plane 
+        touches the original hull, so the simplified hull still contains it. 
+
+        Returns ( vertices, faces )
+    '''
+
+    # Initialized data
+    vertices         = points[np.unique(faces)]
+    interior         = vertices.mean(axis=0)
+    normals, _       = hull_planes(points, faces, interior)
+    areas            = np.linalg.norm(np.cross(points[faces[:, 1]] - points[faces[:, 0]], points[faces[:, 2]] - points[faces[:, 0]]), axis=1)
+    plane_count      = min(len(faces), max(max_vertices // 2 + 2, 4))
+
+    while plane_count >= 4:
+
+        # Spread plane_count normals out, starting with the largest face
+        chosen       = [ int(np.argmax(areas)) ]
+        nearest      = normals @ normals[chosen[0]]
+
+        for _ in range(plane_count - 1):
+            chosen.append(int(np.argmin(nearest)))
+            nearest  = np.maximum(nearest, normals @ normals[chosen[-1]])
+
+        # Merge each face into the closest chosen normal, weighted by area
+        cluster      = np.argmax(normals @ normals[chosen].T, axis=1)
+        merged       = np.zeros((plane_count, 3))
+        np.add.at(merged, cluster, normals * areas[:, None])
+        merged      /= np.linalg.norm(merged, axis=1)[:, None]
+
+        # Push each plane out until it touches the hull
+        corners      = halfspace_vertices(merged, (vertices @ merged.T).max(axis=0), interior)
+
+        if corners is not None and len(corners) <= max_vertices:
+            hull = convex_hull(corners)
+
+            if hull is not None:
+                used = np.unique(hull)
+                remap = np.zeros(len(corners), dtype=np.int64)
+                remap[used] = np.arange(len(used))
+
+                return corners[used], remap[hull]
+
+        plane_count -= 1
+
+    # Fall back to the hull's own vertices
+    used  = np.unique(faces)
+    remap = np.zeros(len(points), dtype=np.int64)
+    remap[used] = np.arange(len(used))
+
+    return points[used], remap[faces]
+
+# Build a collision hull
+def collision_hull ( points: np.ndarray, max_vertices: int = 64 ) -> tuple:
+
+    '''
+        Returns ( vertices, faces ) of the convex hull of points, with max_vertices vertices 
+        or fewer, or None if the points are flat
+    '''
+
+    points = np.unique(np.asarray(points, dtype=np.float64).reshape(-1, 3), axis=0)
+    faces  = convex_hull(points)
+
+    if faces is None:
+        return None
+
+    # Drop the points inside the hull
+    used        = np.unique(faces)
+    remap       = np.zeros(len(points), dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    points      = points[used]
+    faces       = remap[faces]
+
+    if len(points) > max_vertices:
+        points, faces = simplify_hull(points, faces, max_vertices)
+
+    return points, faces
+
+# Serialize a convex hull
+def hull_bytes ( vertices: np.ndarray, faces: np.ndarray ) -> bytes:
+
+    '''
+        Returns a convex hull as a header, float < x, y, z > vertices, and ushort triangles
+    '''
+
+    return HULL_HEADER.pack(b"G10H", 1, len(vertices), len(faces)) + np.ascontiguousarray(vertices, dtype='<f4').tobytes() + np.ascontiguousarray(faces, dtype='<u2').tobytes()
+
+# Write a convex hull
+def write_hull ( file_path: str, vertices: np.ndarray, faces: np.ndarray ):
+
+    '''
+        Writes a convex hull file
+    '''
+
+    with open(file_path, "wb") as file:
+        file.write(hull_bytes(vertices, faces))
+
+    return
+
+# Write a compound collider
+def write_compound ( file_path: str, hulls: list ):
+
+    '''
+        Writes a compound collider as a header, followed by each hull
+    '''
+
+    with open(file_path, "wb") as file:
+        file.write(COMPOUND_HEADER.pack(b"G10C", 1, len(hulls)))
+
+        for vertices, faces in hulls:
+            file.write(hull_bytes(vertices, faces))
+
+    return
+
+# Encode a convex hull collider
+def encode_convex_hull ( arrays: dict, settings: dict, file_path: str, comment: str = None ) -> dict:
+
+    '''
+        Computes and writes the convex hull of arrays['xyz']. Flat meshes have no hull
+    '''
+
+    hull = collision_hull(arrays['xyz'], settings['hull max vertices'])
+
+    if hull is None:
+        return { 'json': { }, 'files': [ ], 'statistics': { } }
+
+    write_hull(file_path, *hull)
+
+    return { 'json': { 'convex hull path': file_path }, 'files': [ file_path ], 'statistics': { 'hull vertices': len(hull[0]) } }
+
+# Voxelize a mesh
+def voxelize ( positions: np.ndarray, faces: np.ndarray, resolution: int = 32 ) -> tuple:
+
+    '''
+        Returns ( voxels, origin, size ), where voxels is the ( n, 3 ) integer coordinates of 
+        the voxels inside or on the surface of a mesh, and voxel < i, j, k > spans 
+        origin + < i, j, k > * size to origin + < i + 1, j + 1, k + 1 > * size. Surface voxels 
+        are found by splitting triangles until they are smaller than half a voxel, and the 
+        interior is every voxel that can not be reached from outside the grid
+    '''
+
+    positions  = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    triangles  = positions[np.asarray(faces).reshape(-1, 3)]
+
+    # Grid spanning the mesh, with a border of empty voxels
+    lower      = positions.min(axis=0)
+    size       = max(float((positions.max(axis=0) - lower).max()), 1e-9) / resolution
+    origin     = lower - size
+    shape      = tuple(np.ceil((positions.max(axis=0) - origin) / size).astype(int) + 2)
+
+    # Split triangles until every edge is shorter than half a voxel
+    while len(triangles):
+        longest    = np.linalg.norm(triangles - triangles[:, [ 1, 2, 0 ]], axis=2).max(axis=1)
+        large      = longest > size * 0.5
+
+        if not large.any():
+            break
+
+        a, b, c    = triangles[large, 0], triangles[large, 1], triangles[large, 2]
+        ab, bc, ca = (a + b) * 0.5, (b + c) * 0.5, (c + a) * 0.5
+        triangles  = np.concatenate(( triangles[~large], np.stack(( a, ab, ca ), axis=1), np.stack(( ab, b, bc ), axis=1), np.stack(( ca, bc, c ), axis=1), np.stack(( ab, bc, ca ), axis=1) ))
+
+    # Mark the voxels under each corner
+    surface    = np.zeros(shape, dtype=bool)
+    cells      = np.clip(((triangles.reshape(-1, 3) - origin) / size).astype(int), 0, np.array(shape) - 1)
+    surface[cells[:, 0], cells[:, 1], cells[:, 2]] = True
+
+    # Flood the outside in from the border of the grid
+    outside    = np.zeros(shape, dtype=bool)
+    outside[[ 0, -1 ], :, :] = outside[:, [ 0, -1 ], :] = outside[:, :, [ 0, -1 ]] = True
+    outside   &= ~surface
+
+    while True:
+        grown                 = outside.copy()
+        grown[1: , :, :]     |= outside[:-1, :, :]
+        grown[:-1, :, :]     |= outside[1: , :, :]
+        grown[:, 1: , :]     |= outside[:, :-1, :]
+        grown[:, :-1, :]     |= outside[:, 1: , :]
+        grown[:, :, 1: ]     |= outside[:, :, :-1]
+        grown[:, :, :-1]     |= outside[:, :, 1: ]
+        grown                &= ~surface
+
+        if np.array_equal(grown, outside):
+            break
+
+        outside = grown
+
+    return np.argwhere(~outside), origin, size
+
+# Hull the corners of a set of voxels
+def voxel_hull_points ( voxels: np.ndarray ) -> np.ndarray:
+
+    '''
+        Returns the corners of the lowest and highest voxel of each column, in voxel units. 
+        Their hull is the hull of every voxel
+    '''
+
+    # Lowest and highest voxel of each < i, j > column
+    columns, inverse = np.unique(voxels[:, :2], axis=0, return_inverse=True)
+    inverse          = inverse.ravel()
+    low              = np.full(len(columns), np.iinfo(np.int64).max)
+    high             = np.full(len(columns), np.iinfo(np.int64).min)
+    np.minimum.at(low , inverse, voxels[:, 2])
+    np.maximum.at(high, inverse, voxels[:, 2])
+
+    # The four corners under the bottom of the lowest voxel, and over the top of the highest
+    square           = np.array([ [ 0, 0 ], [ 1, 0 ], [ 0, 1 ], [ 1, 1 ] ])
+    xy               = (columns[:, None, :] + square[None]).reshape(-1, 2)
+    bottom           = np.concatenate(( xy, np.repeat(low, 4)[:, None] ), axis=1)
+    top              = np.concatenate(( xy, np.repeat(high + 1, 4)[:, None] ), axis=1)
+
+    return np.unique(np.concatenate(( bottom, top )), axis=0).astype(np.float64)
+
+# Volume of a closed triangle mesh
+def hull_volume ( points: np.ndarray, faces: np.ndarray ) -> float:
+
+    '''
+        Returns the volume enclosed by outward wound triangles
+    '''
+
+    corners = points[faces]
+
+    return float(np.einsum('ij,ij->i', corners[:, 0], np.cross(corners[:, 1], corners[:, 2])).sum() / 6.0)
+
+# Measure how concave a set of voxels is
+def voxel_concavity ( voxels: np.ndarray ) -> float:
+
+    '''
+        Returns the volume between a set of voxels and their hull, in voxels
+    '''
+
+    points = voxel_hull_points(voxels)
+    faces  = convex_hull(points)
+
+    if faces is None:
+        return 0.0
+
+    return max(hull_volume(points, faces) - len(voxels), 0.0)
+
+# Approximate convex decomposition
+def decompose_convex ( positions: np.ndarray, faces: np.ndarray, max_hulls: int = 16, concavity: float = 0.02, resolution: int = 32, max_vertices: int = 64, candidates: int = 5 ) -> list:
+
+    '''
+        Splits a mesh into at most max_hulls convex hulls, in the spirit of V-HACD. The mesh is 
+        voxelized, and the most concave piece is cut in two by whichever axis aligned plane 
+        leaves the least concavity, until every piece is within concavity, a fraction of the 
+        volume of the hull of the whole mesh. 
+
+        Returns a list of ( vertices, faces ) hulls
+    '''
+
+    voxels, origin, size = voxelize(positions, faces, resolution)
+
+    if len(voxels) == 0:
+        return [ ]
+
+    # Concavity is measured against the volume of the whole hull
+    pieces     = [ ( voxel_concavity(voxels), voxels ) ]
+    points     = voxel_hull_points(voxels)
+    whole      = convex_hull(points)
+    tolerance  = concavity * ( hull_volume(points, whole) if whole is not None else len(voxels) )
+
+    while len(pieces) < max_hulls:
+
+        # Split the most concave piece
+        worst                = max(range(len(pieces)), key=lambda i: pieces[i][0])
+        error, piece         = pieces[worst]
+
+        if error <= tolerance:
+            break
+
+        best                 = None
+
+        # Try a few planes across each axis
+        for axis in range(3):
+            low, high        = int(piece[:, axis].min()), int(piece[:, axis].max())
+
+            for cut in np.unique(np.linspace(low + 1, high, candidates + 2)[1:-1].astype(int)):
+                below        = piece[:, axis] < cut
+                halves       = ( piece[below], piece[~below] )
+
+                if len(halves[0]) == 0 or len(halves[1]) == 0:
+                    continue
+
+                errors       = ( voxel_concavity(halves[0]), voxel_concavity(halves[1]) )
+
+                if best is None or sum(errors) < sum(best[0]):
+                    best     = ( errors, halves )
+
+        # Too thin to split
+        if best is None:
+            pieces[worst]    = ( 0.0, piece )
+            continue
+
+        pieces[worst:worst + 1] = [ ( best[0][0], best[1][0] ), ( best[0][1], best[1][1] ) ]
+
+    # Hull each piece, in the space of the mesh
+    hulls = [ ]
+
+    for _, piece in pieces:
+        hull = collision_hull(origin + voxel_hull_points(piece) * size, max_vertices)
+
+        if hull is not None:
+            hulls.append(hull)
+
+    return hulls
+
+# Encode a convex decomposition collider
+def encode_convex_decomposition ( arrays: dict, settings: dict, file_path: str, comment: str = None ) -> dict:
+
+    '''
+        Decomposes the mesh arrays['xyz'], arrays['faces'] into convex hulls, and writes them 
+        as a compound collider
+    '''
+
+    hulls = decompose_convex(arrays['xyz'], arrays['faces'], settings['max hulls'], settings['concavity'], settings['voxel resolution'], settings['hull max vertices'])
+
+    if len(hulls) == 0:
+        return { 'json': { }, 'files': [ ], 'statistics': { } }
+
+    write_compound(file_path, hulls)
+
+    return { 'json': { 'compound path': file_path, 'hull count': len(hulls) }, 'files': [ file_path ], 'statistics': { 'hulls': len(hulls) } }
+
+# Encode a part
+def encode_part ( arrays: dict, settings: dict, file_path: str, comment: str = None ) -> dict:
+
+    '''
+        Encodes a part with the encoder selected in settings
+    '''
+
+    # Stream large parts through the file a chunk at a time
+    if settings['streaming'] is True:
+        result = stream_ply(arrays, settings, file_path, comment)
+
+    # Encode the whole part in memory
+    else:
+        result = encode_ply(arrays, settings, file_path, comment)
+
+    # Bounding volumes of the part, so the engine can cull it without reading its vertices
+    result['json']['bounds'] = compute_bounds(arrays['xyz'])
+
+    return result
+
+# Move arrays into shared memory
+def share_arrays ( arrays: dict ) -> tuple:
+
+    '''
+        Copies each array into its own shared memory block. 
+
+        Returns ( blocks, descriptors ). The caller owns the blocks, and the descriptors 
+        are small enough to send to another process
+    '''
+
+    blocks      : list = [ ]
+    descriptors : dict = { }
+
+    for name, array in arrays.items():
+
+        # Missing arrays stay missing
+        if array is None:
+            descriptors[name] = None
+            continue
+
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+
+        # Copy the array into the block
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+
+        blocks.append(block)
+        descriptors[name] = ( block.name, array.shape, array.dtype.str )
+
+    return blocks, descriptors
+
+# Release shared memory
+def release_arrays ( blocks: list ):
+
+    '''
+        Closes and unlinks shared memory blocks made by share_arrays
+    '''
+
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+    return
+
+# Encode a part from shared memory
+def encode_shared ( descriptors: dict, settings: dict, file_path: str, comment: str = None, task: str = 'encode_part' ) -> dict:
+
+    '''
+        Worker entry point. Attaches to the arrays described by share_arrays, and runs task, 
+        the name of an encoder in this file, on them
+    '''
+
+    blocks : list = [ ]
+    arrays : dict = { }
+
+    # Attach to each block
+    for name, descriptor in descriptors.items():
+
+        if descriptor is None:
+            arrays[name] = None
+            continue
+
+        block        = shared_memory.SharedMemory(name=descriptor[0])
+        arrays[name] = np.ndarray(descriptor[1], dtype=np.dtype(descriptor[2]), buffer=block.buf)
+
+        blocks.append(block)
+
+    try:
+        return globals()[task](arrays, settings, file_path, comment)
+
+    finally:
+
+        # Drop the views before detaching. The parent unlinks the blocks
+        arrays.clear()
+
+        for block in blocks:
+            block.close()
+
+class EncodePool:
+
+    '''
+        Encodes parts in a pool of worker processes. 
+
+        Attribute arrays reach the workers through shared memory, so they are never pickled. 
+        With one worker, or if the pool can not start, parts are encoded on the calling thread
+    '''
+
+    executor : ProcessPoolExecutor = None
+    worker                         = None
+    pending  : list                = None
+    limit    : int                 = None
+
+    # Constructor
+    def __init__ ( self, workers: int = 0 ):
+
+        self.pending = [ ]
+
+        # Zero workers means one per core
+        workers      = workers if workers > 0 else (os.cpu_count() or 1)
+
+        # Keep a few parts in flight per worker, so shared memory stays bounded
+        self.limit   = 2 * workers
+
+        if workers <= 1:
+            return
+
+        try:
+
+            # Workers load this file as a top level module, so they never import the addon, or bpy
+            directory = os.path.dirname(os.path.abspath(__file__))
+
+            if directory not in sys.path:
+                sys.path.append(directory)
+
+            self.worker   = importlib.import_module('g10_geometry')
+            self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+        except Exception as e:
+            print(f"[gport] [Export] [Encode] Could not start {workers} encoding workers, encoding on the main thread. {e}")
+
+            self.executor = None
+
+        return
+
+    # Queue a part
+    def submit ( self, arrays: dict, settings: dict, file_path: str, comment: str, callback, task: str = 'encode_part' ):
+
+        '''
+            Runs task, the name of an encoder in this file, and calls callback with its result 
+            on the calling thread
+        '''
+
+        # Encode on the calling thread
+        if self.executor is None:
+            callback(globals()[task](arrays, settings, file_path, comment))
+            return
+
+        # Wait for room
+        while len(self.pending) >= self.limit:
+            self.complete(1)
+
+        # Hand the arrays to a worker
+        blocks, descriptors = share_arrays(arrays)
+
+        try:
+            future = self.executor.submit(self.worker.encode_shared, descriptors, settings, file_path, comment, task)
+        except:
+            release_arrays(blocks)
+            raise
+
+        self.pending.append( ( future, blocks, callback ) )
+
+        return
+
+    # Finish queued parts
+    def complete ( self, count: int = None ):
+
+        '''
+            Waits for the oldest count parts, or every part, and runs their callbacks
+        '''
+
+        count = len(self.pending) if count is None else min(count, len(self.pending))
+
+        for _ in range(count):
+            future, blocks, callback = self.pending.pop(0)
+
+            try:
+                result = future.result()
+            finally:
+                release_arrays(blocks)
+
+            callback(result)
+
+        return
+
+    # Destructor
+    def shutdown ( self ):
+
+        '''
+            Finishes every queued part, and stops the workers
+        '''
+
+        try:
+            self.complete()
+
+        finally:
+
+            # Release anything left over from a failed part
+            for _, blocks, _ in self.pending:
+                release_arrays(blocks)
+
+            self.pending = [ ]
+
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+        return
@@ -0,0 +1,398 @@
+#
+# GPort - Image
+#
+# Pixel kernels and encoders used to write textures. Nothing in this file touches bpy,
+# so images can be converted and compressed on worker threads while the scene is written.
+#
+
+import numpy as np
+import os, struct, zlib
+
+from concurrent.futures import ThreadPoolExecutor
+from timeit             import default_timer as timer
+
+# File extension of each image format
+IMAGE_EXTENSIONS : dict = {
+    'PNG': '.png',
+    'JPG': '.jpg',
+    'BMP': '.bmp',
+    'QOI': '.qoi'
+}
+
+# Image formats written without Blender
+IMAGE_ENCODERS   : tuple = ( 'PNG', 'BMP', 'QOI' )
+
+# PNG color type of each channel count
+PNG_COLOR_TYPES  : dict = { 3: 2, 4: 6 }
+
+# zlib level of PNG image data
+PNG_COMPRESSION  : int  = 6
+
+# QOI chunk tags
+QOI_OP_INDEX     : int  = 0x00
+QOI_OP_DIFF      : int  = 0x40
+QOI_OP_LUMA      : int  = 0x80
+QOI_OP_RUN       : int  = 0xc0
+QOI_OP_RGB       : int  = 0xfe
+QOI_OP_RGBA      : int  = 0xff
+
+# Longest QOI run
+QOI_MAX_RUN      : int  = 62
+
+# Convert linear color to sRGB
+def linear_to_srgb ( linear: np.ndarray ) -> np.ndarray:
+
+    '''
+        Applies the sRGB transfer function to linear color
+    '''
+
+    linear = np.clip(linear, 0.0, 1.0)
+
+    return np.where(linear <= 0.0031308, linear * 12.92, 1.055 * np.power(linear, 1.0 / 2.4) - 0.055)
+
+# Convert float pixels to bytes
+def quantize_pixels ( pixels: np.ndarray, width: int, height: int, channels: int, srgb: bool = False ) -> np.ndarray:
+
+    '''
+        Converts Blender's bottom up rows of float pixels to a top down ( height, width, channels )
+        array of bytes. Color is converted from linear to sRGB if srgb is set, and alpha is dropped
+        if every pixel is opaque
+    '''
+
+    pixels = np.asarray(pixels, dtype=np.float32).reshape(height, width, channels)[::-1]
+
+    # Gray and gray alpha images are written as RGB and RGBA
+    if channels < 3:
+        pixels = np.concatenate(( np.repeat(pixels[..., :1], 3, axis=2), pixels[..., 1:] ), axis=2)
+
+    color  = pixels[..., :3]
+
+    if srgb:
+        color = linear_to_srgb(color)
+
+    quantized = np.empty(pixels.shape, dtype=np.uint8)
+    quantized[..., :3] = np.rint(np.clip(color, 0.0, 1.0) * 255.0)
+
+    if pixels.shape[2] == 4:
+        quantized[..., 3] = np.rint(np.clip(pixels[..., 3], 0.0, 1.0) * 255.0)
+
+        # Opaque images do not need an alpha channel
+        if np.all(quantized[..., 3] == 255):
+            quantized = quantized[..., :3]
+
+    return np.ascontiguousarray(quantized)
+
+# Resample a channel
+def resample_channel ( channel: np.ndarray, width: int, height: int ) -> np.ndarray:
+
+    '''
+        Bilinearly resamples a ( height, width ) channel to another size, sampling at pixel centers
+    '''
+
+    source_height, source_width = channel.shape
+
+    if ( source_width, source_height ) == ( width, height ):
+        return channel
+
+    # Sample positions, in source pixels
+    x       = np.clip(( np.arange(width ) + 0.5 ) * source_width  / width  - 0.5, 0.0, source_width  - 1)
+    y       = np.clip(( np.arange(height) + 0.5 ) * source_height / height - 0.5, 0.0, source_height - 1)
+    x0, y0  = x.astype(np.int64), y.astype(np.int64)
+    x1, y1  = np.minimum(x0 + 1, source_width - 1), np.minimum(y0 + 1, source_height - 1)
+    fx, fy  = ( x - x0 )[None, :], ( y - y0 )[:, None]
+
+    # Blend along rows, then between rows
+    top     = channel[y0][:, x0] * ( 1.0 - fx ) + channel[y0][:, x1] * fx
+    bottom  = channel[y1][:, x0] * ( 1.0 - fx ) + channel[y1][:, x1] * fx
+
+    return ( top * ( 1.0 - fy ) + bottom * fy ).astype(np.float32)
+
+# Pack channels
+def pack_channels ( sources: list ) -> tuple:
+
+    '''
+        Packs one source per output channel into one image. Each source is a constant, or a 
+        ( pixels, width, height, channels ) image, whose first channel is used. Images are 
+        resampled to the largest width and height of any source.
+
+        Returns ( pixels, width, height, channels ), with rows in the same order as the sources
+    '''
+
+    images         = [ source for source in sources if isinstance(source, tuple) ]
+    width          = max([ image[1] for image in images ], default=1)
+    height         = max([ image[2] for image in images ], default=1)
+    packed         = np.empty(( height, width, len(sources) ), dtype=np.float32)
+
+    for i, source in enumerate(sources):
+
+        if isinstance(source, tuple):
+            pixels, source_width, source_height, channels = source
+            packed[..., i] = resample_channel(np.asarray(pixels, dtype=np.float32).reshape(source_height, source_width, channels)[..., 0], width, height)
+        else:
+            packed[..., i] = source
+
+    return packed.ravel(), width, height, len(sources)
+
+# Filter PNG rows
+def png_filter ( pixels: np.ndarray ) -> bytes:
+
+    '''
+        Filters each row with whichever of the Sub and Up filters leaves the smallest sum of
+        absolute differences, and prefixes it with its filter type
+    '''
+
+    height, width, channels = pixels.shape
+    rows                    = pixels.reshape(height, width * channels).astype(np.int16)
+
+    # Sub. Difference from the pixel to the left
+    sub                     = rows.copy()
+    sub[:, channels:]      -= rows[:, :-channels]
+
+    # Up. Difference from the pixel above
+    up                      = rows.copy()
+    up[1:]                 -= rows[:-1]
+
+    # Score each filter by its residuals, read as signed bytes
+    sub                     = ( sub & 0xff ).astype(np.uint8)
+    up                      = ( up  & 0xff ).astype(np.uint8)
+    use_up                  = np.abs(up.view(np.int8).astype(np.int32)).sum(axis=1) < np.abs(sub.view(np.int8).astype(np.int32)).sum(axis=1)
+
+    filtered                = np.empty(( height, width * channels + 1 ), dtype=np.uint8)
+    filtered[:, 0]          = np.where(use_up, 2, 1)
+    filtered[:, 1:]         = np.where(use_up[:, None], up, sub)
+
+    return filtered.tobytes()
+
+# PNG chunk
+def png_chunk ( tag: bytes, data: bytes ) -> bytes:
+
+    '''
+        Returns a length prefixed, CRC suffixed PNG chunk
+    '''
+
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+# Encode a PNG
+def encode_png ( pixels: np.ndarray ) -> bytes:
+
+    '''
+        Encodes a top down ( height, width, channels ) array of bytes as an 8 bit RGB or RGBA PNG
+    '''
+
+    height, width, channels = pixels.shape
+
+    return b''.join((
+        b'\x89PNG\r\n\x1a\n',
+        png_chunk(b'IHDR', struct.pack('>2I5B', width, height, 8, PNG_COLOR_TYPES[channels], 0, 0, 0)),
+        png_chunk(b'IDAT', zlib.compress(png_filter(pixels), PNG_COMPRESSION)),
+        png_chunk(b'IEND', b'')
+    ))
+
+# Encode a QOI
+def encode_qoi ( pixels: np.ndarray, srgb: bool = True ) -> bytes:
+
+    '''
+        Encodes a top down ( height, width, channels ) array of bytes as a QOI image.
+
+        The encoder is sequential in the specification, but every choice it makes only depends
+        on the previous pixel, and on the last pixel with the same hash, so each pixel's chunk is
+        found at once. The decoder's index holds the last pixel with each hash, so a pixel is an
+        index hit if that pixel equals it, or, when there is none, if it is zero
+    '''
+
+    height, width, channels = pixels.shape
+    rgba                    = np.full(( height * width, 4 ), 255, dtype=np.uint8)
+    rgba[:, :channels]      = pixels.reshape(-1, channels)
+    count                   = len(rgba)
+
+    # The pixel before each pixel. The decoder starts from opaque black
+    previous                = np.empty_like(rgba)
+    previous[0]             = ( 0, 0, 0, 255 )
+    previous[1:]            = rgba[:-1]
+    packed                  = rgba.view('<u4').ravel()
+    repeat                  = packed == previous.view('<u4').ravel()
+
+    # Runs of repeated pixels, cut into chunks of the longest run. Each chunk is written at its last pixel
+    starts                  = repeat & ~np.concatenate(( [ False ], repeat[:-1] ))
+    run_position            = np.arange(count) - np.maximum.accumulate(np.where(starts, np.arange(count), 0))
+    run_end                 = repeat & (( run_position % QOI_MAX_RUN == QOI_MAX_RUN - 1 ) | ~np.concatenate(( repeat[1:], [ False ] )))
+
+    # The last pixel with the same hash
+    hashes                  = ( rgba[:, 0].astype(np.int32) * 3 + rgba[:, 1] * 5 + rgba[:, 2] * 7 + rgba[:, 3] * 11 ) % 64
+    order                   = np.argsort(hashes, kind='stable')
+    last                    = np.full(count, -1, dtype=np.int64)
+    same                    = hashes[order[1:]] == hashes[order[:-1]]
+    last[order[1:][same]]   = order[:-1][same]
+    index                   = np.where(last >= 0, packed == packed[np.maximum(last, 0)], packed == 0)
+
+    # Differences from the previous pixel, wrapped to signed bytes
+    difference              = ( rgba.astype(np.int16) - previous ).astype(np.int8).astype(np.int16)
+    dr, dg, db, da          = difference.T
+    dr_dg, db_dg            = dr - dg, db - dg
+
+    # Pick the smallest chunk of each pixel
+    literal                 = ~repeat
+    use_index               = literal & index
+    literal                &= ~use_index
+    use_diff                = literal & ( da == 0 ) & ( dr >= -2 ) & ( dr <= 1 ) & ( dg >= -2 ) & ( dg <= 1 ) & ( db >= -2 ) & ( db <= 1 )
+    literal                &= ~use_diff
+    use_luma                = literal & ( da == 0 ) & ( dg >= -32 ) & ( dg <= 31 ) & ( dr_dg >= -8 ) & ( dr_dg <= 7 ) & ( db_dg >= -8 ) & ( db_dg <= 7 )
+    literal                &= ~use_luma
+    use_rgb                 = literal & ( da == 0 )
+    use_rgba                = literal & ( da != 0 )
+
+    # Lay the chunks out
+    sizes                   = run_end + use_index + use_diff + 2 * use_luma + 4 * use_rgb + 5 * use_rgba
+    offsets                 = np.cumsum(sizes) - sizes
+    body                    = np.zeros(int(sizes.sum()), dtype=np.uint8)
+
+    body[offsets[run_end]]       = QOI_OP_RUN | ( run_position[run_end] % QOI_MAX_RUN )
+    body[offsets[use_index]]     = QOI_OP_INDEX | hashes[use_index]
+    body[offsets[use_diff]]      = QOI_OP_DIFF | (( dr[use_diff] + 2 ) << 4) | (( dg[use_diff] + 2 ) << 2) | ( db[use_diff] + 2 )
+    body[offsets[use_luma]]      = QOI_OP_LUMA | ( dg[use_luma] + 32 )
+    body[offsets[use_luma] + 1]  = (( dr_dg[use_luma] + 8 ) << 4) | ( db_dg[use_luma] + 8 )
+    body[offsets[use_rgb]]       = QOI_OP_RGB
+    body[offsets[use_rgba]]      = QOI_OP_RGBA
+
+    for channel in range(3):
+        body[offsets[use_rgb] + 1 + channel] = rgba[use_rgb, channel]
+
+    for channel in range(4):
+        body[offsets[use_rgba] + 1 + channel] = rgba[use_rgba, channel]
+
+    return b''.join((
+        struct.pack('>4s2I2B', b'qoif', width, height, channels, 0 if srgb else 1),
+        body.tobytes(),
+        bytes(7) + b'\x01'
+    ))
+
+# Encode a BMP
+def encode_bmp ( pixels: np.ndarray ) -> bytes:
+
+    '''
+        Encodes a top down ( height, width, channels ) array of bytes as an uncompressed, bottom
+        up 24 or 32 bit BMP
+    '''
+
+    height, width, channels = pixels.shape
+    stride                  = ( width * channels + 3 ) & ~3
+    rows                    = np.zeros(( height, stride ), dtype=np.uint8)
+
+    # BGR(A), with the bottom row first
+    swizzled                = pixels[::-1].copy()
+    swizzled[..., :3]       = swizzled[..., 2::-1]
+    rows[:, :width * channels] = swizzled.reshape(height, -1)
+
+    return b''.join((
+        struct.pack('<2sI2HI', b'BM', 54 + rows.nbytes, 0, 0, 54),
+        struct.pack('<3I2H6I', 40, width, height, 1, 8 * channels, 0, rows.nbytes, 2835, 2835, 0, 0),
+        rows.tobytes()
+    ))
+
+# Write an image
+def write_image ( pixels: np.ndarray, width: int, height: int, channels: int, srgb: bool, colorspace: bool, file_path: str, image_format: str ) -> dict:
+
+    '''
+        Converts, encodes and writes float pixels. srgb converts linear color to sRGB. colorspace 
+        is set when the written pixels are sRGB color, and clear when they are linear or data.
+
+        Returns the number of bytes of 8 bit pixels, the size of the file, and the seconds it took
+    '''
+
+    started   = timer()
+    quantized = quantize_pixels(pixels, width, height, channels, srgb)
+
+    if image_format == 'PNG':
+        data = encode_png(quantized)
+    elif image_format == 'QOI':
+        data = encode_qoi(quantized, colorspace)
+    else:
+        data = encode_bmp(quantized)
+
+    with open(file_path, "wb") as file:
+        file.write(data)
+
+    return { 'pixel bytes': quantized.nbytes, 'file bytes': len(data), 'seconds': timer() - started }
+
+class ImageWriter:
+
+    '''
+        Writes images on a pool of threads.
+
+        Conversion and compression happen in NumPy and zlib, which release the GIL, so
+        images encode concurrently with each other, and with the rest of the export.
+        With one worker, images are written on the calling thread
+    '''
+
+    executor : ThreadPoolExecutor = None
+    pending  : list               = None
+    images   : int                = 0
+    pixels   : int                = 0
+    written  : int                = 0
+    seconds  : float              = 0.0
+
+    # Constructor
+    def __init__ ( self, workers: int = 0 ):
+
+        self.pending = [ ]
+
+        # Zero workers means one per core
+        workers      = workers if workers > 0 else (os.cpu_count() or 1)
+
+        if workers > 1:
+            self.executor = ThreadPoolExecutor(max_workers=workers)
+
+        return
+
+    # Queue an image
+    def submit ( self, pixels: np.ndarray, width: int, height: int, channels: int, srgb: bool, colorspace: bool, file_path: str, image_format: str ):
+
+        '''
+            Writes pixels, which are read from bpy on the calling thread, to file_path
+        '''
+
+        if self.executor is None:
+            self.count(write_image(pixels, width, height, channels, srgb, colorspace, file_path, image_format))
+            return
+
+        self.pending.append(self.executor.submit(write_image, pixels, width, height, channels, srgb, colorspace, file_path, image_format))
+
+        return
+
+    # Accumulate an image's sizes
+    def count ( self, result: dict ):
+
+        self.images  = self.images  + 1
+        self.pixels  = self.pixels  + result['pixel bytes']
+        self.written = self.written + result['file bytes']
+        self.seconds = self.seconds + result['seconds']
+
+        return
+
+    # Finish every image
+    def shutdown ( self ) -> dict:
+
+        '''
+            Waits for every queued image.
+
+            Returns the number of images, their pixel and file bytes, the seconds spent writing 
+            them, and the pixel throughput in MB/s. Each image is timed on its own thread, so 
+            throughput is per thread, and does not count the time images waited in the queue
+        '''
+
+        try:
+            for future in self.pending:
+                self.count(future.result())
+        finally:
+            self.pending = [ ]
+
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+
+        return {
+            'images'     : self.images,
+            'pixel bytes': self.pixels,
+            'file bytes' : self.written,
+            'seconds'    : self.seconds,
+            'throughput' : self.pixels / 1e6 / self.seconds if self.seconds > 0.0 else 0.0
+        }
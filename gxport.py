@@ -13,6 +13,7 @@ from bpy.props           import (
     EnumProperty,
     IntProperty,
     FloatProperty,
+    FloatVectorProperty,
     CollectionProperty
 )
 
@@ -34,7 +35,9 @@ from .g10_blender import (
     Action,
     Rig,
     set_export_context,
-    clear_export_context
+    clear_export_context,
+    export_statistics,
+    asset_statistics
 )
 
 attachment_types : dict = {
@@ -131,6 +134,30 @@ class gxport(Operator, ExportHelper):
         ("QOI", "QOI", "QOI")
     }
 
+    ORM_CHANNELS = {
+        ("ao"   , "Ambient Occlusion", "Ambient occlusion. Unoccluded if the material has no occlusion map"),
+        ("rough", "Rough"            , "Roughness"),
+        ("metal", "Metal"            , "Metalness"),
+        ("none" , "None"             , "Leave the channel empty")
+    }
+
+    MESH_FORMATS = {
+        ("PLY"    , "PLY"    , "Binary PLY"),
+        ("G10MESH", "G10Mesh", "G10 binary mesh, which the engine maps without parsing")
+    }
+
+    QUANTIZATION_PROFILES = {
+        ("NONE"    , "None"    , "Write every attribute as 32 bit floats"),
+        ("BALANCED", "Balanced", "Half float positions, octahedral snorm16 normals and tangents, unorm16 texture coordinates"),
+        ("COMPACT" , "Compact" , "Unorm16 positions, octahedral snorm8 normals and tangents, unorm16 texture coordinates")
+    }
+
+    INDEX_FORMATS = {
+        ("UINT32"  , "32 bit"  , "Always write 32 bit indices"),
+        ("ADAPTIVE", "Adaptive", "Write 16 bit indices when a part has 65536 vertices or fewer"),
+        ("SPLIT"   , "16 bit"  , "Always write 16 bit indices, splitting larger parts into ranges with a base vertex")
+    }
+
     # ExportHelper mixin class uses this
     filename_ext = ""
     
@@ -300,6 +327,45 @@ class gxport(Operator, ExportHelper):
         description = "Emission maps make objects bright",
         default     = False
     )
+
+    use_orm: BoolProperty(
+        name        = "ORM",
+        description = "Pack the ambient occlusion, rough and metal maps into the channels of one texture, resampled to the largest map",
+        default     = False
+    )
+
+    orm_red: EnumProperty(
+        name        = "R",
+        default     = "ao",
+        items       = ORM_CHANNELS,
+        description = "The map packed into the red channel"
+    )
+
+    orm_green: EnumProperty(
+        name        = "G",
+        default     = "rough",
+        items       = ORM_CHANNELS,
+        description = "The map packed into the green channel"
+    )
+
+    orm_blue: EnumProperty(
+        name        = "B",
+        default     = "metal",
+        items       = ORM_CHANNELS,
+        description = "The map packed into the blue channel"
+    )
+
+    use_texture_pool: BoolProperty(
+        name        = "Texture pool",
+        description = "Write textures to a shared textures directory, named by a hash of their content, so identical images used by different materials are written once",
+        default     = False
+    )
+
+    use_constant_textures: BoolProperty(
+        name        = "Constant textures",
+        description = "Also write unlinked inputs as 1x1 textures, shared by every material with the same value, for shaders that sample every map. Unlinked inputs are always written as material factors",
+        default     = False
+    )
     
 
     # Vertex group properties
@@ -350,6 +416,190 @@ class gxport(Operator, ExportHelper):
         description = "Bone weights",
         default     = False
     )
+
+    bone_influences: IntProperty(
+        name        = "Bone influences",
+        description = "The number of most heavily weighted bones written to each vertex",
+        default     = 4,
+        min         = 1,
+        max         = 8
+    )
+
+    # Part encoding properties
+    use_streaming: BoolProperty(
+        name        = "Stream parts",
+        description = "Encode parts a chunk of triangles at a time, so very large meshes export in bounded memory. Streamed parts skip vertex cache optimization, meshlets, BVHs, levels of detail and 16 bit indices",
+        default     = False
+    )
+
+    stream_chunk_size: IntProperty(
+        name        = "Chunk size",
+        description = "Triangles encoded per chunk when streaming parts",
+        default     = 262144,
+        min         = 1024,
+        max         = 16777216
+    )
+
+    use_tolerance_welding: BoolProperty(
+        name        = "Tolerance welding",
+        description = "Weld vertices whose positions, normals and UVs only differ by a small amount, such as float noise left by booleans and imports",
+        default     = False
+    )
+
+    weld_position_epsilon: FloatProperty(
+        name        = "Position",
+        description = "Largest distance between welded positions",
+        default     = 1e-5,
+        min         = 0.0,
+        precision   = 6,
+        subtype     = 'DISTANCE'
+    )
+
+    weld_normal_epsilon: FloatProperty(
+        name        = "Normal",
+        description = "Largest distance between welded unit normals",
+        default     = 1e-3,
+        min         = 0.0,
+        max         = 2.0,
+        precision   = 5
+    )
+
+    weld_uv_epsilon: FloatProperty(
+        name        = "UV",
+        description = "Largest distance between welded texture coordinates",
+        default     = 1e-5,
+        min         = 0.0,
+        precision   = 6
+    )
+
+    use_vertex_cache_optimization: BoolProperty(
+        name        = "Optimize vertex cache",
+        description = "Reorder triangles and vertices after welding, so the GPU reuses more transformed vertices. Slow, about half a second per 200,000 triangles",
+        default     = False
+    )
+
+    use_meshlets: BoolProperty(
+        name        = "Meshlets",
+        description = "Partition each part into clusters with bounding spheres and normal cones, for cluster culling",
+        default     = False
+    )
+
+    meshlet_max_vertices: IntProperty(
+        name        = "Max vertices",
+        description = "Most vertices in one meshlet",
+        default     = 64,
+        min         = 3,
+        max         = 255
+    )
+
+    meshlet_max_triangles: IntProperty(
+        name        = "Max triangles",
+        description = "Most triangles in one meshlet",
+        default     = 124,
+        min         = 1,
+        max         = 512
+    )
+
+    use_bvh: BoolProperty(
+        name        = "BVH",
+        description = "Build a bounding volume hierarchy over each part's triangles, for raycasts and collision",
+        default     = False
+    )
+
+    quantization_profile: EnumProperty(
+        name        = "Quantization",
+        default     = "NONE",
+        items       = QUANTIZATION_PROFILES,
+        description = "Vertex attribute encoding. Bitangents are written as a tangent handedness when quantized"
+    )
+
+    index_format: EnumProperty(
+        name        = "Indices",
+        default     = "UINT32",
+        items       = INDEX_FORMATS,
+        description = "Index width of each part"
+    )
+
+    use_fixed_triangles: BoolProperty(
+        name        = "Fixed triangles",
+        description = "Write a fixed size triangle element, without the count byte of each face",
+        default     = False
+    )
+
+    use_lods: BoolProperty(
+        name        = "Levels of detail",
+        description = "Simplify each part into a chain of lower levels of detail",
+        default     = False
+    )
+
+    lod_count: IntProperty(
+        name        = "Levels",
+        description = "Simplified levels written after the full detail part",
+        default     = 3,
+        min         = 1,
+        max         = 4
+    )
+
+    lod_ratios: FloatVectorProperty(
+        name        = "Triangles",
+        description = "Fraction of the part's triangles kept at each level",
+        size        = 4,
+        default     = (0.5, 0.25, 0.1, 0.05),
+        min         = 0.001,
+        max         = 1.0,
+        subtype     = 'FACTOR'
+    )
+
+    lod_screen_sizes: FloatVectorProperty(
+        name        = "Screen size",
+        description = "Fraction of the screen's height the part's bounds cover when each level takes over",
+        size        = 4,
+        default     = (0.5, 0.25, 0.1, 0.05),
+        min         = 0.0,
+        max         = 1.0,
+        subtype     = 'FACTOR'
+    )
+
+    convex_hull_max_vertices: IntProperty(
+        name        = "Hull vertices",
+        description = "Most vertices in a convex hull collider. Larger hulls are simplified by merging their planes",
+        default     = 64,
+        min         = 4,
+        max         = 1024
+    )
+
+    decomposition_max_hulls: IntProperty(
+        name        = "Hulls",
+        description = "Most convex hulls in the decomposition of a mesh collider",
+        default     = 16,
+        min         = 1,
+        max         = 256
+    )
+
+    decomposition_concavity: FloatProperty(
+        name        = "Concavity",
+        description = "Largest gap between a mesh collider and its hulls, as a fraction of the volume of its convex hull",
+        default     = 0.02,
+        min         = 0.0,
+        max         = 1.0,
+        subtype     = 'FACTOR'
+    )
+
+    decomposition_resolution: IntProperty(
+        name        = "Voxels",
+        description = "Voxels across the longest side of a mesh collider when it is decomposed",
+        default     = 32,
+        min         = 8,
+        max         = 128
+    )
+
+    encode_workers: IntProperty(
+        name        = "Encoding workers",
+        description = "Processes used to encode parts. 0 uses one per core, 1 encodes on the main thread",
+        default     = 0,
+        min         = 0,
+        max         = 256
+    )
     
     # Texture export resolution property
     texture_resolution: IntProperty(
@@ -369,6 +619,13 @@ class gxport(Operator, ExportHelper):
         description = "The image format"
     )
 
+    mesh_format: EnumProperty(
+        name        = "",
+        default     = "PLY",
+        items       = MESH_FORMATS,
+        description = "The mesh format"
+    )
+
     # Lighting probe properties
     light_probe_dim: IntProperty(
         name    = "",
@@ -405,6 +662,31 @@ class gxport(Operator, ExportHelper):
         state['vertex groups'].append("rgba" if self.use_color        else None)
         state['vertex groups'].append("bg"   if self.use_bone_groups  else None)
         state['vertex groups'].append("bw"   if self.use_bone_weights else None)
+        state['bone influences']        = self.bone_influences
+
+        # Part encoding
+        state['streaming']              = self.use_streaming
+        state['stream chunk size']      = self.stream_chunk_size
+        state['optimize vertex cache']  = self.use_vertex_cache_optimization
+        state['tolerance welding']      = self.use_tolerance_welding
+        state['weld position epsilon']  = self.weld_position_epsilon
+        state['weld normal epsilon']    = self.weld_normal_epsilon
+        state['weld uv epsilon']        = self.weld_uv_epsilon
+        state['meshlets']               = self.use_meshlets
+        state['meshlet max vertices']   = self.meshlet_max_vertices
+        state['meshlet max triangles']  = self.meshlet_max_triangles
+        state['bvh']                    = self.use_bvh
+        state['quantization']           = self.quantization_profile
+        state['index format']           = self.index_format
+        state['fixed triangles']        = self.use_fixed_triangles
+        state['lods']                   = self.use_lods
+        state['lod ratios']             = list(self.lod_ratios)[:self.lod_count]
+        state['lod screen sizes']       = list(self.lod_screen_sizes)[:self.lod_count]
+        state['encode workers']         = self.encode_workers
+        state['hull max vertices']      = self.convex_hull_max_vertices
+        state['max hulls']              = self.decomposition_max_hulls
+        state['concavity']              = self.decomposition_concavity
+        state['voxel resolution']       = self.decomposition_resolution
         
         # Material settings
         state['material textures']      = []
@@ -415,6 +697,10 @@ class gxport(Operator, ExportHelper):
         state['material textures'].append("ao"      if self.use_ao     else None)
         state['material textures'].append("height"  if self.use_height else None)
         state['material textures'].append("emit"    if self.use_emit   else None)
+        state['material textures'].append("orm"     if self.use_orm    else None)
+        state['orm channels']           = [ self.orm_red, self.orm_green, self.orm_blue ]
+        state['constant textures']      = self.use_constant_textures
+        state['texture pool']           = self.use_texture_pool
         
         # Shader settings
         state['shader']                 = f"{g10_source}/G10/shaders/{self.shader_option}.json"
@@ -424,6 +710,7 @@ class gxport(Operator, ExportHelper):
         # Bake settings
         state['texture resolution']     = self.texture_resolution
         state['image format']           = self.image_format
+        state['mesh format']            = self.mesh_format
         state['light probe resolution'] = self.light_probe_dim
 
         set_export_context(state)
@@ -457,6 +744,23 @@ class gxport(Operator, ExportHelper):
 
         self.report({'INFO'}, "Export finished in %dh %dm %ds" % (int(seconds/3600),int(seconds/60), int(seconds%60)))       
 
+        # Report how much work the export avoided
+        self.report({'INFO'}, "Encoded %d parts, skipped %d linked duplicate encodes and %d unchanged parts" % (export_statistics.get('parts encoded', 0), export_statistics.get('parts skipped', 0), export_statistics.get('parts unchanged', 0)))
+
+        # Report the writes the asset registry short circuited
+        for kind, statistics in asset_statistics().items():
+            if statistics['written'] > 0:
+                self.report({'INFO'}, "Wrote %d %s, skipped %d repeat writes, avoiding %.1f MB" % (statistics['written'], kind, statistics['repeats'], statistics['bytes avoided'] / 1e6))
+
+        if 'textures written' in export_statistics:
+            self.report({'INFO'}, "Wrote %d textures at %.1f MB/s per thread" % (export_statistics['textures written'], export_statistics['texture throughput']))
+
+        if 'parts streamed with skipped steps' in export_statistics:
+            self.report({'WARNING'}, "Streamed %d parts, skipping steps that need the whole part. The console lists them for each part" % export_statistics['parts streamed with skipped steps'])
+
+        if 'vertices welded' in export_statistics:
+            self.report({'INFO'}, "Tolerance welding saved %d vertices" % export_statistics['vertices welded'])
+
         return {'FINISHED'}
 
     # Draw general configuration tab
@@ -706,6 +1010,7 @@ class gxport(Operator, ExportHelper):
             self.use_ao           = False
             self.use_height       = False
             self.use_emit         = False
+            self.use_orm          = False
 
             # Set vertex groups for selected shader
             for vert_group in shader_dict['in']:
@@ -744,6 +1049,13 @@ class gxport(Operator, ExportHelper):
                             self.use_height = True
                         if b['name'] == 'emit':
                             self.use_emit = True
+
+                        # Packed ambient occlusion, rough and metal. The descriptor may name the map in each channel
+                        if b['name'] == 'orm':
+                            self.use_orm = True
+
+                            if len(b.get('channels', [ ])) == 3:
+                                self.orm_red, self.orm_green, self.orm_blue = b['channels']
         return
 
     # Draw the material export options
@@ -760,6 +1072,16 @@ class gxport(Operator, ExportHelper):
         box.prop(self, "use_ao")
         box.prop(self, "use_height")
         box.prop(self, "use_emit")
+        box.prop(self, "use_orm")
+
+        if self.use_orm:
+            r = box.row()
+            r.prop(self, "orm_red")
+            r.prop(self, "orm_green")
+            r.prop(self, "orm_blue")
+
+        box.prop(self, "use_constant_textures")
+        box.prop(self, "use_texture_pool")
 
         return
     
@@ -783,6 +1105,10 @@ class gxport(Operator, ExportHelper):
         box.label(text='Texture', icon='TEXTURE_DATA')
         box.prop(self, "texture_resolution")
         box.prop(self, "image_format")
+
+        box = layout.box()
+        box.label(text='Mesh', icon='MESH_DATA')
+        box.prop(self, "mesh_format")
         return    
     
     # Draw light probe box
@@ -870,6 +1196,73 @@ class gxport(Operator, ExportHelper):
 
         box.prop(self,"use_bone_weights")    
 
+        box.prop(self,"bone_influences")
+
+        box = layout.box()
+        box.label(text='Part encoding', icon='MESH_DATA')
+
+        box.prop(self,"use_streaming")
+
+        if self.use_streaming:
+            box.prop(self,"stream_chunk_size")
+
+        box.prop(self,"use_tolerance_welding")
+
+        if self.use_tolerance_welding:
+            r = box.row()
+            r.prop(self,"weld_position_epsilon")
+            r.prop(self,"weld_normal_epsilon")
+            r.prop(self,"weld_uv_epsilon")
+
+        # Steps that need the whole part do nothing when streaming
+        whole = box.column()
+        whole.active = not self.use_streaming
+
+        whole.prop(self,"use_vertex_cache_optimization")
+
+        box.prop(self,"quantization_profile")
+
+        r = box.row()
+        sub = r.row()
+        sub.active = not self.use_streaming
+        sub.prop(self,"index_format")
+        r.prop(self,"use_fixed_triangles")
+
+        whole = box.column()
+        whole.active = not self.use_streaming
+
+        whole.prop(self,"use_meshlets")
+
+        if self.use_meshlets:
+            r = whole.row()
+            r.prop(self,"meshlet_max_vertices")
+            r.prop(self,"meshlet_max_triangles")
+
+        whole.prop(self,"use_bvh")
+
+        whole.prop(self,"use_lods")
+
+        if self.use_lods:
+            whole.prop(self,"lod_count")
+
+            for i in range(self.lod_count):
+                r = whole.row()
+                r.label(text=f"LOD {i + 1}")
+                r.prop(self,"lod_ratios", index=i, text="Triangles")
+                r.prop(self,"lod_screen_sizes", index=i, text="Screen size")
+
+        box.prop(self,"encode_workers")
+
+        box = layout.box()
+        box.label(text='Colliders', icon='MESH_ICOSPHERE')
+
+        box.prop(self,"convex_hull_max_vertices")
+
+        box.label(text='Mesh decomposition')
+        box.prop(self,"decomposition_max_hulls")
+        box.prop(self,"decomposition_concavity")
+        box.prop(self,"decomposition_resolution")
+
         return
     
     def draw_rig_settings(self, context):
@@ -0,0 +1,11 @@
+#
+# GPort - Tests
+#
+# The repository root is the Blender add-on, and its __init__.py needs bpy, so the tests are
+# run from this directory ( tests/pytest.ini makes it the rootdir ). The geometry and image
+# modules do not touch bpy, and are imported straight from the repository root
+#
+
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,128 @@
+#
+# GPort - Test support
+#
+# Meshes, settings and readers shared by the tests
+#
+
+import numpy as np
+
+import g10_geometry
+
+# Make a UV sphere
+def uv_sphere ( rings: int = 24, segments: int = 32 ) -> dict:
+
+    '''
+        Returns the arrays of a closed UV sphere, laid out like Part.extract_arrays
+    '''
+
+    u, v      = np.meshgrid(np.linspace(0.0, 2.0 * np.pi, segments, endpoint=False), np.linspace(0.05, np.pi - 0.05, rings))
+    xyz       = np.stack(( np.sin(v) * np.cos(u), np.sin(v) * np.sin(u), np.cos(v) ), axis=-1).reshape(-1, 3).astype(np.float32)
+    grid      = np.arange(rings * segments).reshape(rings, segments)
+    a, b      = grid[:-1], np.roll(grid, -1, axis=1)[:-1]
+    c, d      = grid[1:] , np.roll(grid, -1, axis=1)[1:]
+    faces     = np.concatenate(( np.stack(( a, c, b ), axis=-1).reshape(-1, 3), np.stack(( b, c, d ), axis=-1).reshape(-1, 3) )).astype(np.int32)
+    uv        = np.stack(( u.ravel() / ( 2.0 * np.pi ), v.ravel() / np.pi ), axis=-1).astype(np.float32)
+
+    return {
+        'triangle vertices': faces,
+        'triangle loops'   : np.arange(faces.size, dtype=np.int32).reshape(-1, 3),
+        'xyz'              : xyz,
+        'nxyz'             : xyz.copy(),
+        'uv'               : uv[faces.ravel()],
+        'rgba'             : None,
+        'bg'               : None,
+        'bw'               : None
+    }
+
+# Make a torus
+def torus ( segments: int = 48, sides: int = 24, major: float = 2.0, minor: float = 0.5 ) -> tuple:
+
+    '''
+        Returns ( positions, faces ) of a closed torus
+    '''
+
+    u, v      = np.meshgrid(np.linspace(0.0, 2.0 * np.pi, segments, endpoint=False), np.linspace(0.0, 2.0 * np.pi, sides, endpoint=False))
+    positions = np.stack(( ( major + minor * np.cos(v) ) * np.cos(u), ( major + minor * np.cos(v) ) * np.sin(u), minor * np.sin(v) ), axis=-1).reshape(-1, 3)
+    grid      = np.arange(sides * segments).reshape(sides, segments)
+    a, b      = grid, np.roll(grid, -1, axis=1)
+    c, d      = np.roll(grid, -1, axis=0), np.roll(b, -1, axis=0)
+    faces     = np.concatenate(( np.stack(( a, b, c ), axis=-1).reshape(-1, 3), np.stack(( b, d, c ), axis=-1).reshape(-1, 3) ))
+
+    return positions, faces
+
+# Make encoder settings
+def encoding_settings ( **overrides ) -> dict:
+
+    '''
+        Returns settings for encode_part, with every optional step off
+    '''
+
+    settings = { key: None for key in g10_geometry.ENCODING_SETTINGS }
+
+    settings.update({
+        'vertex groups'         : [ 'xyz', 'uv', 'nxyz' ],
+        'bone influences'       : 4,
+        'streaming'             : False,
+        'stream chunk size'     : 256,
+        'optimize vertex cache' : False,
+        'meshlets'              : False,
+        'meshlet max vertices'  : 64,
+        'meshlet max triangles' : 124,
+        'bvh'                   : False,
+        'lods'                  : False,
+        'lod ratios'            : [ 0.5, 0.25 ],
+        'lod screen sizes'      : [ 0.5, 0.25 ],
+        'quantization'          : 'NONE',
+        'index format'          : 'UINT32',
+        'fixed triangles'       : False,
+        'mesh format'           : 'PLY',
+        'tolerance welding'     : False,
+        'weld position epsilon' : 1e-5,
+        'weld normal epsilon'   : 1e-3,
+        'weld uv epsilon'       : 1e-5
+    })
+    settings.update(overrides)
+
+    return settings
+
+# Read a binary PLY file
+def read_ply ( file_path: str ) -> tuple:
+
+    '''
+        Returns ( header lines, vertices, faces ) of a binary little endian PLY file written by
+        the encoder. Vertices are a structured array with one field per property
+    '''
+
+    with open(file_path, "rb") as f:
+        data = f.read()
+
+    end      = data.index(b"end_header\n") + len(b"end_header\n")
+    header   = data[:end].decode('ascii').splitlines()
+    elements = [ ]
+
+    for line in header:
+        words = line.split()
+
+        if words[0] == 'element':
+            elements.append(( words[1], int(words[2]), [ ] ))
+        elif words[0] == 'property':
+            elements[-1][2].append(words[1:])
+
+    # Vertex block
+    name, vertex_count, properties = elements[0]
+    vertex_dtype = np.dtype([ ( p[1], g10_geometry.PLY_TYPES[p[0]] ) for p in properties ])
+    vertices     = np.frombuffer(data, dtype=vertex_dtype, count=vertex_count, offset=end)
+    offset       = end + vertex_count * vertex_dtype.itemsize
+
+    # Face block, with or without a count byte
+    name, face_count, properties = elements[1]
+
+    if name == 'triangle':
+        faces = np.frombuffer(data, dtype=g10_geometry.PLY_TYPES[properties[0][0]], count=face_count * 3, offset=offset)
+    else:
+        index = g10_geometry.PLY_TYPES[properties[0][2]]
+        faces = np.frombuffer(data, dtype=[ ( 'count', 'u1' ), ( 'vertex_indices', index, ( 3, ) ) ], count=face_count, offset=offset)
+        assert ( faces['count'] == 3 ).all()
+        faces = faces['vertex_indices']
+
+    return header, vertices, faces.reshape(-1, 3).astype(np.int64)
@@ -0,0 +1,569 @@
+#
+# GPort - Geometry tests
+#
+
+import numpy as np
+
+import pytest
+
+from support import uv_sphere, torus, encoding_settings, read_ply
+
+import g10_geometry as g
+
+# Positions of each corner of each triangle of a PLY file
+def triangle_positions ( file_path: str ) -> np.ndarray:
+
+    _, vertices, faces = read_ply(file_path)
+    positions          = np.stack(( vertices['x'], vertices['y'], vertices['z'] ), axis=-1)
+
+    return positions[faces]
+
+# Encoding
+def test_encoded_part_keeps_every_triangle ( tmp_path ):
+
+    arrays             = uv_sphere()
+    file_path          = str(tmp_path / "part.ply")
+
+    g.encode_part(arrays, encoding_settings(), file_path)
+
+    header, vertices, faces = read_ply(file_path)
+    corners            = arrays['triangle vertices'].ravel()
+
+    # Each corner keeps its position, normal and UV
+    assert np.allclose(triangle_positions(file_path).reshape(-1, 3), arrays['xyz'][corners])
+    assert np.allclose(np.stack(( vertices['nx'], vertices['ny'], vertices['nz'] ), axis=-1)[faces.ravel()], arrays['nxyz'][corners])
+    assert np.allclose(np.stack(( vertices['s'], vertices['t'] ), axis=-1)[faces.ravel()], arrays['uv'])
+
+# Welding
+def test_weld_vertices_collapses_identical_rows ():
+
+    records            = np.zeros(6, dtype=g.ply_vertex_dtype([ 'xyz' ]))
+    records['xyz']     = [ [ 0, 0, 0 ], [ 1, 0, 0 ], [ 0, 0, 0 ], [ 0, 1, 0 ], [ 1, 0, 0 ], [ 0, 0, 0 ] ]
+
+    unique, remap      = g.weld_vertices(records)
+
+    assert len(unique) == 3
+    assert ( unique[remap] == records ).all()
+    assert remap.tolist() == [ 0, 1, 0, 2, 1, 0 ]
+
+# PLY files
+@pytest.mark.parametrize('fixed_triangles', [ False, True ])
+def test_written_ply_reads_back ( tmp_path, fixed_triangles ):
+
+    rng                = np.random.default_rng(3)
+    vertices           = np.zeros(10, dtype=g.ply_vertex_dtype([ 'xyz', 'uv', 'nxyz', 'rgba' ]))
+    vertices['xyz']    = rng.random(( 10, 3 ))
+    vertices['rgba']   = rng.integers(0, 256, ( 10, 4 ))
+    faces              = rng.integers(0, 10, ( 7, 3 )).astype(np.uint16)
+    file_path          = str(tmp_path / "part.ply")
+
+    g.write_ply(file_path, vertices, faces, comment="test", fixed_triangles=fixed_triangles)
+
+    header, read_vertices, read_faces = read_ply(file_path)
+
+    assert "comment test" in header
+    assert ( "element triangle 7" in header ) == fixed_triangles
+    assert read_vertices.tobytes() == vertices.tobytes()
+    assert np.array_equal(read_faces, faces)
+
+# Tangents
+def test_tangents_follow_the_uvs ():
+
+    positions          = np.array([ [ 0, 0, 0 ], [ 2, 0, 0 ], [ 2, 2, 0 ], [ 0, 2, 0 ] ], dtype=np.float32)
+    faces              = np.array([ [ 0, 1, 2 ], [ 0, 2, 3 ] ])
+    normals            = np.tile(np.float32([ 0, 0, 1 ]), ( 4, 1 ))
+
+    # U runs along x, and V runs along -y, so the tangent space is left handed
+    uvs                = positions[:, :2] * [ 0.5, -0.5 ]
+
+    tangents, bitangents = g.compute_tangents(positions[faces], uvs[faces], faces, normals)
+
+    assert np.allclose(tangents  , [ 1, 0, 0 ])
+    assert np.allclose(bitangents, [ 0, -1, 0 ])
+
+def test_triangles_without_uv_area_get_a_perpendicular_tangent ():
+
+    positions          = np.array([ [ 0, 0, 0 ], [ 1, 0, 0 ], [ 0, 1, 0 ] ], dtype=np.float32)
+    faces              = np.array([ [ 0, 1, 2 ] ])
+    normals            = np.tile(np.float32([ 0, 0, 1 ]), ( 3, 1 ))
+
+    tangents, bitangents = g.compute_tangents(positions[faces], np.zeros(( 1, 3, 2 )), faces, normals)
+
+    assert np.allclose(np.linalg.norm(tangents, axis=1), 1.0)
+    assert np.allclose(tangents @ [ 0, 0, 1 ], 0.0) and np.allclose(bitangents @ [ 0, 0, 1 ], 0.0)
+    assert np.isfinite(bitangents).all()
+
+# Bone groups
+def test_bone_groups_past_a_byte_are_widened ( tmp_path ):
+
+    arrays             = uv_sphere()
+    vertex_count       = len(arrays['xyz'])
+    arrays['bg']       = np.tile(np.array([ 300, 2, 1, -1 ], dtype=np.int32), ( vertex_count, 1 ))
+    arrays['bw']       = np.tile(np.array([ 0.5, 0.25, 0.25, 0.0 ], dtype=np.float32), ( vertex_count, 1 ))
+    file_path          = str(tmp_path / "part.ply")
+
+    g.encode_part(arrays, encoding_settings(**{ 'vertex groups': [ 'xyz', 'bg', 'bw' ] }), file_path)
+
+    header, vertices, _ = read_ply(file_path)
+
+    assert "property ushort b0" in header
+    assert ( vertices['b0'] == 300 ).all() and ( vertices['b3'] == 0 ).all()
+
+    arrays['bg'][0, 0] = 70000
+
+    with pytest.raises(ValueError):
+        g.encode_part(arrays, encoding_settings(**{ 'vertex groups': [ 'xyz', 'bg' ] }), file_path)
+
+def test_top_influences_keeps_the_heaviest_groups ():
+
+    # Vertex 0 has six influences, vertex 1 has none, and vertex 2 has one with no weight
+    vertices           = [ 0, 0, 0, 0, 0, 0, 2 ]
+    groups             = [ 5, 4, 3, 2, 1, 0, 7 ]
+    weights            = [ 0.1, 0.6, 0.2, 0.4, 0.3, 0.05, 0.0 ]
+
+    top_groups, top_weights = g.top_influences(vertices, groups, weights, 3)
+
+    assert top_groups.tolist()[0] == [ 4, 2, 1, 3 ]
+    assert np.isclose(top_weights[0].sum(), 1.0)
+    assert np.allclose(top_weights[0] * 1.5, [ 0.6, 0.4, 0.3, 0.2 ])
+    assert top_groups.tolist()[1:] == [ [ -1 ] * 4, [ -1 ] * 4 ] and ( top_weights[1:] == 0.0 ).all()
+
+# Streaming
+def test_hash_records_matches_equal_rows ():
+
+    records            = np.zeros(4, dtype=g.ply_vertex_dtype([ 'xyz', 'uv' ]))
+    records['xyz'][1]  = 1.0
+    records[2]         = records[0]
+
+    hashes             = g.hash_records(records)
+
+    assert hashes[0] == hashes[2]
+    assert len(set(hashes[[ 0, 1, 3 ]].tolist())) == 2
+
+@pytest.mark.parametrize('tolerance_welding', [ False, True ])
+def test_streamed_part_matches_whole_part ( tmp_path, tolerance_welding ):
+
+    arrays             = uv_sphere()
+    whole, streamed    = str(tmp_path / "whole.ply"), str(tmp_path / "streamed.ply")
+
+    g.encode_part(arrays, encoding_settings(**{ 'tolerance welding': tolerance_welding }), whole)
+    g.encode_part(arrays, encoding_settings(**{ 'tolerance welding': tolerance_welding, 'streaming': True, 'stream chunk size': 300 }), streamed)
+
+    # Every triangle is the same, in the same order, and while the weld table holds every
+    # vertex, vertices are shared across chunks
+    assert np.array_equal(triangle_positions(whole), triangle_positions(streamed))
+    assert len(read_ply(whole)[1]) == len(read_ply(streamed)[1])
+
+def test_streamed_part_with_a_full_weld_table ( tmp_path ):
+
+    arrays             = uv_sphere()
+    whole, streamed    = str(tmp_path / "whole.ply"), str(tmp_path / "streamed.ply")
+
+    g.encode_part(arrays, encoding_settings(), whole)
+    g.encode_part(arrays, encoding_settings(**{ 'streaming': True, 'stream chunk size': 50 }), streamed)
+
+    # Vertices evicted from the table are written again, but the triangles do not change
+    assert np.array_equal(triangle_positions(whole), triangle_positions(streamed))
+    assert len(read_ply(whole)[1]) <= len(read_ply(streamed)[1])
+
+def test_streamed_part_reports_skipped_steps ( tmp_path ):
+
+    settings           = encoding_settings(**{ 'streaming': True, 'meshlets': True, 'lods': True, 'index format': 'ADAPTIVE' })
+
+    result             = g.encode_part(uv_sphere(), settings, str(tmp_path / "part.ply"))
+
+    assert result['statistics']['skipped'] == [ 'meshlets', 'levels of detail', '16 bit indices' ]
+    assert result['files'] == [ str(tmp_path / "part.ply") ]
+    assert 'skipped' not in g.encode_part(uv_sphere(), encoding_settings(**{ 'streaming': True }), str(tmp_path / "part.ply"))['statistics']
+
+# Encoding workers
+@pytest.mark.parametrize('workers', [ 1, 2 ])
+def test_encode_pool_matches_the_calling_thread ( tmp_path, workers ):
+
+    arrays             = uv_sphere()
+    pool               = g.EncodePool(workers)
+    results            = [ ]
+
+    g.encode_part(arrays, encoding_settings(), str(tmp_path / "direct.ply"))
+
+    for i in range(3):
+        pool.submit(arrays, encoding_settings(), str(tmp_path / f"pooled{i}.ply"), None, results.append)
+
+    pool.shutdown()
+
+    assert len(results) == 3
+
+    for i in range(3):
+        assert ( tmp_path / f"pooled{i}.ply" ).read_bytes() == ( tmp_path / "direct.ply" ).read_bytes()
+
+# Vertex cache
+def test_vertex_cache_order_keeps_every_triangle_and_reuses_more_vertices ():
+
+    arrays             = uv_sphere()
+    vertex_count       = len(arrays['xyz'])
+    faces              = np.random.default_rng(4).permutation(arrays['triangle vertices'])
+
+    optimized          = g.optimize_vertex_cache(faces, vertex_count)
+
+    assert np.array_equal(np.sort(optimized.view('i4,i4,i4'), axis=0), np.sort(faces.view('i4,i4,i4'), axis=0))
+    assert g.vertex_cache_statistics(optimized, vertex_count)[0] < g.vertex_cache_statistics(faces, vertex_count)[0]
+
+def test_vertex_fetch_order_follows_first_use ():
+
+    faces              = np.array([ [ 4, 2, 0 ], [ 2, 4, 5 ] ])
+
+    order, remapped    = g.optimize_vertex_fetch(faces, 6)
+
+    assert order.tolist() == [ 4, 2, 0, 5 ]
+    assert remapped.tolist() == [ [ 0, 1, 2 ], [ 1, 0, 3 ] ]
+
+def test_optimized_part_reports_the_cache_statistics ( tmp_path ):
+
+    arrays             = uv_sphere()
+    whole, optimized   = str(tmp_path / "whole.ply"), str(tmp_path / "optimized.ply")
+
+    g.encode_part(arrays, encoding_settings(), whole)
+    result             = g.encode_part(arrays, encoding_settings(**{ 'optimize vertex cache': True }), optimized)
+
+    assert 0.5 <= result['statistics']['acmr'] < 3.0 and result['statistics']['atvr'] >= 1.0
+    assert len(read_ply(whole)[1]) == len(read_ply(optimized)[1])
+
+# Meshlets
+def test_meshlets_rebuild_the_index_buffer ():
+
+    arrays             = uv_sphere()
+    positions          = arrays['xyz']
+    faces              = arrays['triangle vertices']
+
+    meshlets           = g.build_meshlets(faces, positions, 32, 40)
+    table              = meshlets['meshlets']
+    rebuilt            = [ ]
+
+    assert ( table['vertex count'] <= 32 ).all() and ( table['triangle count'] <= 40 ).all()
+
+    for m in table:
+        vertices       = meshlets['vertices'][m['vertex offset']:m['vertex offset'] + m['vertex count']]
+        local          = meshlets['triangles'][m['triangle offset'] * 3:( m['triangle offset'] + m['triangle count'] ) * 3]
+        rebuilt.append(vertices[local].reshape(-1, 3))
+
+        # The sphere bounds every vertex of the meshlet
+        distance       = np.linalg.norm(positions[vertices] - m['center'], axis=1)
+        assert np.all(distance <= m['radius'] * ( 1.0 + 1e-5 ) + 1e-6)
+
+    assert np.array_equal(np.concatenate(rebuilt), faces)
+
+# Levels of detail
+def test_simplified_levels_shrink_and_stay_valid ():
+
+    positions, faces   = torus()
+    previous           = faces
+
+    for ratio in ( 0.5, 0.25, 0.1 ):
+        simplified     = g.simplify_mesh(positions, previous, int(len(faces) * ratio))
+
+        assert len(simplified) < len(previous)
+        assert len(simplified) <= int(len(faces) * ratio) * 1.25
+        assert simplified.min() >= 0 and simplified.max() < len(positions)
+        assert ( simplified[:, 0] != simplified[:, 1] ).all() and ( simplified[:, 1] != simplified[:, 2] ).all() and ( simplified[:, 2] != simplified[:, 0] ).all()
+
+        previous       = simplified
+
+def test_locked_vertices_are_not_collapsed ():
+
+    positions, faces   = torus()
+    locked             = np.zeros(len(positions), dtype=bool)
+    locked[::3]        = True
+
+    simplified         = g.simplify_mesh(positions, faces, len(faces) // 4, locked)
+
+    assert set(np.flatnonzero(locked).tolist()) <= set(np.unique(simplified).tolist())
+
+# Quantization
+@pytest.mark.parametrize('profile', [ 'BALANCED', 'COMPACT' ])
+def test_quantized_positions_decode_within_a_step ( tmp_path, profile ):
+
+    arrays             = uv_sphere()
+    file_path          = str(tmp_path / "part.ply")
+    result             = g.encode_part(arrays, encoding_settings(quantization=profile), file_path)
+    encoding           = result['json']['quantization']['xyz']
+
+    _, vertices, faces = read_ply(file_path)
+    normalized         = np.stack(( vertices['x'], vertices['y'], vertices['z'] ), axis=-1).astype(np.float64)
+
+    if encoding['encoding'] == 'unorm16':
+        normalized     = normalized / 65535.0
+        step           = np.asarray(encoding['scale']) / 65535.0
+    else:
+        step           = np.asarray(encoding['scale']) / 1024.0
+
+    decoded            = normalized * encoding['scale'] + encoding['bias']
+    expected           = arrays['xyz'][arrays['triangle vertices']]
+
+    assert np.all(np.abs(decoded[faces] - expected) <= step + 1e-6)
+
+def test_octahedral_encoding_is_inside_the_square ():
+
+    rng                = np.random.default_rng(1)
+    directions         = rng.normal(size=( 1000, 3 ))
+    directions        /= np.linalg.norm(directions, axis=1, keepdims=True)
+
+    encoded            = g.octahedral_encode(directions)
+
+    assert np.all(np.abs(encoded) <= 1.0 + 1e-12)
+    assert np.allclose(np.abs(encoded).sum(axis=1)[directions[:, 2] >= 0.0], np.abs(directions[:, :2]).sum(axis=1)[directions[:, 2] >= 0.0] / np.abs(directions).sum(axis=1)[directions[:, 2] >= 0.0])
+
+# Index ranges
+def test_split_index_ranges_round_trip ():
+
+    # A strip of triangles over more vertices than a 16 bit index can address
+    vertex_count       = 3 * g.INDEX_16_LIMIT
+    start              = np.arange(vertex_count - 2)
+    faces              = np.stack(( start, start + 1, start + 2 ), axis=-1)
+
+    relative, ranges   = g.encode_indices(faces, vertex_count, 'SPLIT')
+
+    assert relative.dtype == np.dtype('<u2')
+    assert ranges[0]['first triangle'] == 0
+    assert sum(r['triangle count'] for r in ranges) == len(faces)
+
+    for previous, current in zip(ranges, ranges[1:]):
+        assert current['first triangle'] == previous['first triangle'] + previous['triangle count']
+
+    for r in ranges:
+        span           = slice(r['first triangle'], r['first triangle'] + r['triangle count'])
+        assert np.array_equal(relative[span].astype(np.int64) + r['base vertex'], faces[span])
+
+def test_small_parts_are_not_split ():
+
+    faces              = np.array([ [ 0, 1, 2 ] ])
+
+    assert g.encode_indices(faces, 3, 'SPLIT')[1] is None
+    assert g.encode_indices(faces, 3, 'ADAPTIVE')[0].dtype == np.dtype('<u2')
+    assert g.encode_indices(faces, 3, 'UINT32')[0].dtype == np.dtype('<u4')
+
+# G10 meshes
+def test_streamed_g10mesh_header_counts ( tmp_path ):
+
+    arrays             = uv_sphere()
+    file_path          = str(tmp_path / "part.g10mesh")
+
+    g.encode_part(arrays, encoding_settings(**{ 'streaming': True, 'mesh format': 'G10MESH' }), file_path)
+
+    with open(file_path, "rb") as f:
+        header         = g.G10MESH_HEADER.unpack_from(f.read())
+
+    assert header[0] == b"G10M"
+    assert header[5] == len(arrays['triangle vertices']) * 3
+
+def test_g10mesh_holds_the_same_vertices_and_indices_as_ply ( tmp_path ):
+
+    arrays             = uv_sphere()
+    ply, g10mesh       = str(tmp_path / "part.ply"), str(tmp_path / "part.g10mesh")
+
+    g.encode_part(arrays, encoding_settings(), ply)
+    g.encode_part(arrays, encoding_settings(**{ 'mesh format': 'G10MESH' }), g10mesh)
+
+    _, vertices, faces = read_ply(ply)
+
+    with open(g10mesh, "rb") as f:
+        data           = f.read()
+
+    magic, _, _, vertex_count, stride, index_count, index_size, _, vertex_offset, index_offset = g.G10MESH_HEADER.unpack_from(data)
+
+    assert ( magic, vertex_count, stride, index_count ) == ( b"G10M", len(vertices), vertices.dtype.itemsize, faces.size )
+    assert vertex_offset % g.G10MESH_ALIGNMENT == 0 and index_offset % g.G10MESH_ALIGNMENT == 0
+    assert data[vertex_offset:vertex_offset + vertices.nbytes] == vertices.tobytes()
+    assert np.array_equal(np.frombuffer(data, dtype=f"<u{index_size}", count=index_count, offset=index_offset), faces.ravel())
+
+# Bounds
+def test_bounds_contain_points_and_follow_the_world_matrix ():
+
+    rng                = np.random.default_rng(3)
+    points             = rng.normal(size=( 200, 3 )) * [ 3.0, 1.0, 0.5 ]
+    matrix             = np.eye(4)
+    matrix[:3, 3]      = [ 10.0, -2.0, 1.0 ]
+
+    bounds             = g.compute_bounds(points, matrix)
+    obb                = bounds['obb']
+    local              = ( points - obb['center'] ) @ np.asarray(obb['axes']).T
+
+    assert np.all(np.linalg.norm(points - bounds['sphere']['center'], axis=1) <= bounds['sphere']['radius'] + 1e-9)
+    assert np.all(np.abs(local) <= np.asarray(obb['extents']) + 1e-9)
+    assert np.allclose(bounds['world aabb']['min'], points.min(axis=0) + matrix[:3, 3])
+    assert np.allclose(bounds['world aabb']['max'], points.max(axis=0) + matrix[:3, 3])
+
+def test_transformed_box_matches_the_transformed_points ():
+
+    points             = np.random.default_rng(5).random(( 200, 3 )) * [ 1.0, 2.0, 3.0 ]
+    angle              = 0.7
+    matrix             = np.eye(4)
+    matrix[:2, :2]     = [ [ np.cos(angle), -np.sin(angle) ], [ np.sin(angle), np.cos(angle) ] ]
+    matrix[:3, 3]      = [ 5.0, -1.0, 2.0 ]
+
+    box                = g.transform_box(points.min(axis=0), points.max(axis=0), matrix)
+    world              = g.compute_bounds(points, matrix)["world aabb"]
+
+    # The box of the corners holds every point, and is exact when the matrix does not rotate
+    assert np.all(np.array(box["min"]) <= np.array(world["min"]) + 1e-9)
+    assert np.all(np.array(box["max"]) >= np.array(world["max"]) - 1e-9)
+    assert np.allclose(np.array(box["max"])[2] - np.array(box["min"])[2], np.ptp(points[:, 2]))
+
+    matrix[:3, :3]     = np.eye(3) * 2.0
+
+    assert g.transform_box(points.min(axis=0), points.max(axis=0), matrix) == g.compute_bounds(points, matrix)["world aabb"]
+
+# Convex hulls
+def test_collision_hull_contains_every_point ():
+
+    rng                = np.random.default_rng(4)
+    points             = rng.normal(size=( 2000, 3 ))
+
+    vertices, faces    = g.collision_hull(points, 1000)
+    corners            = vertices[faces]
+    normals            = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    offsets            = np.einsum('ij,ij->i', normals, corners[:, 0])
+
+    assert np.all(points @ normals.T <= offsets + 1e-9)
+
+def test_simplified_hull_keeps_its_vertex_limit ():
+
+    rng                = np.random.default_rng(5)
+    points             = rng.normal(size=( 2000, 3 ))
+
+    vertices, faces    = g.collision_hull(points, 16)
+
+    assert len(vertices) <= 16
+    assert faces.min() >= 0 and faces.max() < len(vertices)
+
+def test_flat_points_have_no_hull ( tmp_path ):
+
+    points             = np.c_[np.random.default_rng(6).random(( 50, 2 )), np.zeros(50)]
+    result             = g.encode_convex_hull({ 'xyz': points }, { 'hull max vertices': 32 }, str(tmp_path / "flat.hull"))
+
+    assert g.collision_hull(points) is None
+    assert result['files'] == [ ] and result['json'] == { }
+
+# Convex decomposition
+def test_decomposition_splits_a_torus ( tmp_path ):
+
+    positions, faces   = torus()
+    file_path          = str(tmp_path / "torus.compound")
+    settings           = { 'max hulls': 8, 'concavity': 0.02, 'voxel resolution': 24, 'hull max vertices': 32 }
+
+    result             = g.encode_convex_decomposition({ 'xyz': positions, 'faces': faces }, settings, file_path)
+    hull_count         = result['json']['hull count']
+
+    assert 1 < hull_count <= 8
+
+    # Read the hulls back
+    with open(file_path, "rb") as f:
+        data           = f.read()
+
+    magic, version, count = g.COMPOUND_HEADER.unpack_from(data)
+    offset             = g.COMPOUND_HEADER.size
+    covered            = np.zeros(len(positions), dtype=bool)
+
+    assert ( magic, count ) == ( b"G10C", hull_count )
+
+    for _ in range(count):
+        _, _, vertex_count, triangle_count = g.HULL_HEADER.unpack_from(data, offset)
+        offset        += g.HULL_HEADER.size
+        vertices       = np.frombuffer(data, dtype='<f4', count=vertex_count * 3, offset=offset).reshape(-1, 3).astype(np.float64)
+        offset        += vertex_count * 12
+        triangles      = np.frombuffer(data, dtype='<u2', count=triangle_count * 3, offset=offset).reshape(-1, 3)
+        offset        += triangle_count * 6
+
+        assert len(vertices) <= 32
+
+        # Points on the inner side of every outward wound face are inside the hull
+        corners        = vertices[triangles]
+        normals        = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        normals       /= np.linalg.norm(normals, axis=1, keepdims=True)
+        offsets        = np.einsum('ij,ij->i', normals, corners[:, 0])
+        covered       |= np.all(positions @ normals.T <= offsets + 1e-4, axis=1)
+
+    assert offset == len(data)
+
+    # Together, the hulls cover the surface of the torus
+    assert covered.all()
+
+def test_meshes_without_triangles_are_not_decomposed ( tmp_path ):
+
+    positions          = np.array([ [ 0, 0, 0 ], [ 1, 0, 0 ], [ 0, 1, 0 ] ], dtype=np.float64)
+    faces              = np.zeros(( 0, 3 ), dtype=np.int64)
+    settings           = { 'max hulls': 4, 'concavity': 0.02, 'voxel resolution': 16, 'hull max vertices': 32 }
+
+    result             = g.encode_convex_decomposition({ 'xyz': positions, 'faces': faces }, settings, str(tmp_path / "flat.compound"))
+
+    assert result['files'] == [ ]
+
+# BVH
+def test_bvh_leaves_cover_every_triangle ():
+
+    rng                = np.random.default_rng(2)
+    positions          = rng.random(( 3000, 3 ))
+    faces              = np.arange(3000).reshape(-1, 3)
+    positions[faces[:, 1:]] = positions[faces[:, :1]] + 0.02 * rng.random(( 1000, 2, 3 ))
+
+    nodes, triangles   = g.build_bvh(positions, faces)
+    lower, upper       = positions[faces].min(axis=1), positions[faces].max(axis=1)
+
+    assert sorted(triangles.tolist()) == list(range(len(faces)))
+    assert ( nodes['count'] <= g.BVH_LEAF_SIZE ).all()
+
+    # Leaves bound their triangles, and interior nodes bound their children
+    covered            = 0
+    stack              = [ 0 ]
+
+    while stack:
+        node           = nodes[stack.pop()]
+
+        if node['count'] > 0:
+            leaf       = triangles[node['offset']:node['offset'] + node['count']]
+            assert ( lower[leaf] >= node['min'] - 1e-6 ).all() and ( upper[leaf] <= node['max'] + 1e-6 ).all()
+            covered   += int(node['count'])
+            continue
+
+        index          = int(np.flatnonzero(nodes == node)[0])
+
+        for child in ( index + 1, int(node['offset']) ):
+            assert ( nodes[child]['min'] >= node['min'] - 1e-6 ).all() and ( nodes[child]['max'] <= node['max'] + 1e-6 ).all()
+            stack.append(child)
+
+    assert covered == len(faces)
+
+def test_bvh_file_header ( tmp_path ):
+
+    positions, faces   = torus(12, 6)
+    nodes, triangles   = g.build_bvh(positions, faces)
+    file_path          = str(tmp_path / "part.bvh")
+
+    g.write_bvh(file_path, nodes, triangles)
+
+    with open(file_path, "rb") as f:
+        data           = f.read()
+
+    assert g.BVH_HEADER.unpack_from(data)[::2] == ( b"G10B", len(nodes) )
+    assert len(data) == g.BVH_HEADER.size + nodes.nbytes + len(triangles) * 4
+
+# Tolerance welding
+def test_weld_within_tolerance_only_merges_noise ():
+
+    rng                = np.random.default_rng(0)
+    base               = np.zeros(500, dtype=g.ply_vertex_dtype([ 'xyz', 'uv', 'nxyz' ]))
+    base['xyz']        = rng.random(( 500, 3 ))
+    base['uv']         = rng.random(( 500, 2 ))
+    base['nxyz']       = [ 0, 0, 1 ]
+
+    noisy              = base.copy()
+    noisy['xyz']      += rng.normal(0.0, 1e-7, ( 500, 3 ))
+
+    turned             = base[:50].copy()
+    turned['nxyz']     = [ 0, 1, 0 ]
+
+    vertices           = np.concatenate(( base, noisy, turned ))
+    welded, remap      = g.weld_within_tolerance(vertices, { 'xyz': 1e-5, 'nxyz': 1e-3, 'uv': 1e-5 })
+
+    assert len(welded) == 550
+    assert ( remap[:500] == remap[500:1000] ).all()
+    assert len(np.intersect1d(remap[1000:], remap[:500])) == 0
@@ -0,0 +1,221 @@
+#
+# GPort - Image tests
+#
+
+import numpy as np
+import struct, zlib
+
+import pytest
+
+import g10_image as gi
+
+# Decode a PNG written by encode_png
+def decode_png ( data: bytes ) -> np.ndarray:
+
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+
+    offset, chunks = 8, { }
+
+    # Gather the chunks, and check each one's CRC
+    while offset < len(data):
+        length, = struct.unpack_from('>I', data, offset)
+        tag     = data[offset + 4:offset + 8]
+        body    = data[offset + 8:offset + 8 + length]
+
+        assert struct.unpack_from('>I', data, offset + 8 + length)[0] == zlib.crc32(tag + body)
+
+        chunks[tag] = chunks.get(tag, b"") + body
+        offset      = offset + 12 + length
+
+    width, height, depth, color_type = struct.unpack_from('>2I2B', chunks[b"IHDR"])
+    channels = { 2: 3, 6: 4 }[color_type]
+    rows     = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8).reshape(height, width * channels + 1)
+    pixels   = np.zeros(( height, width * channels ), dtype=np.uint8)
+
+    assert depth == 8
+
+    # Undo the Sub and Up filters
+    for y in range(height):
+        row = rows[y, 1:].astype(np.int64)
+
+        if rows[y, 0] == 1:
+            for x in range(channels, len(row)):
+                row[x] = ( row[x] + row[x - channels] ) & 255
+        elif rows[y, 0] == 2 and y > 0:
+            row = ( row + pixels[y - 1] ) & 255
+        else:
+            assert rows[y, 0] in ( 0, 2 )
+
+        pixels[y] = row
+
+    return pixels.reshape(height, width, channels)
+
+# Decode a QOI written by encode_qoi
+def decode_qoi ( data: bytes ) -> tuple:
+
+    magic, width, height, channels, colorspace = struct.unpack_from('>4s2I2B', data)
+    offset, pixel, seen, out                   = 14, [ 0, 0, 0, 255 ], [ [ 0, 0, 0, 0 ] ] * 64, [ ]
+
+    assert magic == b"qoif"
+
+    while len(out) < width * height:
+        tag    = data[offset]
+        offset = offset + 1
+        run    = 1
+
+        if tag == gi.QOI_OP_RGB:
+            pixel, offset = [ *data[offset:offset + 3], pixel[3] ], offset + 3
+        elif tag == gi.QOI_OP_RGBA:
+            pixel, offset = list(data[offset:offset + 4]), offset + 4
+        elif tag >> 6 == gi.QOI_OP_INDEX >> 6:
+            pixel = list(seen[tag])
+        elif tag >> 6 == gi.QOI_OP_DIFF >> 6:
+            pixel = [ ( pixel[0] + ( ( tag >> 4 ) & 3 ) - 2 ) & 255, ( pixel[1] + ( ( tag >> 2 ) & 3 ) - 2 ) & 255, ( pixel[2] + ( tag & 3 ) - 2 ) & 255, pixel[3] ]
+        elif tag >> 6 == gi.QOI_OP_LUMA >> 6:
+            green  = ( tag & 63 ) - 32
+            pixel  = [ ( pixel[0] + green - 8 + ( data[offset] >> 4 ) ) & 255, ( pixel[1] + green ) & 255, ( pixel[2] + green - 8 + ( data[offset] & 15 ) ) & 255, pixel[3] ]
+            offset = offset + 1
+        else:
+            run    = ( tag & 63 ) + 1
+
+        seen[( pixel[0] * 3 + pixel[1] * 5 + pixel[2] * 7 + pixel[3] * 11 ) % 64] = list(pixel)
+        out.extend([ pixel ] * run)
+
+    assert data[offset:] == bytes(7) + b"\x01"
+
+    return np.array(out, dtype=np.uint8).reshape(height, width, 4)[..., :channels], colorspace
+
+# Decode a BMP written by encode_bmp
+def decode_bmp ( data: bytes ) -> np.ndarray:
+
+    magic, size, _, _, offset = struct.unpack_from('<2sI2HI', data)
+    _, width, height, _, bits = struct.unpack_from('<3I2H', data, 14)
+    channels                  = bits // 8
+    stride                    = ( width * channels + 3 ) & ~3
+    rows                      = np.frombuffer(data, dtype=np.uint8, offset=offset).reshape(height, stride)[::-1, :width * channels]
+    pixels                    = rows.reshape(height, width, channels).copy()
+
+    assert ( magic, size ) == ( b"BM", len(data) )
+
+    pixels[..., :3] = pixels[..., 2::-1]
+
+    return pixels
+
+# Images with noise, flat runs, gradients, and a few sizes and channel counts
+def images () -> list:
+
+    rng    = np.random.default_rng(0)
+    result = [ ]
+
+    for height, width, channels in ( ( 1, 1, 3 ), ( 1, 1, 4 ), ( 7, 5, 3 ), ( 33, 20, 4 ), ( 64, 3, 3 ) ):
+        noise    = rng.integers(0, 256, ( height, width, channels )).astype(np.uint8)
+        runs     = np.repeat(rng.integers(0, 3, ( height, width, 1 )) * 40, channels, axis=2).astype(np.uint8)
+        gradient = np.clip(np.cumsum(rng.integers(-3, 4, ( height, width, channels )), axis=1) + 128, 0, 255).astype(np.uint8)
+
+        if channels == 4:
+            runs[..., 3] = np.where(rng.random(( height, width )) < 0.5, 0, 255)
+
+        result.extend(( noise, runs, gradient ))
+
+    return result
+
+@pytest.mark.parametrize('pixels', images())
+def test_png_decodes_to_the_input ( pixels ):
+
+    assert np.array_equal(decode_png(gi.encode_png(pixels)), pixels)
+
+@pytest.mark.parametrize('pixels', images())
+def test_qoi_decodes_to_the_input ( pixels ):
+
+    decoded, colorspace = decode_qoi(gi.encode_qoi(pixels))
+
+    assert np.array_equal(decoded, pixels)
+    assert colorspace == 0
+
+@pytest.mark.parametrize('pixels', images())
+def test_bmp_decodes_to_the_input ( pixels ):
+
+    assert np.array_equal(decode_bmp(gi.encode_bmp(pixels)), pixels)
+
+def test_long_qoi_runs_are_split ():
+
+    pixels = np.full(( 10, 20, 3 ), 7, dtype=np.uint8)
+
+    assert np.array_equal(decode_qoi(gi.encode_qoi(pixels))[0], pixels)
+
+# Quantization
+def test_quantize_pixels_flips_rows_and_drops_opaque_alpha ():
+
+    pixels            = np.zeros(( 2, 3, 4 ), dtype=np.float32)
+    pixels[0, :, 0]   = 1.0
+    pixels[..., 3]    = 1.0
+
+    quantized         = gi.quantize_pixels(pixels.ravel(), 3, 2, 4)
+
+    assert quantized.shape == ( 2, 3, 3 )
+    assert ( quantized[1, :, 0] == 255 ).all() and ( quantized[0, :, 0] == 0 ).all()
+
+def test_quantize_pixels_applies_the_srgb_curve_to_color_only ():
+
+    pixels            = np.full(( 1, 1, 4 ), 0.5, dtype=np.float32)
+
+    linear            = gi.quantize_pixels(pixels.ravel(), 1, 1, 4, srgb=False)
+    srgb              = gi.quantize_pixels(pixels.ravel(), 1, 1, 4, srgb=True)
+
+    assert linear[0, 0].tolist() == [ 128, 128, 128, 128 ]
+    assert srgb[0, 0].tolist()   == [ 188, 188, 188, 128 ]
+
+def test_gray_images_are_written_as_rgb ():
+
+    pixels            = np.linspace(0.0, 1.0, 6, dtype=np.float32)
+
+    quantized         = gi.quantize_pixels(pixels, 3, 2, 1)
+
+    assert quantized.shape == ( 2, 3, 3 )
+    assert ( quantized[..., 0] == quantized[..., 2] ).all()
+
+# Channel packing
+def test_pack_channels_resamples_images_and_fills_constants ():
+
+    small             = ( np.full(2 * 2 * 4, 0.25, dtype=np.float32), 2, 2, 4 )
+    large             = ( np.linspace(0.0, 1.0, 4 * 4, dtype=np.float32), 4, 4, 1 )
+
+    pixels, width, height, channels = gi.pack_channels([ small, large, 0.75 ])
+    pixels            = pixels.reshape(height, width, channels)
+
+    assert ( width, height, channels ) == ( 4, 4, 3 )
+    assert np.allclose(pixels[..., 0], 0.25)
+    assert np.allclose(pixels[..., 1], np.linspace(0.0, 1.0, 16).reshape(4, 4))
+    assert np.allclose(pixels[..., 2], 0.75)
+
+# Writing
+@pytest.mark.parametrize('srgb, colorspace', [ ( True, True ), ( False, True ), ( False, False ) ])
+def test_written_qoi_records_the_colorspace ( tmp_path, srgb, colorspace ):
+
+    pixels            = np.random.default_rng(1).random(4 * 4 * 3).astype(np.float32)
+    file_path         = str(tmp_path / "texture.qoi")
+
+    # Byte color is written as sRGB without being converted, and data is linear
+    result            = gi.write_image(pixels, 4, 4, 3, srgb, colorspace, file_path, 'QOI')
+
+    with open(file_path, "rb") as f:
+        decoded, written = decode_qoi(f.read())
+
+    assert written == ( 0 if colorspace else 1 )
+    assert np.array_equal(decoded, gi.quantize_pixels(pixels, 4, 4, 3, srgb))
+    assert result['pixel bytes'] == 4 * 4 * 3 and result['seconds'] > 0.0
+
+def test_image_writer_reports_every_image ( tmp_path ):
+
+    writer            = gi.ImageWriter(2)
+    pixels            = np.random.default_rng(2).random(8 * 8 * 4).astype(np.float32)
+
+    for i, image_format in enumerate(gi.IMAGE_ENCODERS):
+        writer.submit(pixels, 8, 8, 4, False, False, str(tmp_path / f"texture{i}{gi.IMAGE_EXTENSIONS[image_format]}"), image_format)
+
+    statistics        = writer.shutdown()
+
+    assert statistics['images'] == len(gi.IMAGE_ENCODERS)
+    assert statistics['pixel bytes'] == len(gi.IMAGE_ENCODERS) * 8 * 8 * 4
+    assert statistics['throughput'] == statistics['pixel bytes'] / 1e6 / statistics['seconds']
+    assert sorted(p.name for p in tmp_path.iterdir()) == [ "texture0.png", "texture1.bmp", "texture2.qoi" ]